@@ -73,6 +73,7 @@ INPUTDIR="${PROJECT_DIR}"/input		# Firmware Download/Preload Directory
 UTILSDIR="${PROJECT_DIR}"/utils		# Contains Supportive Programs
 OUTDIR="${PROJECT_DIR}"/out			# Contains Final Extracted Files
 TMPDIR="${OUTDIR}"/tmp				# Temporary Working Directory
+LOGDIR="${PROJECT_DIR}"/logs			# Extraction Logs, Kept After The Run And Not Pushed
 
 rm -rf "${TMPDIR}" 2>/dev/null
 mkdir -p "${OUTDIR}" "${TMPDIR}" 2>/dev/null
@@ -96,26 +97,38 @@ done
 ## See README.md File For Program Credits
 # Set Utility Program Alias
 SDAT2IMG="${UTILSDIR}"/sdat2img.py
-SIMG2IMG="${UTILSDIR}"/bin/simg2img
+ARCMANIFEST="${UTILSDIR}"/arcmanifest.py
+FWDETECT="${UTILSDIR}"/fwdetect.py
+ARCHIVE_EXTRACT="${UTILSDIR}"/archive_extract.py
+PARTEXTRACT="${UTILSDIR}"/partextract.py
+BLOBSHA1="${UTILSDIR}"/blobsha1.py
+PROPRESOLVE="${UTILSDIR}"/propresolve.py
+VERSCAN="${UTILSDIR}"/verscan.py
 PACKSPARSEIMG="${UTILSDIR}"/bin/packsparseimg
 UNSIN="${UTILSDIR}"/unsin
+PAYLOAD_EXTRACT="${UTILSDIR}"/payload_extract.py
 PAYLOAD_EXTRACTOR="${UTILSDIR}"/bin/payload-dumper-go
 DTC="${UTILSDIR}"/dtc
+DTBSCAN="${UTILSDIR}"/dtbscan.py
 VMLINUX2ELF="${UTILSDIR}"/vmlinux-to-elf/vmlinux-to-elf
 KALLSYMS_FINDER="${UTILSDIR}"/vmlinux-to-elf/kallsyms-finder
 OZIPDECRYPT="${UTILSDIR}"/oppo_ozip_decrypt/ozipdecrypt.py
 OFP_QC_DECRYPT="${UTILSDIR}"/oppo_decrypt/ofp_qc_decrypt.py
 OFP_MTK_DECRYPT="${UTILSDIR}"/oppo_decrypt/ofp_mtk_decrypt.py
 OPSDECRYPT="${UTILSDIR}"/oppo_decrypt/opscrypto.py
-LPUNPACK="${UTILSDIR}"/lpunpack
+LPEXTRACT="${UTILSDIR}"/lpextract.py
+SPARSE="${UTILSDIR}"/sparse.py
+VENDORHDR="${UTILSDIR}"/vendorhdr.py
 SPLITUAPP="${UTILSDIR}"/splituapp.py
 PACEXTRACTOR="${UTILSDIR}"/pacextractor/python/pacExtractor.py
 NB0_EXTRACT="${UTILSDIR}"/nb0-extract
 KDZ_EXTRACT="${UTILSDIR}"/kdztools/unkdz.py
 DZ_EXTRACT="${UTILSDIR}"/kdztools/undz.py
+GPT_EXTRACT="${UTILSDIR}"/kdztools/ungpt.py
 RUUDECRYPT="${UTILSDIR}"/RUU_Decrypt_Tool
-EXTRACT_IKCONFIG="${UTILSDIR}"/extract-ikconfig
-UNPACKBOOT="${UTILSDIR}"/unpackboot.sh
+IKCONFIG="${UTILSDIR}"/ikconfig.py
+KERNELCACHE="${UTILSDIR}"/kernelcache.py
+BOOTIMG="${UTILSDIR}"/bootimg.py
 AML_EXTRACT="${UTILSDIR}"/aml-upgrade-package-extract
 AFPTOOL_EXTRACT="${UTILSDIR}"/bin/afptool
 RK_EXTRACT="${UTILSDIR}"/bin/rkImageMaker
@@ -134,6 +147,8 @@ fi
 # Set Names of Downloader Utility Programs
 MEGAMEDIADRIVE_DL="${UTILSDIR}"/downloaders/mega-media-drive_dl.sh
 AFHDL="${UTILSDIR}"/downloaders/afh_dl.py
+REMOTEZIP="${UTILSDIR}"/downloaders/remotezip.py
+DLCACHE="${UTILSDIR}"/downloaders/dlcache.py
 
 # EROFS
 FSCK_EROFS=${UTILSDIR}/bin/fsck.erofs
@@ -175,14 +190,28 @@ else
 			( "${TRANSFER}" "${URL}" ) || exit 1
 		else
 			if echo "${URL}" | grep -q "1drv.ms"; then URL=${URL/ms/ws}; fi
-			aria2c -x16 -s8 --console-log-level=warn --summary-interval=0 --check-certificate=false "${URL}" || {
-				wget -q --show-progress --progress=bar:force --no-check-certificate "${URL}" || exit 1
-			}
+			# Reuse An Earlier Download Of The Same URL, Size And ETag
+			if python3 "${DLCACHE}" get "url:${URL}" --url "${URL}" -o "${INPUTDIR}" >/dev/null 2>&1; then
+				printf "Using Cached Download\n"
+			# Zip Served With Range Support: Only Fetch The Firmware Members Out Of It
+			elif echo "${URL%%\?*}" | grep -qi "\.zip$" && python3 "${REMOTEZIP}" -o "${INPUTDIR}"/remotezip -P "${PARTITIONS}" "${URL}"; then
+				printf "Fetched Firmware Members Without Downloading The Whole Archive\n"
+			else
+				rm -rf "${INPUTDIR:?}"/remotezip 2>/dev/null
+				aria2c -x16 -s8 --console-log-level=warn --summary-interval=0 --check-certificate=false "${URL}" || {
+					wget -q --show-progress --progress=bar:force --no-check-certificate "${URL}" || exit 1
+				}
+				python3 "${DLCACHE}" put "url:${URL}" --url "${URL}" "$(find "${INPUTDIR}" -maxdepth 1 -type f -print -quit)" >/dev/null 2>&1
+			fi
 		fi
 		unset URL
 		for f in *; do detox -r "${f}" 2>/dev/null; done		# Detox Filename
 		# Input File Variables
-		FILEPATH=$(find "$(pwd)" -maxdepth 1 -type f 2>/dev/null)	# Single File
+		if [[ -d "${INPUTDIR}"/remotezip ]]; then
+			FILEPATH="${INPUTDIR}"/remotezip		# Folder Of Fetched Members
+		else
+			FILEPATH=$(find "$(pwd)" -maxdepth 1 -type f 2>/dev/null)	# Single File
+		fi
 		printf "\nWorking with %s\n\n" "${FILEPATH##*/}"
 		[[ $(echo "${FILEPATH}" | tr ' ' '\n' | wc -l) -gt 1 ]] && FILEPATH=$(find "$(pwd)" -maxdepth 2 -type d) 	# Base Folder
 	else
@@ -234,32 +263,66 @@ fi
 
 cd "${PROJECT_DIR}"/ || exit
 
+# Member Names Of The Input Archive, Listed Once Per FILEPATH And Kept In A Variable
+ARCHIVE_MANIFEST="" && ARCHIVE_MANIFEST_FOR=""
+function archive_manifest() {
+	if [[ "${ARCHIVE_MANIFEST_FOR}" != "${FILEPATH}" ]]; then
+		ARCHIVE_MANIFEST_FOR="${FILEPATH}"
+		ARCHIVE_MANIFEST=""
+		[[ -f "${FILEPATH}" ]] && ARCHIVE_MANIFEST=$(python3 "${ARCMANIFEST}" -n --7zz "${BIN_7ZZ}" "${FILEPATH}" 2>/dev/null)
+	fi
+}
+function archive_names() {
+	archive_manifest
+	[[ -n "${ARCHIVE_MANIFEST}" ]] && printf "%s\n" "${ARCHIVE_MANIFEST}"
+}
+
+# Extract All Given Members Of FILEPATH In One Pass, Flattened Into The Current Directory
+function archive_extract() {
+	[[ -f "${FILEPATH}" && $# -gt 0 ]] || return 0
+	python3 "${ARCHIVE_EXTRACT}" --7zz "${BIN_7ZZ}" -- "${FILEPATH}" "$@" 2>/dev/null >> "${TMPDIR}"/zip.log
+}
+
+# Detect The Input From Magic Bytes, Archive Manifest And TMPDIR In One Pass
+# Sets FW_CONTAINER (ozip, ops, ofp, tgz, kdz, dz, ruu, gpt, zip, ...), FW_NESTED (ops, ofp, aml) And FW_LAYOUT
+function firmware_detect() {
+	FW_CONTAINER="" && FW_NESTED="" && FW_LAYOUT=""
+	eval "$(archive_names | python3 "${FWDETECT}" --shell --names - --tmpdir "${TMPDIR}" "${FILEPATH}" 2>/dev/null)"
+}
+
 # Function for Extracting Super Images
+# Takes The Super Image, Or All Its Sparse Chunks In Order; Defaults To super.img.raw Or super.img
 function superimage_extract() {
-    if [ -f super.img ]; then
-        echo "Extracting Partitions from the Super Image..."
-        ${SIMG2IMG} super.img super.img.raw 2>/dev/null
+    superimages=("$@")
+    if [[ ${#superimages[@]} -eq 0 ]]; then
+        if [[ -s super.img.raw ]]; then
+            superimages=(super.img.raw)
+        elif [ -f super.img ]; then
+            superimages=(super.img)
+        fi
     fi
-    if [[ ! -s super.img.raw ]] && [ -f super.img ]; then
-        mv super.img super.img.raw
+    if [[ ${#superimages[@]} -gt 0 ]]; then
+        echo "Extracting Partitions from the Super Image..."
+        python3 "${LPEXTRACT}" -j "$(nproc --all)" "${superimages[@]}" -p ${PARTITIONS} >/dev/null 2>&1
     fi
+    notinsuper=()
     for partition in $PARTITIONS; do
-        ($LPUNPACK --partition="$partition"_a super.img.raw || $LPUNPACK --partition="$partition" super.img.raw) 2>/dev/null
-        if [ -f "$partition"_a.img ]; then
-            mv "$partition"_a.img "$partition".img
-        else
-            foundpartitions=$(${BIN_7ZZ} l -ba "${FILEPATH}" | rev | gawk '{ print $1 }' | rev | grep $partition.img)
-            ${BIN_7ZZ} e -y "${FILEPATH}" $foundpartitions dummypartition 2>/dev/null >> $TMPDIR/zip.log
+        if [ ! -f "$partition".img ]; then
+            readarray -t foundpartitions < <(archive_names | grep $partition.img)
+            notinsuper+=("${foundpartitions[@]}")
         fi
     done
+    archive_extract "${notinsuper[@]}"
     rm -rf super.img.raw
 }
 
 printf "Extracting firmware on: %s\n" "${OUTDIR}"
 cd "${TMPDIR}"/ || exit
+archive_manifest
+firmware_detect
 
 # Oppo .ozip Check
-if [[ $(head -c12 "${FILEPATH}" 2>/dev/null | tr -d '\0') == "OPPOENCRYPT!" ]] || [[ "${EXTENSION}" == "ozip" ]]; then
+if [[ "${FW_CONTAINER}" == "ozip" ]]; then
 	printf "Oppo/Realme ozip Detected.\n"
 	# Either Move Downloaded/Re-Loaded File Or Copy Local File
 	mv -f "${INPUTDIR}"/"${FILE}" "${TMPDIR}"/"${FILE}" 2>/dev/null || cp -a "${FILEPATH}" "${TMPDIR}"/"${FILE}"
@@ -278,9 +341,9 @@ if [[ $(head -c12 "${FILEPATH}" 2>/dev/null | tr -d '\0') == "OPPOENCRYPT!" ]] |
 	exit
 fi
 # Oneplus .ops Check
-if ${BIN_7ZZ} l -ba "${FILEPATH}" | grep -q ".*.ops" 2>/dev/null; then
+if [[ "${FW_NESTED}" == "ops" ]]; then
 	printf "Oppo/Oneplus ops Firmware Detected Extracting...\n"
-	foundops=$(${BIN_7ZZ} l -ba "${FILEPATH}" | gawk '{print $NF}' | grep ".*.ops")
+	foundops=$(archive_names | grep ".*.ops")
 	${BIN_7ZZ} e -y -- "${FILEPATH}" "${foundops}" */"${foundops}" 2>/dev/null >> "${TMPDIR}"/zip.log
 	mkdir -p "${INPUTDIR}" 2>/dev/null && rm -rf -- "${INPUTDIR:?}"/* 2>/dev/null
 	mv "$(echo "${foundops}" | gawk -F['/'] '{print $NF}')" "${INPUTDIR}"/
@@ -290,7 +353,7 @@ if ${BIN_7ZZ} l -ba "${FILEPATH}" | grep -q ".*.ops" 2>/dev/null; then
 	( bash "${0}" "${PROJECT_DIR}/input/${foundops}" 2>/dev/null) || exit 1
 	exit
 fi
-if [[ "${EXTENSION}" == "ops" ]]; then
+if [[ "${FW_CONTAINER}" == "ops" ]]; then
 	printf "Oppo/Oneplus ops Detected.\n"
 	# Either Move Downloaded/Re-Loaded File Or Copy Local File
 	mv -f "${INPUTDIR}"/"${FILE}" "${TMPDIR}"/"${FILE}" 2>/dev/null || cp -a "${FILEPATH}" "${TMPDIR}"/"${FILE}"
@@ -305,9 +368,9 @@ if [[ "${EXTENSION}" == "ops" ]]; then
 	exit
 fi
 # Oppo .ofp Check
-if ${BIN_7ZZ} l -ba "${FILEPATH}" | gawk '{print $NF}' | grep -q ".*.ofp" 2>/dev/null; then
+if [[ "${FW_NESTED}" == "ofp" ]]; then
 	printf "Oppo ofp Detected.\n"
-	foundofp=$(${BIN_7ZZ} l -ba "${FILEPATH}" | gawk '{print $NF}' | grep ".*.ofp")
+	foundofp=$(archive_names | grep ".*.ofp")
 	${BIN_7ZZ} e -y -- "${FILEPATH}" "${foundofp}" */"${foundofp}" 2>/dev/null >> "${TMPDIR}"/zip.log
 	mkdir -p "${INPUTDIR}" 2>/dev/null && rm -rf -- "${INPUTDIR:?}"/* 2>/dev/null
 	mv "$(echo "${foundofp}" | gawk -F['/'] '{print $NF}')" "${INPUTDIR}"/
@@ -317,7 +380,7 @@ if ${BIN_7ZZ} l -ba "${FILEPATH}" | gawk '{print $NF}' | grep -q ".*.ofp" 2>/dev
 	( bash "${0}" "${PROJECT_DIR}/input/${foundofp}" 2>/dev/null) || exit 1
 	exit
 fi
-if [[ "${EXTENSION}" == "ofp" ]]; then
+if [[ "${FW_CONTAINER}" == "ofp" ]]; then
 	printf "Oppo ofp Detected.\n"
 	# Either Move Downloaded/Re-Loaded File Or Copy Local File
 	mv -f "${INPUTDIR}"/"${FILE}" "${TMPDIR}"/"${FILE}" 2>/dev/null || cp -a "${FILEPATH}" "${TMPDIR}"/"${FILE}"
@@ -340,7 +403,7 @@ if [[ "${EXTENSION}" == "ofp" ]]; then
 	exit
 fi
 # Xiaomi .tgz Check
-if [[ "${FILE##*.}" == "tgz" || "${FILE#*.}" == "tar.gz" ]]; then
+if [[ "${FW_CONTAINER}" == "tgz" ]]; then
 	printf "Xiaomi gzipped tar archive found.\n"
 	mkdir -p "${INPUTDIR}" 2>/dev/null
 	if [[ -f "${INPUTDIR}"/"${FILE}" ]]; then
@@ -357,12 +420,16 @@ if [[ "${FILE##*.}" == "tgz" || "${FILE#*.}" == "tar.gz" ]]; then
 	exit
 fi
 # LG KDZ Check
-if echo "${FILEPATH}" | grep -q ".*.kdz" || [[ "${EXTENSION}" == "kdz" ]]; then
+if [[ "${FW_CONTAINER}" == "kdz" || "${FW_CONTAINER}" == "dz" ]]; then
 	printf "LG KDZ Detected.\n"
 	# Either Move Downloaded/Re-Loaded File Or Copy Local File
 	mv -f "${INPUTDIR}"/"${FILE}" "${TMPDIR}"/ 2>/dev/null || cp -a "${FILEPATH}" "${TMPDIR}"/
-	python3 "${KDZ_EXTRACT}" -f "${FILE}" -x -o "./" 2>/dev/null
-	DZFILE=$(ls -- *.dz)
+	if [[ "${FW_CONTAINER}" == "dz" ]]; then
+		DZFILE="${FILE}"
+	else
+		python3 "${KDZ_EXTRACT}" -f "${FILE}" -x -o "./" 2>/dev/null
+		DZFILE=$(ls -- *.dz)
+	fi
 	printf "Extracting All Partitions As Individual Images.\n"
 	python3 "${DZ_EXTRACT}" -f "${DZFILE}" -s -o "./" 2>/dev/null
 	rm -f "${TMPDIR}"/"${FILE}" "${TMPDIR}"/"${DZFILE}" 2>/dev/null
@@ -372,7 +439,7 @@ if echo "${FILEPATH}" | grep -q ".*.kdz" || [[ "${EXTENSION}" == "kdz" ]]; then
 	find "${TMPDIR}" -maxdepth 1 -type f -name "*_b.img" -exec rm -rf {} \;
 fi
 # HTC RUU Check
-if echo "${FILEPATH}" | grep -i "^ruu_" | grep -q -i "exe$" || [[ "${EXTENSION}" == "exe" ]]; then
+if [[ "${FW_CONTAINER}" == "ruu" ]]; then
 	printf "HTC RUU Detected.\n"
 	# Either Move Downloaded/Re-Loaded File Or Copy Local File
 	mv -f "${INPUTDIR}"/"${FILE}" "${TMPDIR}"/ || cp -a "${FILEPATH}" "${TMPDIR}"/
@@ -381,9 +448,19 @@ if echo "${FILEPATH}" | grep -i "^ruu_" | grep -q -i "exe$" || [[ "${EXTENSION}"
 	"${RUUDECRYPT}" -f "${FILE}" 2>/dev/null
 	find "${TMPDIR}"/OUT* -name "*.img" -exec mv {} "${TMPDIR}"/ \;
 fi
+# Raw eMMC/UFS Disk Image (GPT) Check
+if [[ "${FW_CONTAINER}" == "gpt" ]]; then
+	printf "Raw GPT Disk Image Detected.\n"
+	python3 "${GPT_EXTRACT}" -f "${FILEPATH}" -x -o "${TMPDIR}" ${PARTITIONS} $(printf "%s_a " ${PARTITIONS}) super 2>/dev/null
+	find "${TMPDIR}" -maxdepth 1 -type f -name "*_a.img" | while read -r i; do mv "${i}" "${i/_a.img/.img}" 2>/dev/null; done
+	unset FILEPATH
+fi
+
+# KDZ/RUU/GPT Extraction Above Changed TMPDIR And FILEPATH, Detect Again For The Rest
+firmware_detect
 
 # Amlogic upgrade package (AML) Check
-if [[ $(${BIN_7ZZ} l -ba "${FILEPATH}" | grep -i aml) ]]; then
+if [[ "${FW_NESTED}" == "aml" ]]; then
 	echo "AML Detected"
 	cp "${FILEPATH}" ${TMPDIR}
 	FILE="${TMPDIR}/$(basename ${FILEPATH})"
@@ -405,56 +482,60 @@ fi
 if [[ -f "${FILEPATH}" ]]; then
 	for otherpartition in ${OTHERPARTITIONS}; do
 		filename=${otherpartition%:*} && outname=${otherpartition#*:}
-		if ${BIN_7ZZ} l -ba "${FILEPATH}" | grep -q "${filename}"; then
+		if archive_names | grep -q "${filename}"; then
 			printf "%s Detected For %s\n" "${filename}" "${outname}"
-			foundfile=$(${BIN_7ZZ} l -ba "${FILEPATH}" | grep "${filename}" | awk '{print $NF}')
+			foundfile=$(archive_names | grep "${filename}")
 			${BIN_7ZZ} e -y -- "${FILEPATH}" "${foundfile}" */"${foundfile}" 2>/dev/null >> "${TMPDIR}"/zip.log
 			output=$(ls -- "${filename}"* 2>/dev/null)
 			[[ ! -e "${TMPDIR}"/"${outname}".img ]] && mv "${output}" "${TMPDIR}"/"${outname}".img
-			"${SIMG2IMG}" "${TMPDIR}"/"${outname}".img "${OUTDIR}"/"${outname}".img 2>/dev/null
-			[[ ! -s "${OUTDIR}"/"${outname}".img && -f "${TMPDIR}"/"${outname}".img ]] && mv "${outname}".img "${OUTDIR}"/"${outname}".img
+			python3 "${SPARSE}" -m "${TMPDIR}"/"${outname}".img "${OUTDIR}"/"${outname}".img 2>/dev/null
 		fi
 	done
 fi
 
 # Extract/Put Image/Extra Files In TMPDIR
-if ${BIN_7ZZ} l -ba "${FILEPATH}" | grep -q "system.new.dat" 2>/dev/null || [[ $(find "${TMPDIR}" -type f -name "system.new.dat*" -print | wc -l) -ge 1 ]]; then
+if [[ "${FW_LAYOUT}" == "dat" ]]; then
 	printf "A-only DAT-Formatted OTA detected.\n"
+	# Pull Every Partition's DAT Members In One Pass Over The Archive
+	datmembers=()
+	for partition in $PARTITIONS; do
+		datmembers+=("${partition}.new.dat*" "${partition}.transfer.list" "${partition}.img")
+		datmembers+=("${partition}.*.new.dat*" "${partition}.*.transfer.list" "${partition}.*.img")
+	done
+	archive_extract "${datmembers[@]}"
+	rename 's/(\w+)\.(\d+)\.(\w+)/$1.$3/' *
+	# For Oplus A-only OTAs, eg OnePlus Nord 2. Regex matches the 8 digits of Oplus NV ID (prop ro.build.oplus_nv_id) to remove them.
+	# hello@world:~/test_regex# rename -n 's/(\w+)\.(\d+)\.(\w+)/$1.$3/' *
+	# rename(my_bigball.00011011.new.dat.br, my_bigball.new.dat.br)
+	# rename(my_bigball.00011011.patch.dat, my_bigball.patch.dat)
+	# rename(my_bigball.00011011.transfer.list, my_bigball.transfer.list)
 	for partition in $PARTITIONS; do
-		${BIN_7ZZ} e -y "${FILEPATH}" ${partition}.new.dat* ${partition}.transfer.list ${partition}.img 2>/dev/null >> ${TMPDIR}/zip.log
-		${BIN_7ZZ} e -y "${FILEPATH}" ${partition}.*.new.dat* ${partition}.*.transfer.list ${partition}.*.img 2>/dev/null >> ${TMPDIR}/zip.log
-		rename 's/(\w+)\.(\d+)\.(\w+)/$1.$3/' *
-		# For Oplus A-only OTAs, eg OnePlus Nord 2. Regex matches the 8 digits of Oplus NV ID (prop ro.build.oplus_nv_id) to remove them.
-		# hello@world:~/test_regex# rename -n 's/(\w+)\.(\d+)\.(\w+)/$1.$3/' *
-		# rename(my_bigball.00011011.new.dat.br, my_bigball.new.dat.br)
-		# rename(my_bigball.00011011.patch.dat, my_bigball.patch.dat)
-		# rename(my_bigball.00011011.transfer.list, my_bigball.transfer.list)
 		if [[ -f ${partition}.new.dat.1 ]]; then
 			cat ${partition}.new.dat.{0..999} 2>/dev/null >> ${partition}.new.dat
 			rm -rf ${partition}.new.dat.{0..999}
 		fi
-		ls | grep "\.new\.dat" | while read i; do
-			line=$(echo "$i" | cut -d"." -f1)
-			if [[ $(echo "$i" | grep "\.dat\.xz") ]]; then
-				${BIN_7ZZ} e -y "$i" 2>/dev/null >> ${TMPDIR}/zip.log
-				rm -rf "$i"
-			fi
-			if [[ $(echo "$i" | grep "\.dat\.br") ]]; then
-				echo "Converting brotli ${partition} dat to normal"
-				brotli -d "$i"
-				rm -f "$i"
-			fi
-			echo "Extracting ${partition}"
-			python3 ${SDAT2IMG} ${line}.transfer.list ${line}.new.dat "${OUTDIR}"/${line}.img > ${TMPDIR}/extract.log
-			rm -rf ${line}.transfer.list ${line}.new.dat
-		done
 	done
-elif ${BIN_7ZZ} l -ba "${FILEPATH}" | grep rawprogram || [[ $(find "${TMPDIR}" -type f -name "*rawprogram*" | wc -l) -ge 1 ]]; then
+	ls | grep "\.new\.dat" | while read i; do
+		line=$(echo "$i" | cut -d"." -f1)
+		if [[ $(echo "$i" | grep "\.dat\.xz") ]]; then
+			${BIN_7ZZ} e -y "$i" 2>/dev/null >> ${TMPDIR}/zip.log
+			rm -rf "$i"
+		fi
+		if [[ $(echo "$i" | grep "\.dat\.br") ]]; then
+			echo "Converting brotli ${line} dat to normal"
+			brotli -d "$i"
+			rm -f "$i"
+		fi
+		echo "Extracting ${line}"
+		python3 ${SDAT2IMG} ${line}.transfer.list ${line}.new.dat "${OUTDIR}"/${line}.img > ${TMPDIR}/extract.log
+		rm -rf ${line}.transfer.list ${line}.new.dat
+	done
+elif [[ "${FW_LAYOUT}" == "rawprogram" ]]; then
 	echo "QFIL Detected"
-	rawprograms=$(${BIN_7ZZ} l -ba ${FILEPATH} | gawk '{ print $NF }' | grep rawprogram)
+	rawprograms=$(archive_names | grep rawprogram)
 	${BIN_7ZZ} e -y ${FILEPATH} $rawprograms 2>/dev/null >> ${TMPDIR}/zip.log
 	for partition in $PARTITIONS; do
-		partitionsonzip=$(${BIN_7ZZ} l -ba ${FILEPATH} | gawk '{ print $NF }' | grep $partition)
+		partitionsonzip=$(archive_names | grep $partition)
 		if [[ ! $partitionsonzip == "" ]]; then
 			${BIN_7ZZ} e -y ${FILEPATH} $partitionsonzip 2>/dev/null >> ${TMPDIR}/zip.log
 			if [[ ! -f "$partition.img" ]]; then
@@ -471,22 +552,26 @@ elif ${BIN_7ZZ} l -ba "${FILEPATH}" | grep rawprogram || [[ $(find "${TMPDIR}" -
 	if [[ -f super.img ]]; then
 		superimage_extract || exit 1
 	fi
-elif ${BIN_7ZZ} l -ba "${FILEPATH}" | grep -q ".*.nb0" 2>/dev/null || [[ $(find "${TMPDIR}" -type f -name "*.nb0*" | wc -l) -ge 1 ]]; then
+elif [[ "${FW_LAYOUT}" == "nb0" ]]; then
 	printf "nb0-Formatted Firmware Detected.\n"
 	if [[ -f "${FILEPATH}" ]]; then
-		to_extract=$(${BIN_7ZZ} l -ba "${FILEPATH}" | grep ".*.nb0" | gawk '{print $NF}')
+		to_extract=$(archive_names | grep ".*.nb0")
 		${BIN_7ZZ} e -y -- "${FILEPATH}" "${to_extract}" 2>/dev/null >> "${TMPDIR}"/zip.log
 	else
 		find "${TMPDIR}" -type f -name "*.nb0*" -exec mv {} . \; 2>/dev/null
 	fi
 	"${NB0_EXTRACT}" "${to_extract}" "${TMPDIR}"
-elif ${BIN_7ZZ} l -ba "${FILEPATH}" | grep system | grep chunk | grep -q -v ".*\.so$" 2>/dev/null || [[ $(find "${TMPDIR}" -type f -name "*system*chunk*" | wc -l) -ge 1 ]]; then
+elif [[ "${FW_LAYOUT}" == "chunk" ]]; then
 	printf "Chunk Detected.\n"
+	# Pull All Chunks And Images In One Pass Over The Archive
+	chunkmembers=()
 	for partition in ${PARTITIONS}; do
-		if [[ -f "${FILEPATH}" ]]; then
-			foundpartitions=$(${BIN_7ZZ} l -ba "${FILEPATH}" | gawk '{print $NF}' | grep "${partition}".img)
-			${BIN_7ZZ} e -y -- "${FILEPATH}" *"${partition}"*chunk* */*"${partition}"*chunk* "${foundpartitions}" dummypartition 2>/dev/null >> "${TMPDIR}"/zip.log
-		else
+		readarray -t foundpartitions < <(archive_names | grep "${partition}".img)
+		chunkmembers+=("*${partition}*chunk*" "*/*${partition}*chunk*" "${foundpartitions[@]}")
+	done
+	archive_extract "${chunkmembers[@]}"
+	for partition in ${PARTITIONS}; do
+		if [[ ! -f "${FILEPATH}" ]]; then
 			find "${TMPDIR}" -type f -name "*${partition}*chunk*" -exec mv {} . \; 2>/dev/null
 			find "${TMPDIR}" -type f -name "*${partition}*.img" -exec mv {} . \; 2>/dev/null
 		fi
@@ -495,13 +580,12 @@ elif ${BIN_7ZZ} l -ba "${FILEPATH}" | grep system | grep chunk | grep -q -v ".*\
 		romchunk=$(find . -maxdepth 1 -type f -name "*${partition}*chunk*" | cut -d'/' -f'2-' | sort)
 		if echo "${romchunk}" | grep -q "sparsechunk"; then
 			if [[ ! -f "${partition}".img ]]; then
-				"${SIMG2IMG}" "${romchunk}" "${partition}".img.raw 2>/dev/null
-				mv "${partition}".img.raw "${partition}".img
+				python3 "${SPARSE}" ${romchunk} "${partition}".img 2>/dev/null
 			fi
 			rm -rf -- *"${partition}"*chunk* 2>/dev/null
 		fi
 	done
-elif ${BIN_7ZZ} l -ba "${FILEPATH}" | gawk '{print $NF}' | grep -q "system_new.img\|^system.img\|\/system.img\|\/system_image.emmc.img\|^system_image.emmc.img" 2>/dev/null || [[ $(find "${TMPDIR}" -type f -name "system*.img" | wc -l) -ge 1 ]]; then
+elif [[ "${FW_LAYOUT}" == "img" ]]; then
 	printf "Image File detected.\n"
 	if [[ -f "${FILEPATH}" ]]; then
 		${BIN_7ZZ} x -y "${FILEPATH}" 2>/dev/null >> "${TMPDIR}"/zip.log
@@ -516,7 +600,7 @@ elif ${BIN_7ZZ} l -ba "${FILEPATH}" | gawk '{print $NF}' | grep -q "system_new.i
 	find "${TMPDIR}" -type f -iname "*Release_Note.txt" -exec mv {} "${OUTDIR}"/ \;
 	find "${TMPDIR}" -type f ! -name "*img*" -exec rm -rf {} \;	# delete other files
 	find "${TMPDIR}" -maxdepth 3 -type f -name "*.img" -exec mv {} . \; 2>/dev/null
-elif ${BIN_7ZZ} l -ba "${FILEPATH}" | grep -q "system.sin\|.*system_.*\.sin" 2>/dev/null || [[ $(find "${TMPDIR}" -type f -name "system*.sin" | wc -l) -ge 1 ]]; then
+elif [[ "${FW_LAYOUT}" == "sin" ]]; then
 	printf "sin Image Detected.\n"
 	[[ -f "${FILEPATH}" ]] && ${BIN_7ZZ} x -y "${FILEPATH}" 2>/dev/null >> "${TMPDIR}"/zip.log
 	# Remove Unnecessary Filename Part
@@ -533,7 +617,7 @@ elif ${BIN_7ZZ} l -ba "${FILEPATH}" | grep -q "system.sin\|.*system_.*\.sin" 2>/
 		echo "super image inside a sin detected"
 		superimage_extract || exit 1
 	fi
-elif ${BIN_7ZZ} l -ba "${FILEPATH}" | grep ".pac$" 2>/dev/null || [[ $(find "${TMPDIR}" -type f -name "*.pac" | wc -l) -ge 1 ]]; then
+elif [[ "${FW_LAYOUT}" == "pac" ]]; then
 	printf "pac Detected.\n"
 	[[ -f "${FILEPATH}" ]] && ${BIN_7ZZ} x -y "${FILEPATH}" 2>/dev/null >> "${TMPDIR}"/zip.log
 	for f in "${TMPDIR}"/*; do detox -r "${f}"; done
@@ -544,23 +628,27 @@ elif ${BIN_7ZZ} l -ba "${FILEPATH}" | grep ".pac$" 2>/dev/null || [[ $(find "${T
 	if [[ -f super.img ]]; then
 		superimage_extract || exit 1
 	fi
-elif ${BIN_7ZZ} l -ba "${FILEPATH}" | grep -q "system.bin" 2>/dev/null || [[ $(find "${TMPDIR}" -type f -name "system.bin" | wc -l) -ge 1 ]]; then
+elif [[ "${FW_LAYOUT}" == "bin" ]]; then
 	printf "bin Images Detected\n"
 	[[ -f "${FILEPATH}" ]] && ${BIN_7ZZ} x -y "${FILEPATH}" 2>/dev/null >> "${TMPDIR}"/zip.log
 	find "${TMPDIR}" -mindepth 2 -type f -name "*.bin" -exec mv {} . \;	# move .img in sub-dir to ${TMPDIR}
 	find "${TMPDIR}" -maxdepth 1 -type f -name "*.bin" | while read -r i; do mv "${i}" "${i/\.bin/.img}" 2>/dev/null; done	# proper names
-elif ${BIN_7ZZ} l -ba "${FILEPATH}" | grep -q "system-p" 2>/dev/null || [[ $(find "${TMPDIR}" -type f -name "system-p*" | wc -l) -ge 1 ]]; then
+elif [[ "${FW_LAYOUT}" == "systemp" ]]; then
 	printf "P-Suffix Images Detected\n"
+	# Pull All P-Suffix Images In One Pass Over The Archive
+	psuffixes=()
+	for partition in ${PARTITIONS}; do psuffixes+=(-e "${partition}-p"); done
+	readarray -t foundpartitions < <(archive_names | grep "${psuffixes[@]}" 2>/dev/null)
+	archive_extract "${foundpartitions[@]}"
 	for partition in ${PARTITIONS}; do
 		if [[ -f "${FILEPATH}" ]]; then
-			foundpartitions=$(${BIN_7ZZ} l -ba "${FILEPATH}" | gawk '{print $NF}' | grep "${partition}-p")
-			${BIN_7ZZ} e -y -- "${FILEPATH}" "${foundpartitions}" dummypartition 2>/dev/null >> "${TMPDIR}"/zip.log
+			foundpartitions=$(archive_names | grep "${partition}-p")
 		else
 			foundpartitions=$(find . -type f -name "*${partition}-p*" | cut -d'/' -f'2-')
 		fi
 	[[ -n "${foundpartitions}" ]] && mv "$(ls "${partition}"-p*)" "${partition}".img
 	done
-elif ${BIN_7ZZ} l -ba "${FILEPATH}" | grep -q "system-sign.img" 2>/dev/null || [[ $(find "${TMPDIR}" -type f -name "system-sign.img" | wc -l) -ge 1 ]]; then
+elif [[ "${FW_LAYOUT}" == "sign" ]]; then
 	printf "Signed Images Detected\n"
 	[[ -f "${FILEPATH}" ]] && ${BIN_7ZZ} x -y "${FILEPATH}" 2>/dev/null >> "${TMPDIR}"/zip.log
 	for f in "${TMPDIR}"/*; do detox -r "${f}"; done
@@ -571,54 +659,42 @@ elif ${BIN_7ZZ} l -ba "${FILEPATH}" | grep -q "system-sign.img" 2>/dev/null || [
 	find "${TMPDIR}" -type f ! -name "*-sign.img" -exec rm -rf {} \;	# delete other files
 	find "${TMPDIR}" -maxdepth 1 -type f -name "*-sign.img" | while read -r i; do mv "${i}" "${i/-sign.img/.img}" 2>/dev/null; done	# proper .img names
 	sign_list=$(find . -maxdepth 1 -type f -name "*.img" | cut -d'/' -f'2-' | sort)
+	# SSSS Headers Carry The Payload Length, BFBF Or Unknown Ones Are 0x4040 Bytes; Cut In Place
 	for file in ${sign_list}; do
-		rm -rf "${TMPDIR}"/x.img >/dev/null 2>&1
-		MAGIC=$(head -c4 "${TMPDIR}"/"${file}" | tr -d '\0')
-		if [[ "${MAGIC}" == "SSSS" ]]; then
-			printf "Cleaning %s with SSSS header\n" "${file}"
-			# This Is For little_endian Arch
-			offset_low=$(od -A n -x -j 60 -N 2 "${TMPDIR}"/"${file}" | sed 's/ //g')
-			offset_high=$(od -A n -x -j 62 -N 2 "${TMPDIR}"/"${file}" | sed 's/ //g')
-			offset_low=0x${offset_low:0-4}
-			offset_high=0x${offset_high:0-4}
-			offset_low=$(printf "%d" "${offset_low}")
-			offset_high=$(printf "%d" "${offset_high}")
-			offset=$((65536*offset_high+offset_low))
-			dd if="${TMPDIR}"/"${file}" of="${TMPDIR}"/x.img iflag=count_bytes,skip_bytes bs=8192 skip=64 count=${offset} >/dev/null 2>&1
-		else	# Header With BFBF Magic Or Another Unknowed Header
-			dd if="${TMPDIR}"/"${file}" of="${TMPDIR}"/x.img bs=$((0x4040)) skip=1 >/dev/null 2>&1
-		fi
+		read -r hdrkind _ < <(python3 "${VENDORHDR}" -s --signed "${TMPDIR}"/"${file}" 2>/dev/null)
+		printf "Cleaning %s with %s header\n" "${file}" "${hdrkind}"
 	done
-elif [[ $(${BIN_7ZZ} l -ba "$FILEPATH" | grep "super.img") ]]; then
+elif [[ "${FW_LAYOUT}" == "super" ]]; then
 	echo "Super Image detected"
-	foundsupers=$(${BIN_7ZZ} l -ba "${FILEPATH}" | gawk '{ print $NF }' | grep "super.img")
+	foundsupers=$(archive_names | grep "super.img")
 	${BIN_7ZZ} e -y "${FILEPATH}" $foundsupers dummypartition 2>/dev/null >> ${TMPDIR}/zip.log
 	superchunk=$(ls | grep chunk | grep super | sort)
 	if [[ $(echo "$superchunk" | grep "sparsechunk") ]]; then
-		"${SIMG2IMG}" $(echo "$superchunk" | tr '\n' ' ') super.img.raw 2>/dev/null
+		# The Sparse Chunks Are Read In Place, No super.img.raw Is Assembled
+		superimage_extract ${superchunk} || exit 1
 		rm -rf *super*chunk*
+	else
+		superimage_extract || exit 1
 	fi
-	superimage_extract || exit 1
-elif [[ $(find "${TMPDIR}" -type f -name "super*.*img" | wc -l) -ge 1 ]]; then
+elif [[ "${FW_LAYOUT}" == "superimg" ]]; then
 	echo "Super Image Detected"
 	if [[ -f "${FILEPATH}" ]]; then
-		foundsupers=$(${BIN_7ZZ} l -ba "${FILEPATH}" | gawk '{print $NF}' | grep "super.*img")
+		foundsupers=$(archive_names | grep "super.*img")
 		${BIN_7ZZ} e -y -- "${FILEPATH}" "${foundsupers}" dummypartition 2>/dev/null >> "${TMPDIR}"/zip.log
 	fi
+	# Split Supers And Sparse Chunks Are Read In Place, No super.img.raw Is Assembled
 	splitsupers=$(ls | grep -oP "super.[0-9].+.img")
+	superchunk=$(find . -maxdepth 1 -type f -name "*super*chunk*" | cut -d'/' -f'2-' | sort)
 	if [[ ! -z "${splitsupers}" ]]; then
-		printf "Creating super.img.raw ...\n"
-		"${SIMG2IMG}" ${splitsupers} super.img.raw 2>/dev/null
+		superimage_extract ${splitsupers} || exit 1
 		rm -rf -- ${splitsupers}
-	fi
-	superchunk=$(find . -maxdepth 1 -type f -name "*super*chunk*" | cut -d'/' -f'2-' | sort)
-	if echo "${superchunk}" | grep -q "sparsechunk"; then
-		printf "Creating super.img.raw ...\n"
-		"${SIMG2IMG}" ${superchunk} super.img.raw 2>/dev/null
+	elif echo "${superchunk}" | grep -q "sparsechunk"; then
+		superimage_extract ${superchunk} || exit 1
 		rm -rf -- *super*chunk*
+	else
+		superimage_extract || exit 1
 	fi
-	superimage_extract || exit 1
-elif ${BIN_7ZZ} l -ba "${FILEPATH}" | grep tar.md5 | gawk '{print $NF}' | grep -q AP_ 2>/dev/null || [[ $(find "${TMPDIR}" -type f -name "*AP_*tar.md5" | wc -l) -ge 1 ]]; then
+elif [[ "${FW_LAYOUT}" == "samsung" ]]; then
 	printf "AP tarmd5 Detected\n"
 	#mv -f "${FILEPATH}" "${TMPDIR}"/
 	[[ -f "${FILEPATH}" ]] && ${BIN_7ZZ} e -y "${FILEPATH}" 2>/dev/null >> "${TMPDIR}"/zip.log
@@ -646,10 +722,14 @@ elif ${BIN_7ZZ} l -ba "${FILEPATH}" | grep tar.md5 | gawk '{print $NF}' | grep -
 		printf "Extract failed\n"
 		rm -rf "${TMPDIR}" && exit 1
 	fi
-elif ${BIN_7ZZ} l -ba "${FILEPATH}" | grep -q payload.bin 2>/dev/null || [[ $(find "${TMPDIR}" -type f -name "payload.bin" | wc -l) -ge 1 ]]; then
+elif [[ "${FW_LAYOUT}" == "payload" ]]; then
 	printf "AB OTA Payload Detected\n"
-	${PAYLOAD_EXTRACTOR} -c "$(nproc --all)" -o "${TMPDIR}" "${FILEPATH}" >/dev/null
-elif ${BIN_7ZZ} l -ba "${FILEPATH}" | grep ".*.rar\|.*.zip\|.*.7z\|.*.tar$" 2>/dev/null || [[ $(find "${TMPDIR}" -type f \( -name "*.rar" -o -name "*.zip" -o -name "*.7z" -o -name "*.tar" \) | wc -l) -ge 1 ]]; then
+	# Read payload.bin Straight From The OTA Zip, Only The Partitions We Dump
+	payloadfile="${FILEPATH}"
+	[[ -f "${payloadfile}" ]] || payloadfile="${TMPDIR}"/payload.bin
+	python3 "${PAYLOAD_EXTRACT}" -j "$(nproc --all)" -o "${TMPDIR}" -p ${PARTITIONS} "${payloadfile}" >/dev/null \
+		|| ${PAYLOAD_EXTRACTOR} -c "$(nproc --all)" -o "${TMPDIR}" "${payloadfile}" >/dev/null
+elif [[ "${FW_LAYOUT}" == "nested" ]]; then
 	printf "Rar/Zip/7Zip/Tar Archived Firmware Detected\n"
 	if [[ -f "${FILEPATH}" ]]; then
 		mkdir -p "${TMPDIR}"/"${UNZIP_DIR}" 2>/dev/null
@@ -667,7 +747,7 @@ elif ${BIN_7ZZ} l -ba "${FILEPATH}" | grep ".*.rar\|.*.zip\|.*.7z\|.*.tar$" 2>/d
 		exit
 	done
 	rm -rf "${TMPDIR:?}"/"${UNZIP_DIR}"
-elif ${BIN_7ZZ} l -ba "${FILEPATH}" | grep -q "UPDATE.APP" 2>/dev/null || [[ $(find "${TMPDIR}" -type f -name "UPDATE.APP") ]]; then
+elif [[ "${FW_LAYOUT}" == "updateapp" ]]; then
 	printf "Huawei UPDATE.APP Detected\n"
 	[[ -f "${FILEPATH}" ]] && ${BIN_7ZZ} x "${FILEPATH}" UPDATE.APP 2>/dev/null >> "${TMPDIR}"/zip.log
 	find "${TMPDIR}" -type f -name "UPDATE.APP" -exec mv {} . \;
@@ -677,12 +757,12 @@ elif ${BIN_7ZZ} l -ba "${FILEPATH}" | grep -q "UPDATE.APP" 2>/dev/null || [[ $(f
 	done )
 	find output/ -type f -name "*.img" -exec mv {} . \;	# Partitions Are Extracted In "output" Folder
 	if [[ -f super.img ]]; then
-		printf "Creating super.img.raw ...\n"
-		"${SIMG2IMG}" super.img super_* super.img.raw 2>/dev/null
-		[[ ! -s super.img.raw && -f super.img ]] && mv super.img super.img.raw
+		# A Sparse super.img May Continue In super_* Images, All Are Read Together
+		superimage_extract super.img $(ls super_* 2>/dev/null) || exit 1
+	else
+		superimage_extract || exit 1
 	fi
-	superimage_extract || exit 1
-elif ${BIN_7ZZ} l -ba "${FILEPATH}" | grep -q "rockchip" 2>/dev/null || [[ $(find "${TMPDIR}" -type f -name "rockchip") ]]; then
+elif [[ "${FW_LAYOUT}" == "rockchip" ]]; then
 	printf "Rockchip Detected\n"
 	${RK_EXTRACT} -unpack "${FILEPATH}" ${TMPDIR}
 	${AFPTOOL_EXTRACT} -unpack ${TMPDIR}/firmware.img ${TMPDIR}
@@ -715,34 +795,35 @@ for otherpartition in ${OTHERPARTITIONS}; do
 	if [[ -f "${output}" ]]; then
 		printf "%s Detected For %s\n" "${output}" "${outname}"
 		[[ ! -e "${TMPDIR}"/"${outname}".img ]] && mv "${output}" "${TMPDIR}"/"${outname}".img
-		"${SIMG2IMG}" "${TMPDIR}"/"${outname}".img "${OUTDIR}"/"${outname}".img 2>/dev/null
-		[[ ! -s "${OUTDIR}"/"${outname}".img && -f "${TMPDIR}"/"${outname}".img ]] && mv "${outname}".img "${OUTDIR}"/"${outname}".img
+		python3 "${SPARSE}" -m "${TMPDIR}"/"${outname}".img "${OUTDIR}"/"${outname}".img 2>/dev/null
 	fi
 done
 
-# Process All partitions From TMPDIR Now
+# Pull Partitions Still Missing From TMPDIR Out Of The Archive In One Pass
+missingparts=()
 for partition in ${PARTITIONS}; do
 	if [[ ! -f "${partition}".img ]]; then
-		foundpart=$(${BIN_7ZZ} l -ba "${FILEPATH}" | gawk '{print $NF}' | grep "${partition}.img" 2>/dev/null)
-		${BIN_7ZZ} e -y -- "${FILEPATH}" "${foundpart}" */"${foundpart}" 2>/dev/null >> "${TMPDIR}"/zip.log
+		readarray -t foundpart < <(archive_names | grep "${partition}.img" 2>/dev/null)
+		missingparts+=("${foundpart[@]}")
 	fi
-	[[ -f "${partition}".img ]] && "${SIMG2IMG}" "${partition}".img "${OUTDIR}"/"${partition}".img 2>/dev/null
-	[[ ! -s "${OUTDIR}"/"${partition}".img && -f "${TMPDIR}"/"${partition}".img ]] && mv "${TMPDIR}"/"${partition}".img "${OUTDIR}"/"${partition}".img
+done
+archive_extract "${missingparts[@]}"
+
+# Process All partitions From TMPDIR Now
+partoffsets=()
+for partition in ${PARTITIONS}; do
+	# Sparse Images Are Unsparsed Into OUTDIR, Raw Ones Are Just Moved There
+	[[ -f "${partition}".img ]] && python3 "${SPARSE}" -m "${partition}".img "${OUTDIR}"/"${partition}".img 2>/dev/null
 	if [[ "${EXT4PARTITIONS}" =~ (^|[[:space:]])"${partition}"($|[[:space:]]) && -f "${OUTDIR}"/"${partition}".img ]]; then
-		MAGIC=$(head -c12 "${OUTDIR}"/"${partition}".img | tr -d '\0')
-		offset=$(LANG=C grep -aobP -m1 '\x53\xEF' "${OUTDIR}"/"${partition}".img | head -1 | gawk '{print $1 - 1080}')
-		if echo "${MAGIC}" | grep -q "MOTO"; then
-			[[ "$offset" == 128055 ]] && offset=131072
-			printf "MOTO header detected on %s in %s\n" "${partition}" "${offset}"
-		elif echo "${MAGIC}" | grep -q "ASUS"; then
-			printf "ASUS header detected on %s in %s\n" "${partition}" "${offset}"
+		# Only Sector Aligned Offsets Near The Start Are Checked For The Superblock
+		read -r hdrkind offset < <(python3 "${VENDORHDR}" "${OUTDIR}"/"${partition}".img 2>/dev/null)
+		if [[ "${hdrkind}" == "MOTO" || "${hdrkind}" == "ASUS" ]]; then
+			printf "%s header detected on %s in %s\n" "${hdrkind}" "${partition}" "${offset}"
 		else
 			offset=0
 		fi
-		if [[ ! "${offset}" == "0" ]]; then
-			dd if="${OUTDIR}"/"${partition}".img of="${OUTDIR}"/"${partition}".img-2 ibs=$offset skip=1 2>/dev/null
-			mv -f "${OUTDIR}"/"${partition}".img-2 "${OUTDIR}"/"${partition}".img
-		fi
+		# The Filesystem Is Read From Its Offset When Extracting, No Copy Of The Image
+		[[ ! "${offset}" == "0" ]] && partoffsets+=(-O "${partition}=${offset}")
 	fi
 	[[ ! -s "${OUTDIR}"/"${partition}".img && -f "${OUTDIR}"/"${partition}".img ]] && rm "${OUTDIR}"/"${partition}".img
 done
@@ -754,27 +835,31 @@ rm -rf "${TMPDIR:?}"/*
 if [[ -f "${OUTDIR}"/boot.img ]]; then
 	# Extract dts
 	mkdir -p "${OUTDIR}"/bootimg "${OUTDIR}"/bootdts 2>/dev/null
-	uvx -q extract-dtb "${OUTDIR}"/boot.img -o "${OUTDIR}"/bootimg >/dev/null
-	find "${OUTDIR}"/bootimg -name '*.dtb' -type f | gawk -F'/' '{print $NF}' | while read -r i; do "${DTC}" -q -s -f -I dtb -O dts -o bootdts/"${i/\.dtb/.dts}" bootimg/"${i}"; done 2>/dev/null
-	bash "${UNPACKBOOT}" "${OUTDIR}"/boot.img "${OUTDIR}"/boot 2>/dev/null
+	python3 "${DTBSCAN}" --dtc "${DTC}" -j "$(nproc --all)" "${OUTDIR}"/boot.img -o "${OUTDIR}"/bootimg -d "${OUTDIR}"/bootdts >/dev/null 2>&1
+	python3 "${BOOTIMG}" "${OUTDIR}"/boot.img "${OUTDIR}"/boot 2>/dev/null
 	printf "Boot extracted\n"
-	# extract-ikconfig
+	# Decompress The Kernel Once For ikconfig, kallsyms-finder And vmlinux-to-elf
 	mkdir -p "${OUTDIR}"/bootRE
-	bash "${EXTRACT_IKCONFIG}" "${OUTDIR}"/boot.img > "${OUTDIR}"/bootRE/ikconfig 2> /dev/null
+	kernel_raw=$(python3 "${KERNELCACHE}" -j "$(nproc --all)" -C "${OUTDIR}"/bootRE "${OUTDIR}"/boot.img 2>/dev/null)
+	kernel_img="${kernel_raw:-${OUTDIR}/boot.img}"
+	# Extract ikconfig And Kernel Version
+	kernel_version=$(python3 "${IKCONFIG}" ${kernel_raw:+--raw} -j "$(nproc --all)" -o "${OUTDIR}"/bootRE/ikconfig "${kernel_img}" 2>/dev/null)
 	[[ ! -s "${OUTDIR}"/bootRE/ikconfig ]] && rm -f "${OUTDIR}"/bootRE/ikconfig 2>/dev/null
 	# vmlinux-to-elf
 	if [[ ! -f "${OUTDIR}"/vendor_boot.img ]]; then
-		python3 "${KALLSYMS_FINDER}" "${OUTDIR}"/boot.img > "${OUTDIR}"/bootRE/boot_kallsyms.txt >/dev/null 2>&1
+		python3 "${KALLSYMS_FINDER}" "${kernel_img}" > "${OUTDIR}"/bootRE/boot_kallsyms.txt >/dev/null 2>&1
 		printf "boot_kallsyms.txt generated\n"
 	else
-		python3 "${KALLSYMS_FINDER}" "${OUTDIR}"/boot/kernel > "${OUTDIR}"/bootRE/kernel_kallsyms.txt >/dev/null 2>&1
+		python3 "${KALLSYMS_FINDER}" "${kernel_img}" > "${OUTDIR}"/bootRE/kernel_kallsyms.txt >/dev/null 2>&1
 		printf "kernel_kallsyms.txt generated\n"
 	fi
-	python3 "${VMLINUX2ELF}" "${OUTDIR}"/boot.img "${OUTDIR}"/bootRE/boot.elf >/dev/null 2>&1
+	python3 "${VMLINUX2ELF}" "${kernel_img}" "${OUTDIR}"/bootRE/boot.elf >/dev/null 2>&1
 	printf "boot.elf generated\n"
+	# The Decompressed Kernel Is Not Part Of The Dump
+	[[ -n "${kernel_raw}" ]] && rm -f "${kernel_raw}"
 	[[ -f "${OUTDIR}"/boot/dtb.img ]] && {
 		mkdir -p "${OUTDIR}"/dtbimg 2>/dev/null
-		uvx -q extract-dtb "${OUTDIR}"/boot/dtb.img -o "${OUTDIR}"/dtbimg >/dev/null
+		python3 "${DTBSCAN}" "${OUTDIR}"/boot/dtb.img -o "${OUTDIR}"/dtbimg >/dev/null 2>&1
 	}
 fi
 
@@ -782,9 +867,8 @@ fi
 if [[ -f "${OUTDIR}"/vendor_boot.img ]]; then
 	# Extract dts
 	mkdir -p "${OUTDIR}"/vendor_bootimg "${OUTDIR}"/vendor_bootdts 2>/dev/null
-	uvx -q extract-dtb "${OUTDIR}"/vendor_boot.img -o "${OUTDIR}"/vendor_bootimg >/dev/null
-	find "${OUTDIR}"/vendor_bootimg -name '*.dtb' -type f | gawk -F'/' '{print $NF}' | while read -r i; do "${DTC}" -q -s -f -I dtb -O dts -o vendor_bootdts/"${i/\.dtb/.dts}" vendor_bootimg/"${i}"; done 2>/dev/null
-	bash "${UNPACKBOOT}" "${OUTDIR}"/vendor_boot.img "${OUTDIR}"/vendor_boot 2>/dev/null
+	python3 "${DTBSCAN}" --dtc "${DTC}" -j "$(nproc --all)" "${OUTDIR}"/vendor_boot.img -o "${OUTDIR}"/vendor_bootimg -d "${OUTDIR}"/vendor_bootdts >/dev/null 2>&1
+	python3 "${BOOTIMG}" "${OUTDIR}"/vendor_boot.img "${OUTDIR}"/vendor_boot 2>/dev/null
 	printf "Vendor Boot extracted\n"
 	# extract-ikconfig
 	mkdir -p "${OUTDIR}"/vendor_bootRE
@@ -793,65 +877,27 @@ if [[ -f "${OUTDIR}"/vendor_boot.img ]]; then
 	printf "vendor_boot.elf generated\n"
 	[[ -f "${OUTDIR}"/vendor_boot/dtb.img ]] && {
 		mkdir -p "${OUTDIR}"/vendor_dtbimg 2>/dev/null
-		uvx -q extract-dtb "${OUTDIR}"/vendor_boot/dtb.img -o "${OUTDIR}"/vendor_dtbimg >/dev/null
+		python3 "${DTBSCAN}" "${OUTDIR}"/vendor_boot/dtb.img -o "${OUTDIR}"/vendor_dtbimg >/dev/null 2>&1
 	}
 fi
 
 # Extract recovery.img
 if [[ -f "${OUTDIR}"/recovery.img ]]; then
-	bash "${UNPACKBOOT}" "${OUTDIR}"/recovery.img "${OUTDIR}"/recovery 2>/dev/null
+	python3 "${BOOTIMG}" "${OUTDIR}"/recovery.img "${OUTDIR}"/recovery 2>/dev/null
 	printf "Recovery extracted\n"
 fi
 
 # Extract dtbo
 if [[ -f "${OUTDIR}"/dtbo.img ]]; then
 	mkdir -p "${OUTDIR}"/dtbo "${OUTDIR}"/dtbodts 2>/dev/null
-	uvx -q extract-dtb "${OUTDIR}"/dtbo.img -o "${OUTDIR}"/dtbo >/dev/null
-	find "${OUTDIR}"/dtbo -name '*.dtb' -type f | gawk -F'/' '{print $NF}' | while read -r i; do "${DTC}" -q -s -f -I dtb -O dts -o dtbodts/"${i/\.dtb/.dts}" dtbo/"${i}"; done 2>/dev/null
+	python3 "${DTBSCAN}" --dtc "${DTC}" -j "$(nproc --all)" "${OUTDIR}"/dtbo.img -o "${OUTDIR}"/dtbo -d "${OUTDIR}"/dtbodts >/dev/null 2>&1
 	printf "dtbo extracted\n"
 fi
 
-# Extract Partitions
-for p in $PARTITIONS; do
-	if ! echo "${p}" | grep -q "boot\|recovery\|dtbo\|vendor_boot\|tz"; then
-		if [[ -e "$p.img" ]]; then
-			mkdir "$p" 2> /dev/null || rm -rf "${p:?}"/*
-			echo "Extracting $p partition..."
-			${BIN_7ZZ} x -snld "$p".img -y -o"$p"/ > /dev/null 2>&1
-			if [ $? -eq 0 ]; then
-				rm "$p".img > /dev/null 2>&1
-			else
-				# Handling EROFS Images, which can't be handled by 7z.
-				echo "Extraction Failed my 7z"
-				if [ -f $p.img ] && [ $p != "modem" ]; then
-					echo "Couldn't extract $p partition by 7z. Using fsck.erofs."
-					rm -rf "${p}"/*
-					"${FSCK_EROFS}" --extract="$p" "$p".img
-					if [ $? -eq 0 ]; then
-						rm -fv "$p".img > /dev/null 2>&1
-					else
-						echo "Couldn't extract $p partition by fsck.erofs. Using mount loop"
-						sudo mount -o loop -t auto "$p".img "$p"
-						mkdir "${p}_"
-						sudo cp -rf "${p}/"* "${p}_"
-						sudo umount "${p}"
-						sudo cp -rf "${p}_/"* "${p}"
-						sudo rm -rf "${p}_"
-						sudo chown -R "$(whoami)" "${p}"/*
-						chmod -R u+rwX "${p}"/*
-						if [ $? -eq 0 ]; then
-							rm -fv "$p".img > /dev/null 2>&1
-						else
-							echo "Couldn't extract $p partition. It might use an unsupported filesystem."
-							echo "For EROFS: make sure you're using Linux 5.4+ kernel."
-							echo "For F2FS: make sure you're using Linux 5.15+ kernel."
-						fi
-					fi
-				fi
-			fi
-		fi
-	fi
-done
+# Extract Partitions, Several At Once; Oppo/Realme Devices Have Some Images In A Euclid Folder In Their Vendor and/or System, Those Are Extracted Too For Props
+# Per Partition Logs And Their Exit Status Are Kept In "${LOGDIR}"/partlogs, Outside Of OUTDIR
+rm -rf "${LOGDIR:?}"/partlogs 2>/dev/null
+python3 "${PARTEXTRACT}" -j "$(nproc --all)" -L "${LOGDIR}"/partlogs --7zz "${BIN_7ZZ}" --fsck-erofs "${FSCK_EROFS}" "${partoffsets[@]}" ${PARTITIONS}
 
 # Remove Unnecessary Image Leftover From OUTDIR
 for q in *.img; do
@@ -860,123 +906,14 @@ for q in *.img; do
 	fi
 done
 
-# Oppo/Realme Devices Have Some Images In A Euclid Folder In Their Vendor and/or System, Extract Those For Props
-for dir in "vendor/euclid" "system/system/euclid"; do
-	if [[ -d "${dir}" ]]; then
-		pushd "${dir}" || exit 1
-		for f in *.img; do
-			[[ -f "${f}" ]] || continue
-			${BIN_7ZZ} x "${f}" -o"${f/.img/}"
-			rm -f "${f}"
-		done
-		popd || exit 1
-	fi
-done
-
 # board-info.txt
-find "${OUTDIR}"/modem -type f -exec strings {} \; 2>/dev/null | grep "QC_IMAGE_VERSION_STRING=MPSS." | sed "s|QC_IMAGE_VERSION_STRING=MPSS.||g" | cut -c 4- | sed -e 's/^/require version-baseband=/' >> "${TMPDIR}"/board-info.txt
-find "${OUTDIR}"/tz* -type f -exec strings {} \; 2>/dev/null | grep "QC_IMAGE_VERSION_STRING" | sed "s|QC_IMAGE_VERSION_STRING|require version-trustzone|g" >> "${TMPDIR}"/board-info.txt
-if [ -e "${OUTDIR}"/vendor/build.prop ]; then
-	strings "${OUTDIR}"/vendor/build.prop | grep "ro.vendor.build.date.utc" | sed "s|ro.vendor.build.date.utc|require version-vendor|g" >> "${TMPDIR}"/board-info.txt
-fi
-sort -u < "${TMPDIR}"/board-info.txt > "${OUTDIR}"/board-info.txt
+python3 "${VERSCAN}" -o "${OUTDIR}"/board-info.txt --modem "${OUTDIR}"/modem --tz "${OUTDIR}"/tz* --vendor-prop "${OUTDIR}"/vendor/build.prop >/dev/null
 
 # set variables
 [[ $(find "$(pwd)"/system "$(pwd)"/system/system "$(pwd)"/vendor "$(pwd)"/*product -maxdepth 1 -type f -name "build*.prop" 2>/dev/null | sort -u | gawk '{print $NF}') ]] || { printf "No system/vendor/product build*.prop found, pushing cancelled.\n" && exit 1; }
 
-flavor=$(grep -m1 -oP "(?<=^ro.build.flavor=).*" -hs {system,system/system,vendor}/build*.prop)
-[[ -z "${flavor}" ]] && flavor=$(grep -m1 -oP "(?<=^ro.vendor.build.flavor=).*" -hs vendor/build*.prop)
-[[ -z "${flavor}" ]] && flavor=$(grep -m1 -oP "(?<=^ro.system.build.flavor=).*" -hs {system,system/system}/build*.prop)
-[[ -z "${flavor}" ]] && flavor=$(grep -m1 -oP "(?<=^ro.build.type=).*" -hs {system,system/system}/build*.prop)
-release=$(grep -m1 -oP "(?<=^ro.build.version.release=).*" -hs {system,system/system,vendor}/build*.prop)
-[[ -z "${release}" ]] && release=$(grep -m1 -oP "(?<=^ro.vendor.build.version.release=).*" -hs vendor/build*.prop)
-[[ -z "${release}" ]] && release=$(grep -m1 -oP "(?<=^ro.system.build.version.release=).*" -hs {system,system/system}/build*.prop)
-id=$(grep -m1 -oP "(?<=^ro.build.id=).*" -hs {system,system/system,vendor}/build*.prop)
-[[ -z "${id}" ]] && id=$(grep -m1 -oP "(?<=^ro.vendor.build.id=).*" -hs vendor/build*.prop)
-[[ -z "${id}" ]] && id=$(grep -m1 -oP "(?<=^ro.system.build.id=).*" -hs {system,system/system}/build*.prop)
-tags=$(grep -m1 -oP "(?<=^ro.build.tags=).*" -hs {system,system/system,vendor}/build*.prop)
-[[ -z "${tags}" ]] && tags=$(grep -m1 -oP "(?<=^ro.vendor.build.tags=).*" -hs vendor/build*.prop)
-[[ -z "${tags}" ]] && tags=$(grep -m1 -oP "(?<=^ro.system.build.tags=).*" -hs {system,system/system}/build*.prop)
-platform=$(grep -m1 -oP "(?<=^ro.board.platform=).*" -hs {system,system/system,vendor}/build*.prop | head -1)
-[[ -z "${platform}" ]] && platform=$(grep -m1 -oP "(?<=^ro.vendor.board.platform=).*" -hs vendor/build*.prop)
-[[ -z "${platform}" ]] && platform=$(grep -m1 -oP "(?<=^ro.system.board.platform=).*" -hs {system,system/system}/build*.prop)
-manufacturer=$(grep -m1 -oP "(?<=^ro.product.manufacturer=).*" -hs {system,system/system,vendor}/build*.prop | head -1)
-[[ -z "${manufacturer}" ]] && manufacturer=$(grep -m1 -oP "(?<=^ro.product.brand.sub=).*" -hs system/system/euclid/my_product/build*.prop)
-[[ -z "${manufacturer}" ]] && manufacturer=$(grep -m1 -oP "(?<=^ro.vendor.product.manufacturer=).*" -hs vendor/build*.prop | head -1)
-[[ -z "${manufacturer}" ]] && manufacturer=$(grep -m1 -oP "(?<=^ro.product.vendor.manufacturer=).*" -hs vendor/build*.prop | head -1)
-[[ -z "${manufacturer}" ]] && manufacturer=$(grep -m1 -oP "(?<=^ro.system.product.manufacturer=).*" -hs {system,system/system}/build*.prop)
-[[ -z "${manufacturer}" ]] && manufacturer=$(grep -m1 -oP "(?<=^ro.product.system.manufacturer=).*" -hs {system,system/system}/build*.prop)
-[[ -z "${manufacturer}" ]] && manufacturer=$(grep -m1 -oP "(?<=^ro.product.odm.manufacturer=).*" -hs vendor/odm/etc/build*.prop)
-[[ -z "${manufacturer}" ]] && manufacturer=$(grep -m1 -oP "(?<=^ro.product.manufacturer=).*" -hs {oppo_product,my_product,product}/build*.prop | head -1)
-[[ -z "${manufacturer}" ]] && manufacturer=$(grep -m1 -oP "(?<=^ro.product.manufacturer=).*" -hs vendor/euclid/*/build.prop)
-[[ -z "${manufacturer}" ]] && manufacturer=$(grep -m1 -oP "(?<=^ro.system.product.manufacturer=).*" -hs vendor/euclid/*/build.prop)
-[[ -z "${manufacturer}" ]] && manufacturer=$(grep -m1 -oP "(?<=^ro.product.product.manufacturer=).*" -hs vendor/euclid/product/build*.prop)
-[[ -z "${manufacturer}" ]] && manufacturer=$(grep -m1 -oP "(?<=^ro.product.vendor.manufacturer=).*" -hs vendor/build*.prop)
-[[ -z "${manufacturer}" ]] && manufacturer=$(grep -m1 -oP "(?<=^ro.product.system.manufacturer=).*" -hs {system,system/system}/build*.prop)
-fingerprint=$(grep -m1 -oP "(?<=^ro.build.fingerprint=).*" -hs {system,system/system}/build*.prop)
-[[ -z "${fingerprint}" ]] && fingerprint=$(grep -m1 -oP "(?<=^ro.vendor.build.fingerprint=).*" -hs vendor/build*.prop | head -1)
-[[ -z "${fingerprint}" ]] && fingerprint=$(grep -m1 -oP "(?<=^ro.system.build.fingerprint=).*" -hs {system,system/system}/build*.prop)
-[[ -z "${fingerprint}" ]] && fingerprint=$(grep -m1 -oP "(?<=^ro.product.build.fingerprint=).*" -hs product/build*.prop)
-[[ -z "${fingerprint}" ]] && fingerprint=$(grep -m1 -oP "(?<=^ro.build.fingerprint=).*" -hs {oppo_product,my_product}/build*.prop)
-[[ -z "${fingerprint}" ]] && fingerprint=$(grep -m1 -oP "(?<=^ro.system.build.fingerprint=).*" -hs my_product/build.prop)
-[[ -z "${fingerprint}" ]] && fingerprint=$(grep -m1 -oP "(?<=^ro.vendor.build.fingerprint=).*" -hs my_product/build.prop)
-[[ -z "${fingerprint}" ]] && fingerprint=$(grep -m1 -oP "(?<=^ro.bootimage.build.fingerprint=).*" -hs vendor/build.prop)
-brand=$(grep -m1 -oP "(?<=^ro.product.brand=).*" -hs {system,system/system,vendor}/build*.prop | head -1)
-[[ -z "${brand}" ]] && brand=$(grep -m1 -oP "(?<=^ro.product.brand.sub=).*" -hs system/system/euclid/my_product/build*.prop)
-[[ -z "${brand}" ]] && brand=$(grep -m1 -oP "(?<=^ro.product.vendor.brand=).*" -hs vendor/build*.prop | head -1)
-[[ -z "${brand}" ]] && brand=$(grep -m1 -oP "(?<=^ro.vendor.product.brand=).*" -hs vendor/build*.prop | head -1)
-[[ -z "${brand}" ]] && brand=$(grep -m1 -oP "(?<=^ro.product.system.brand=).*" -hs {system,system/system}/build*.prop | head -1)
-[[ -z "${brand}" || ${brand} == "OPPO" ]] && brand=$(grep -m1 -oP "(?<=^ro.product.system.brand=).*" -hs vendor/euclid/*/build.prop | head -1)
-[[ -z "${brand}" ]] && brand=$(grep -m1 -oP "(?<=^ro.product.product.brand=).*" -hs vendor/euclid/product/build*.prop)
-[[ -z "${brand}" ]] && brand=$(grep -m1 -oP "(?<=^ro.product.odm.brand=).*" -hs vendor/odm/etc/build*.prop)
-[[ -z "${brand}" ]] && brand=$(grep -m1 -oP "(?<=^ro.product.brand=).*" -hs {oppo_product,my_product}/build*.prop | head -1)
-[[ -z "${brand}" ]] && brand=$(grep -m1 -oP "(?<=^ro.product.brand=).*" -hs vendor/euclid/*/build.prop | head -1)
-[[ -z "${brand}" ]] && brand=$(echo "$fingerprint" | cut -d'/' -f1)
-codename=$(grep -m1 -oP "(?<=^ro.product.device=).*" -hs {vendor,system,system/system}/build*.prop | head -1)
-[[ -z "${codename}" ]] && codename=$(grep -m1 -oP "(?<=^ro.vendor.product.device.oem=).*" -hs vendor/euclid/odm/build.prop | head -1)
-[[ -z "${codename}" ]] && codename=$(grep -m1 -oP "(?<=^ro.product.vendor.device=).*" -hs vendor/build*.prop | head -1)
-[[ -z "${codename}" ]] && codename=$(grep -m1 -oP "(?<=^ro.vendor.product.device=).*" -hs vendor/build*.prop | head -1)
-[[ -z "${codename}" ]] && codename=$(grep -m1 -oP "(?<=^ro.product.system.device=).*" -hs {system,system/system}/build*.prop | head -1)
-[[ -z "${codename}" ]] && codename=$(grep -m1 -oP "(?<=^ro.product.system.device=).*" -hs vendor/euclid/*/build.prop | head -1)
-[[ -z "${codename}" ]] && codename=$(grep -m1 -oP "(?<=^ro.product.product.device=).*" -hs vendor/euclid/*/build.prop | head -1)
-[[ -z "${codename}" ]] && codename=$(grep -m1 -oP "(?<=^ro.product.product.model=).*" -hs vendor/euclid/*/build.prop | head -1)
-[[ -z "${codename}" ]] && codename=$(grep -m1 -oP "(?<=^ro.product.device=).*" -hs {oppo_product,my_product}/build*.prop | head -1)
-[[ -z "${codename}" ]] && codename=$(grep -m1 -oP "(?<=^ro.product.product.device=).*" -hs oppo_product/build*.prop)
-[[ -z "${codename}" ]] && codename=$(grep -m1 -oP "(?<=^ro.product.system.device=).*" -hs my_product/build*.prop)
-[[ -z "${codename}" ]] && codename=$(grep -m1 -oP "(?<=^ro.product.vendor.device=).*" -hs my_product/build*.prop)
-[[ -z "${codename}" ]] && codename=$(echo "$fingerprint" | cut -d'/' -f3 | cut -d':' -f1)
-[[ -z "${codename}" ]] && codename=$(grep -m1 -oP "(?<=^ro.build.fota.version=).*" -hs {system,system/system}/build*.prop | cut -d'-' -f1 | head -1)
-[[ -z "${codename}" ]] && codename=$(grep -oP "(?<=^ro.build.product=).*" -hs {vendor,system,system/system}/build*.prop | head -1)
-description=$(grep -m1 -oP "(?<=^ro.build.description=).*" -hs {system,system/system,vendor}/build*.prop | head -1)
-[[ -z "${description}" ]] && description=$(grep -m1 -oP "(?<=^ro.vendor.build.description=).*" -hs vendor/build*.prop)
-[[ -z "${description}" ]] && description=$(grep -m1 -oP "(?<=^ro.system.build.description=).*" -hs {system,system/system}/build*.prop)
-[[ -z "${description}" ]] && description=$(grep -m1 -oP "(?<=^ro.product.build.description=).*" -hs product/build.prop)
-[[ -z "${description}" ]] && description=$(grep -m1 -oP "(?<=^ro.product.build.description=).*" -hs product/build*.prop)
-incremental=$(grep -m1 -oP "(?<=^ro.build.version.incremental=).*" -hs {system,system/system,vendor}/build*.prop | head -1)
-[[ -z "${incremental}" ]] && incremental=$(grep -m1 -oP "(?<=^ro.vendor.build.version.incremental=).*" -hs vendor/build*.prop)
-[[ -z "${incremental}" ]] && incremental=$(grep -m1 -oP "(?<=^ro.system.build.version.incremental=).*" -hs {system,system/system}/build*.prop | head -1)
-[[ -z "${incremental}" ]] && incremental=$(grep -m1 -oP "(?<=^ro.build.version.incremental=).*" -hs my_product/build*.prop)
-[[ -z "${incremental}" ]] && incremental=$(grep -m1 -oP "(?<=^ro.system.build.version.incremental=).*" -hs my_product/build*.prop)
-[[ -z "${incremental}" ]] && incremental=$(grep -m1 -oP "(?<=^ro.vendor.build.version.incremental=).*" -hs my_product/build*.prop)
-# For Realme devices with empty incremental & fingerprint,
-[[ -z "${incremental}" && "${brand}" =~ "realme" ]] && incremental=$(grep -m1 -oP "(?<=^ro.build.version.ota=).*" -hs {vendor/euclid/product,oppo_product}/build.prop | rev | cut -d'_' -f'1-2' | rev)
-[[ -z "${incremental}" && ! -z "${description}" ]] && incremental=$(echo "${description}" | cut -d' ' -f4)
-[[ -z "${description}" && ! -z "${incremental}" ]] && description="${flavor} ${release} ${id} ${incremental} ${tags}"
-[[ -z "${description}" && -z "${incremental}" ]] && description="${codename}"
-abilist=$(grep -m1 -oP "(?<=^ro.product.cpu.abilist=).*" -hs {system,system/system}/build*.prop | head -1)
-[[ -z "${abilist}" ]] && abilist=$(grep -m1 -oP "(?<=^ro.vendor.product.cpu.abilist=).*" -hs vendor/build*.prop)
-locale=$(grep -m1 -oP "(?<=^ro.product.locale=).*" -hs {system,system/system}/build*.prop | head -1)
-[[ -z "${locale}" ]] && locale=undefined
-density=$(grep -m1 -oP "(?<=^ro.sf.lcd_density=).*" -hs {system,system/system}/build*.prop | head -1)
-[[ -z "${density}" ]] && density=undefined
-is_ab=$(grep -m1 -oP "(?<=^ro.build.ab_update=).*" -hs {system,system/system,vendor}/build*.prop)
-[[ -z "${is_ab}" ]] && is_ab="false"
-treble_support=$(grep -m1 -oP "(?<=^ro.treble.enabled=).*" -hs {system,system/system}/build*.prop)
-[[ -z "${treble_support}" ]] && treble_support="false"
-otaver=$(grep -m1 -oP "(?<=^ro.build.version.ota=).*" -hs {vendor/euclid/product,oppo_product,system,system/system}/build*.prop | head -1)
-[[ ! -z "${otaver}" && -z "${fingerprint}" ]] && branch=$(echo "${otaver}" | tr ' ' '-')
-[[ -z "${otaver}" ]] && otaver=$(grep -m1 -oP "(?<=^ro.build.fota.version=).*" -hs {system,system/system}/build*.prop | head -1)
-[[ -z "${branch}" ]] && branch=$(echo "${description}" | tr ' ' '-')
+# Resolve Device Details From All build*.prop In One Pass, Following The Same Fallback Order
+eval "$(python3 "${PROPRESOLVE}" -C "${OUTDIR}" --shell)"
 
 if [[ "$PUSH_TO_GITLAB" = true ]]; then
 	rm -rf .github_token
@@ -989,7 +926,6 @@ fi
 platform=$(echo "${platform}" | tr '[:upper:]' '[:lower:]' | tr -dc '[:print:]' | tr '_' '-' | cut -c 1-35)
 top_codename=$(echo "${codename}" | tr '[:upper:]' '[:lower:]' | tr -dc '[:print:]' | tr '_' '-' | cut -c 1-35)
 manufacturer=$(echo "${manufacturer}" | tr '[:upper:]' '[:lower:]' | tr -dc '[:print:]' | tr '_' '-' | cut -c 1-35)
-[ -f "bootRE/ikconfig" ] && kernel_version=$(cat bootRE/ikconfig | grep "Kernel Configuration" | head -1 | awk '{print $3}')
 # Repo README File
 printf "## %s\n- Manufacturer: %s\n- Platform: %s\n- Codename: %s\n- Brand: %s\n- Flavor: %s\n- Release Version: %s\n- Kernel Version: %s\n- Id: %s\n- Incremental: %s\n- Tags: %s\n- CPU Abilist: %s\n- A/B Device: %s\n- Treble Device: %s\n- Locale: %s\n- Screen Density: %s\n- Fingerprint: %s\n- OTA version: %s\n- Branch: %s\n- Repo: %s\n" "${description}" "${manufacturer}" "${platform}" "${codename}" "${brand}" "${flavor}" "${release}" "${kernel_version}" "${id}" "${incremental}" "${tags}" "${abilist}" "${is_ab}" "${treble_support}" "${locale}" "${density}" "${fingerprint}" "${otaver}" "${branch}" "${repo}" > "${OUTDIR}"/README.md
 cat "${OUTDIR}"/README.md
@@ -1035,52 +971,6 @@ if [[ "$treble_support" = true ]]; then
         find "$OUTDIR" -type f -printf '%P\n' | sort | grep -v ".git/" > "$OUTDIR"/all_files.txt
 fi
 
-# Generate Files having the sha1sum values of the Blobs
-function write_sha1sum(){
-	# Usage: write_sha1sum <file> <destination_file>
-
-	local SRC_FILE=$1
-	local DST_FILE=$2
-
-	# Temporary file
-	local TMP_FILE=${SRC_FILE}.sha1sum.tmp
-	
-	# Get rid of all the Blank lines and Comments
-	( cat ${SRC_FILE} | grep -v '^[[:space:]]*$' | grep -v "# " ) > ${TMP_FILE}
-
-	# Append the sha1sum of blobs in the Destination File
-	cp ${SRC_FILE} ${DST_FILE}
-	cat ${TMP_FILE} | while read -r i; do {
-		local BLOB=${i}
-
-		# Do we have a "-" before the blob's path? If yes, then remove it
-		local BLOB_TOPDIR=$(echo ${BLOB} | cut -d / -f1)
-		[ "${BLOB_TOPDIR:0:1}" = "-" ] && local BLOB=${BLOB_TOPDIR/-/}/${BLOB/${BLOB_TOPDIR}\//}
-
-		# Is it a non- /vendor blob?
-		[ ! -e "${BLOB}" ] && {
-			# for system libs, bins etc.
-			if [ -e "system/${BLOB}" ]; then
-				local BLOB="system/${BLOB}"
-			# for system-as-root system libs, bins etc.
-			elif [ -e "system/system/${BLOB}" ]; then
-				local BLOB="system/system/${BLOB}"
-			fi
-		}
-		local SHA1=$(sha1sum ${BLOB} | gawk '{print $1}')
-
-		local BLOB=${i} # Switch back to the Original Blob's name
-		local ORG_EXP="${BLOB}"
-		local FINAL_EXP="${BLOB}|${SHA1}"
-
-		# Append the |sha1sum
-		sed -i "s:${ORG_EXP}$:${FINAL_EXP}:g" "${DST_FILE}"
-	}; done
-
-	# Delete the Temporary file
-	rm ${TMP_FILE}
-}
-
 # Generate proprietary-files.txt
 printf "Generating proprietary-files.txt...\n"
 bash "${UTILSDIR}"/android_tools/tools/proprietary-files.sh "${OUTDIR}"/all_files.txt >/dev/null
@@ -1090,7 +980,7 @@ cat "${UTILSDIR}"/android_tools/working/proprietary-files.txt >> "${OUTDIR}"/pro
 # Generate proprietary-files.sha1
 printf "Generating proprietary-files.sha1...\n"
 printf "# All blobs are from \"%s\" and are pinned with sha1sum values\n" "${description}" > "${OUTDIR}"/proprietary-files.sha1
-write_sha1sum ${UTILSDIR}/android_tools/working/proprietary-files.{txt,sha1}
+python3 "${BLOBSHA1}" -C "${OUTDIR}" "${UTILSDIR}"/android_tools/working/proprietary-files.{txt,sha1}
 cat "${UTILSDIR}"/android_tools/working/proprietary-files.sha1 >> "${OUTDIR}"/proprietary-files.sha1
 
 # Stash the changes done at ${UTILSDIR}/android_tools
@@ -1099,7 +989,7 @@ git -C "${UTILSDIR}"/android_tools/ stash
 
 # Generate all_files.sha1
 printf "Generating all_files.sha1...\n"
-write_sha1sum "$OUTDIR"/all_files.{txt,sha1.tmp}
+python3 "${BLOBSHA1}" -C "${OUTDIR}" "$OUTDIR"/all_files.{txt,sha1.tmp}
 ( cat "$OUTDIR"/all_files.sha1.tmp | grep -v all_files.txt ) > "$OUTDIR"/all_files.sha1		# all_files.txt will be regenerated
 rm -rf "$OUTDIR"/all_files.sha1.tmp
 
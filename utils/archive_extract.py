@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+
+# Extract many members of a firmware archive in a single pass
+#
+# Every wanted member is given up front as a 7-Zip style wildcard. Zips have
+# their central directory read once and the matching members are inflated
+# concurrently, one ZipFile per worker process; stored members are copied
+# in kernel with copy_file_range. Other formats go through one "7zz e".
+# Output is flattened into the output directory like "7zz e" does.
+
+import os
+import sys
+import zlib
+import shutil
+import struct
+import zipfile
+import fnmatch
+import argparse
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+
+buffer_size = 1 << 20
+
+_local = struct.Struct("<4s5H3L2H")
+
+def matches(name, patterns):
+    """7-Zip style match, wildcards do not cross path separators"""
+    parts = name.split("/")
+    for pattern in patterns:
+        pparts = pattern.split("/")
+        if len(pparts) == len(parts) and all(fnmatch.fnmatchcase(n, p) for n, p in zip(parts, pparts)):
+            return True
+    return False
+
+# Per worker process state, set up once by init_worker
+_archive = None
+_path = None
+
+def init_worker(path):
+    global _archive, _path
+    _path = path
+    _archive = zipfile.ZipFile(path)
+
+def data_offset(info):
+    with open(_path, "rb") as f:
+        f.seek(info.header_offset)
+        (sig, _, _, _, _, _, _, _, _, nlen, elen) = _local.unpack(f.read(_local.size))
+    if sig != b"PK\x03\x04":
+        raise zipfile.BadZipFile("bad local header for {}".format(info.filename))
+    return info.header_offset + _local.size + nlen + elen
+
+def extract_member(name, outdir):
+    info = _archive.getinfo(name)
+    target = os.path.join(outdir, os.path.basename(name))
+    if info.compress_type == zipfile.ZIP_STORED and info.flag_bits & 0x1 == 0:
+        src = data_offset(info)
+        with open(_path, "rb") as fin, open(target, "wb") as fout:
+            left = info.file_size
+            dst = 0
+            while left > 0:
+                try:
+                    done = os.copy_file_range(fin.fileno(), fout.fileno(), min(left, 1 << 30), src, dst)
+                except (AttributeError, OSError):
+                    data = os.pread(fin.fileno(), min(left, buffer_size), src)
+                    done = os.pwrite(fout.fileno(), data, dst) if data else 0
+                if done == 0:
+                    break
+                src += done
+                dst += done
+                left -= done
+        if left:
+            raise zipfile.BadZipFile("{} is truncated".format(name))
+        # The copy never passed through zipfile, check the CRC it would have
+        crc = 0
+        with open(target, "rb") as f:
+            for block in iter(lambda: f.read(buffer_size), b""):
+                crc = zlib.crc32(block, crc)
+        if crc != info.CRC:
+            raise zipfile.BadZipFile("bad CRC-32 for {}".format(name))
+    else:
+        with _archive.open(info) as fin, open(target, "wb") as fout:
+            shutil.copyfileobj(fin, fout, buffer_size)
+    return name
+
+def extract_zip(path, patterns, outdir, jobs):
+    with zipfile.ZipFile(path) as archive:
+        # Members flattened onto the same name would race, keep the one 7zz
+        # leaves behind: the last in the archive
+        last = {}
+        for info in archive.infolist():
+            if not info.is_dir() and matches(info.filename, patterns):
+                last[os.path.basename(info.filename)] = info
+        wanted = list(last.values())
+    # Largest first so one big image does not end up last in the queue
+    wanted.sort(key=lambda i: i.file_size, reverse=True)
+    if not wanted:
+        return []
+    with ProcessPoolExecutor(max_workers=max(1, min(jobs, len(wanted))),
+                             initializer=init_worker, initargs=(path,)) as pool:
+        return list(pool.map(extract_member, [i.filename for i in wanted], [outdir] * len(wanted)))
+
+def extract_7z(path, patterns, outdir, bin_7zz):
+    cmd = [bin_7zz, "e", "-y", "-o" + outdir, "--", path] + list(patterns)
+    return subprocess.run(cmd).returncode
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract matching archive members in one pass")
+    parser.add_argument("archive", help="archive to read")
+    parser.add_argument("patterns", nargs="+", help="members to extract, 7-Zip wildcards")
+    parser.add_argument("-o", "--outdir", default=".", help="output directory (default: %(default)s)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="parallel members for zips (default: %(default)s)")
+    parser.add_argument("--7zz", dest="bin_7zz", default=os.environ.get("BIN_7ZZ", "7zz"),
+                        help="7-Zip binary for non-zip archives (default: %(default)s)")
+    args = parser.parse_args()
+
+    os.makedirs(args.outdir, exist_ok=True)
+    if zipfile.is_zipfile(args.archive):
+        try:
+            for name in extract_zip(args.archive, args.patterns, args.outdir, args.jobs):
+                print("- {}".format(name))
+            return 0
+        except (zipfile.BadZipFile, NotImplementedError, RuntimeError) as e:
+            # Encrypted members, Deflate64 and friends are left to 7-Zip
+            print("[!] {}, falling back to 7zz".format(e), file=sys.stderr)
+    return extract_7z(args.archive, args.patterns, args.outdir, args.bin_7zz)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+
+# List a firmware archive once
+#
+# Zips are read with zipfile, anything else through a single
+# "7zz l -slt -ba". Each member is reported with its name, size, compressed
+# size, method and offset (where the format has one). With --cache the
+# listing is kept on disk keyed by path, size and mtime, so repeated lookups
+# on a multi-GB archive do not rescan its directory.
+
+import os
+import sys
+import json
+import hashlib
+import zipfile
+import argparse
+import subprocess
+
+zip_methods = {
+    zipfile.ZIP_STORED: "Store",
+    zipfile.ZIP_DEFLATED: "Deflate",
+    zipfile.ZIP_BZIP2: "BZip2",
+    zipfile.ZIP_LZMA: "LZMA",
+    9: "Deflate64",
+    93: "ZSTD",
+}
+
+def list_zip(path):
+    with zipfile.ZipFile(path) as archive:
+        return [{
+            "name": info.filename.rstrip("/"),
+            "size": info.file_size,
+            "csize": info.compress_size,
+            "method": zip_methods.get(info.compress_type, str(info.compress_type)),
+            "offset": info.header_offset,
+            "dir": info.is_dir(),
+        } for info in archive.infolist()]
+
+def list_7z(path, bin_7zz="7zz"):
+    out = subprocess.run([bin_7zz, "l", "-slt", "-ba", "--", path],
+                         stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True).stdout
+    members = []
+    entry = {}
+    for line in out.decode("utf-8", "surrogateescape").splitlines() + [""]:
+        if not line.strip():
+            if "Path" in entry:
+                members.append({
+                    "name": entry["Path"],
+                    "size": int(entry.get("Size") or 0),
+                    "csize": int(entry.get("Packed Size") or 0),
+                    "method": entry.get("Method", ""),
+                    "offset": int(entry["Offset"]) if entry.get("Offset", "").isdigit() else None,
+                    "dir": entry.get("Folder") == "+" or "D" in entry.get("Attributes", "")[:1],
+                })
+            entry = {}
+            continue
+        key, sep, value = line.partition(" = ")
+        if sep:
+            entry[key] = value
+    return members
+
+def cache_file(cache_dir, path):
+    st = os.stat(path)
+    key = "{}\0{}\0{}".format(os.path.realpath(path), st.st_size, st.st_mtime_ns)
+    return os.path.join(cache_dir, hashlib.sha1(key.encode("utf-8", "surrogateescape")).hexdigest() + ".json")
+
+def manifest(path, bin_7zz="7zz", cache_dir=None):
+    cached = cache_file(cache_dir, path) if cache_dir else None
+    if cached:
+        try:
+            with open(cached) as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            pass
+
+    if zipfile.is_zipfile(path):
+        try:
+            members = list_zip(path)
+        except (zipfile.BadZipFile, NotImplementedError):
+            members = list_7z(path, bin_7zz)
+    else:
+        members = list_7z(path, bin_7zz)
+
+    if cached:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = cached + ".tmp{}".format(os.getpid())
+        with open(tmp, "w") as f:
+            json.dump(members, f)
+        os.replace(tmp, cached)
+    return members
+
+def main():
+    parser = argparse.ArgumentParser(description="List an archive once: name, size, compressed size, method, offset")
+    parser.add_argument("archive", help="archive to list")
+    parser.add_argument("-n", "--names", action="store_true", help="print member names only")
+    parser.add_argument("-j", "--json", action="store_true", help="print the manifest as JSON")
+    parser.add_argument("-c", "--cache", metavar="DIR", default=None,
+                        help="keep listings in DIR, keyed by path, size and mtime")
+    parser.add_argument("--7zz", dest="bin_7zz", default=os.environ.get("BIN_7ZZ", "7zz"),
+                        help="7-Zip binary for non-zip archives (default: %(default)s)")
+    args = parser.parse_args()
+
+    try:
+        members = manifest(args.archive, args.bin_7zz, args.cache)
+    except (OSError, subprocess.CalledProcessError) as e:
+        print("[!] Unable to list {}: {}".format(args.archive, e), file=sys.stderr)
+        return 1
+
+    if args.json:
+        json.dump(members, sys.stdout, indent=1)
+        print()
+    elif args.names:
+        for member in members:
+            print(member["name"])
+    else:
+        for member in members:
+            print("{}\t{}\t{}\t{}\t{}".format(member["size"], member["csize"], member["method"],
+                                              "" if member["offset"] is None else member["offset"],
+                                              member["name"]))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+
+# Pin a blob list with the sha1sum of every blob
+#
+# Reads a proprietary-files.txt style list and writes it back with
+# "|<sha1>" appended to every blob line; blank lines and comments are kept
+# as they are. Blobs are looked up as given, then below system/ and
+# system/system/, and a leading "-" on the path is ignored, as in the
+# LineageOS extract tools. All blobs are hashed on a thread pool and the
+# output is written in one pass. --sha256 also writes a sha256sum style
+# manifest of the same blobs, computed from the same read.
+
+import os
+import sys
+import hashlib
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+chunk_size = 1 << 20
+
+# Where blobs that are not found as given may live
+fallback_dirs = ["system", "system/system"]
+
+def is_blob(line):
+    return line.strip() != "" and "# " not in line
+
+def blob_path(line):
+    """File on disk for a blob line, None if it cannot be found"""
+    blob = line.strip()
+    if blob.startswith("-"):
+        blob = blob[1:]
+    for candidate in [blob] + [os.path.join(d, blob) for d in fallback_dirs]:
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+def hash_file(path, sha256=False):
+    """(sha1, sha256 or None) of a file"""
+    sha1 = hashlib.sha1()
+    sha2 = hashlib.sha256() if sha256 else None
+    with open(path, "rb") as f:
+        while True:
+            data = f.read(chunk_size)
+            if not data:
+                break
+            sha1.update(data)
+            if sha2:
+                sha2.update(data)
+    return sha1.hexdigest(), sha2.hexdigest() if sha2 else None
+
+def hash_blob(line, sha256=False):
+    path = blob_path(line)
+    if path is None:
+        return None, None, None
+    try:
+        return (path,) + hash_file(path, sha256)
+    except OSError:
+        return path, None, None
+
+def main():
+    parser = argparse.ArgumentParser(description="Append the sha1sum of every blob to a blob list")
+    parser.add_argument("input", help="blob list, one path per line")
+    parser.add_argument("output", help="pinned blob list to write")
+    parser.add_argument("-C", "--directory", default=".", help="directory the blob paths are relative to")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="files hashed at the same time (default: %(default)s)")
+    parser.add_argument("--sha256", metavar="FILE", default=None,
+                        help="also write a sha256sum manifest of the blobs to FILE")
+    args = parser.parse_args()
+
+    with open(args.input) as f:
+        lines = f.read().splitlines()
+    # Output paths are resolved before switching to the blob directory
+    output = os.path.abspath(args.output)
+    manifest = os.path.abspath(args.sha256) if args.sha256 else None
+    os.chdir(args.directory)
+
+    blobs = sorted({line for line in lines if is_blob(line)})
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        hashes = dict(zip(blobs, pool.map(lambda line: hash_blob(line, bool(manifest)), blobs)))
+
+    missing = 0
+    with open(output, "w") as f:
+        for line in lines:
+            if not is_blob(line):
+                f.write(line + "\n")
+                continue
+            _, sha1, _ = hashes[line]
+            if sha1 is None:
+                # Left unpinned, so it is easy to spot
+                missing += 1
+                f.write(line + "\n")
+            else:
+                f.write("{}|{}\n".format(line, sha1))
+    if manifest:
+        with open(manifest, "w") as f:
+            for line in blobs:
+                path, _, sha2 = hashes[line]
+                if sha2:
+                    f.write("{}  {}\n".format(sha2, path))
+
+    print("[+] Pinned {} blobs in {}".format(len(blobs) - missing, args.output))
+    if missing:
+        print("[!] {} blobs not found".format(missing), file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+
+# Unpack Android boot, recovery and vendor_boot images
+#
+# Boot image headers v0 to v4 and vendor_boot headers v3 and v4 (with the
+# vendor ramdisk table) are parsed from an mmap of the image, wherever the
+# ANDROID!/VNDRBOOT magic sits. Kernel, ramdisk, second, dtb and
+# recovery_dtbo are copied out with copy_file_range, no temporary copy of the
+# image is made. Ramdisks are decompressed (gzip, lzma, xz, bzip2, lz4) and
+# their cpio archives unpacked in process; every vendor ramdisk fragment is
+# unpacked on top of the previous ones, the way the device sees them.
+# The output folder keeps the layout unpackboot.sh used: kernel,
+# ramdisk.packed, ramdisk/, second.img, dt.img or dtb.img, dtbo.img and
+# img_info.
+
+import os
+import bz2
+import sys
+import mmap
+import lzma
+import zlib
+import shlex
+import shutil
+import struct
+import argparse
+import subprocess
+
+import lz4block
+try:
+    import lz4.block
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+boot_magic = b"ANDROID!"
+vendor_boot_magic = b"VNDRBOOT"
+mtk_magic = b"\x88\x16\x88\x58"
+mtk_header_size = 512
+
+# Kernel load offset from the base address
+kernel_load = 0x00008000
+
+_boot_v0 = struct.Struct("<8s10I16s512s32s1024s")
+_boot_v1 = struct.Struct("<IQI")
+_boot_v2 = struct.Struct("<IQ")
+_boot_v3 = struct.Struct("<8s4I4II1536s")
+_vendor_v3 = struct.Struct("<8s5I2048sI16s2IQ")
+_vendor_v4 = struct.Struct("<4I")
+_ramdisk_entry = struct.Struct("<3I32s64s")
+
+class BootImageError(Exception):
+    pass
+
+def cstr(raw):
+    return raw.split(b"\0", 1)[0].decode("ascii", "replace")
+
+def align(value, size):
+    return (value + size - 1) // size * size
+
+def os_version(value):
+    """os_version and os_patch_level as img_info records them, None when unset"""
+    if not value:
+        return None
+    version, level = value >> 11, value & 0x7FF
+    return ("{}.{}.{}".format(version >> 14, version >> 7 & 0x7F, version & 0x7F),
+            "{}:{}".format((level >> 4) + 2000, level & 0xF))
+
+class BootImage:
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        try:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self.file.close()
+            raise BootImageError("empty image")
+        try:
+            self.parse()
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def parse(self):
+        hits = [pos for pos in (self.map.find(boot_magic), self.map.find(vendor_boot_magic)) if pos != -1]
+        if not hits:
+            raise BootImageError("no boot image magic")
+        self.base = min(hits)
+        self.vendor = self.map[self.base:self.base + 8] == vendor_boot_magic
+        # name -> (offset in the file, size)
+        self.sections = {}
+        self.ramdisks = []
+        self.info = {}
+        if self.vendor:
+            self.parse_vendor()
+        else:
+            version = struct.unpack_from("<I", self.map, self.base + 40)[0]
+            if version in (3, 4):
+                self.parse_v3(version)
+            else:
+                self.parse_v0(version)
+
+    def header(self, layout, offset=0):
+        if self.base + offset + layout.size > len(self.map):
+            raise BootImageError("truncated header")
+        return layout.unpack_from(self.map, self.base + offset)
+
+    def layout(self, page_size, pieces):
+        """Sections stored one after the other, each starting on a page"""
+        pos = self.base + page_size
+        for name, size in pieces:
+            if size:
+                if pos + size > len(self.map):
+                    raise BootImageError("{} beyond the end of the image".format(name))
+                self.sections[name] = (pos, size)
+            pos += align(size, page_size)
+
+    def parse_v0(self, version):
+        (_, kernel_size, kernel_addr, ramdisk_size, ramdisk_addr, second_size, second_addr,
+         tags_addr, page_size, version_or_dt, osv, board, cmdline, _, extra) = self.header(_boot_v0)
+        dt_size = 0
+        if version > 4:
+            # Pre-v1 Qualcomm images keep the dt.img size where the version is now
+            dt_size, version = version_or_dt, 0
+        if page_size == 0 or page_size & (page_size - 1):
+            raise BootImageError("bad page size {}".format(page_size))
+        dtbo_size = dtbo_offset = dtb_addr = 0
+        if version >= 1:
+            (dtbo_size, dtbo_offset, _) = self.header(_boot_v1, _boot_v0.size)
+        if version >= 2:
+            (dt_size, dtb_addr) = self.header(_boot_v2, _boot_v0.size + _boot_v1.size)
+        dt_name = "dtb.img" if version >= 2 else "dt.img"
+        self.layout(page_size, [("kernel", kernel_size), ("ramdisk.packed", ramdisk_size),
+                                ("second.img", second_size), ("dtbo.img", dtbo_size), (dt_name, dt_size)])
+        if ramdisk_size:
+            self.ramdisks = [self.sections["ramdisk.packed"]]
+
+        base_addr = (kernel_addr - kernel_load) & 0xFFFFFFFF
+        offset = lambda addr: "{:#010x}".format((addr - base_addr) & 0xFFFFFFFF)
+        self.version = version
+        self.page_size = page_size
+        self.info.update(board=cstr(board), cmd_line=cstr(cmdline) + cstr(extra),
+                         kernel_size=kernel_size, ramdisk_size=ramdisk_size, second_size=second_size,
+                         dtb_size=dt_size, dtbo_size=dtbo_size, base_addr="{:#010x}".format(base_addr),
+                         kernel_offset=offset(kernel_addr), ramdisk_offset=offset(ramdisk_addr),
+                         second_offset=offset(second_addr), tags_offset=offset(tags_addr),
+                         dtbo_offset=offset(dtbo_offset), dtb_offset=offset(dtb_addr))
+        self.info["os_version"] = os_version(osv)
+
+    def parse_v3(self, version):
+        (_, kernel_size, ramdisk_size, osv, _, _, _, _, _, _, cmdline) = self.header(_boot_v3)
+        signature_size = 0
+        if version == 4:
+            signature_size = struct.unpack_from("<I", self.map, self.base + _boot_v3.size)[0]
+        self.layout(4096, [("kernel", kernel_size), ("ramdisk.packed", ramdisk_size),
+                           ("boot_signature", signature_size)])
+        if ramdisk_size:
+            self.ramdisks = [self.sections["ramdisk.packed"]]
+        self.version = version
+        self.page_size = 4096
+        self.info.update(board="", cmd_line=cstr(cmdline), kernel_size=kernel_size, ramdisk_size=ramdisk_size,
+                         base_addr="0x00000000", kernel_offset="{:#010x}".format(kernel_load))
+        self.info["os_version"] = os_version(osv)
+
+    def parse_vendor(self):
+        (_, version, page_size, kernel_addr, ramdisk_addr, ramdisk_size, cmdline, tags_addr, board,
+         header_size, dtb_size, dtb_addr) = self.header(_vendor_v3)
+        if version not in (3, 4):
+            raise BootImageError("unsupported vendor boot version {}".format(version))
+        if page_size == 0 or page_size & (page_size - 1):
+            raise BootImageError("bad page size {}".format(page_size))
+        table_size = entries = entry_size = bootconfig_size = 0
+        if version == 4:
+            (table_size, entries, entry_size, bootconfig_size) = self.header(_vendor_v4, _vendor_v3.size)
+        first = self.base + align(header_size, page_size)
+        pos = first
+        for name, size in (("ramdisk.packed", ramdisk_size), ("dtb.img", dtb_size),
+                           ("vendor_ramdisk_table", table_size), ("bootconfig", bootconfig_size)):
+            if size:
+                if pos + size > len(self.map):
+                    raise BootImageError("{} beyond the end of the image".format(name))
+                self.sections[name] = (pos, size)
+            pos += align(size, page_size)
+
+        self.ramdisks = [self.sections["ramdisk.packed"]] if ramdisk_size else []
+        if entries:
+            table = self.sections["vendor_ramdisk_table"][0]
+            self.ramdisks = []
+            for i in range(entries):
+                (size, offset, _, name, _) = _ramdisk_entry.unpack_from(self.map, table + i * entry_size)
+                if offset + size > ramdisk_size:
+                    raise BootImageError("vendor ramdisk {} beyond the ramdisk section".format(cstr(name)))
+                self.ramdisks.append((first + offset, size))
+
+        base_addr = (kernel_addr - kernel_load) & 0xFFFFFFFF
+        offset = lambda addr: "{:#010x}".format((addr - base_addr) & 0xFFFFFFFF)
+        self.version = version
+        self.page_size = page_size
+        self.info.update(board=cstr(board), cmd_line=cstr(cmdline), kernel_size=0, ramdisk_size=ramdisk_size,
+                         dtb_size=dtb_size, base_addr="{:#010x}".format(base_addr),
+                         kernel_offset=offset(kernel_addr), ramdisk_offset=offset(ramdisk_addr),
+                         tags_offset=offset(tags_addr), dtb_offset=offset(dtb_addr))
+
+    def carve(self, name, target):
+        offset, size = self.sections[name]
+        with open(target, "wb") as out:
+            done = 0
+            while done < size:
+                try:
+                    copied = os.copy_file_range(self.file.fileno(), out.fileno(), size - done,
+                                                offset + done, done)
+                except (AttributeError, OSError):
+                    out.seek(done)
+                    out.write(self.map[offset + done:offset + size])
+                    break
+                if copied == 0:
+                    break
+                done += copied
+
+def lz4_legacy(data):
+    """Decode the legacy lz4 frames the kernel and mkbootfs use"""
+    out = bytearray()
+    pos = 0
+    while pos + 4 <= len(data):
+        if data[pos:pos + 4] == b"\x02\x21\x4c\x18":
+            pos += 4
+            continue
+        size = struct.unpack_from("<I", data, pos)[0]
+        pos += 4
+        if size == 0 or pos + size > len(data):
+            break
+        block = bytes(data[pos:pos + size])
+        if lz4 is not None:
+            out += lz4.block.decompress(block, uncompressed_size=8 << 20)
+        else:
+            out += lz4block.decompress(block)
+        pos += size
+    return bytes(out)
+
+def gunzip(data):
+    out = bytearray()
+    data = bytes(data)
+    # Concatenated members are allowed, padding after the last one is not an error
+    while data[:2] == b"\x1f\x8b":
+        stream = zlib.decompressobj(zlib.MAX_WBITS | 16)
+        out += stream.decompress(data)
+        if not stream.eof:
+            raise zlib.error("truncated gzip stream")
+        data = stream.unused_data
+    return bytes(out)
+
+def decompress(data):
+    """(format, cpio data) of a packed ramdisk, format named as img_info records it"""
+    head = bytes(data[:6])
+    if head.startswith(b"\x1f\x8b"):
+        return "gzip", gunzip(data)
+    if head.startswith(b"\xfd7zXZ\0"):
+        return "xz", lzma.decompress(data, lzma.FORMAT_XZ)
+    if head.startswith(b"\x5d\0\0"):
+        return "lzma", lzma.decompress(data, lzma.FORMAT_ALONE)
+    if head.startswith(b"\x02\x21\x4c\x18"):
+        return "lz4", lz4_legacy(data)
+    if head.startswith(b"\x04\x22\x4d\x18") and lz4 is not None:
+        return "lz4", lz4.frame.decompress(data)
+    if head.startswith(b"BZh"):
+        return "bzip2", bz2.decompress(data)
+    if head.startswith(b"\x89LZO") and shutil.which("lzop"):
+        return "lzop", subprocess.run(["lzop", "-d", "-c"], input=bytes(data), stdout=subprocess.PIPE,
+                                      stderr=subprocess.DEVNULL, check=True).stdout
+    if head in (b"070701", b"070702"):
+        return "cpio", bytes(data)
+    raise BootImageError("unknown ramdisk format")
+
+def unpack_cpio(data, outdir):
+    """Unpack a newc cpio archive like cpio -i -d -m --no-absolute-filenames, returns the entry count"""
+    pos = 0
+    count = 0
+    links = {}
+    root = os.path.realpath(outdir)
+    while pos + 110 <= len(data):
+        magic = data[pos:pos + 6]
+        if magic not in (b"070701", b"070702"):
+            raise BootImageError("bad cpio header at {}".format(pos))
+        fields = [int(data[pos + 6 + i * 8:pos + 14 + i * 8], 16) for i in range(13)]
+        (ino, mode, _, _, nlink, mtime, size, devmajor, _, _, _, namesize, _) = fields
+        name = data[pos + 110:pos + 110 + namesize].split(b"\0", 1)[0].decode("utf-8", "surrogateescape")
+        pos = align(pos + 110 + namesize, 4)
+        body = data[pos:pos + size]
+        pos = align(pos + size, 4)
+        if name == "TRAILER!!!":
+            break
+        name = os.path.normpath(name.lstrip("/"))
+        if name in (".", "") or name.startswith(".."):
+            continue
+        target = os.path.join(outdir, name)
+        kind = mode & 0o170000
+        # An earlier symlink entry must not lead a write out of outdir
+        real = os.path.realpath(os.path.dirname(target) if kind == 0o120000 else target)
+        if real != root and not real.startswith(root + os.sep):
+            continue
+        os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+        if kind == 0o040000:
+            os.makedirs(target, exist_ok=True)
+            os.chmod(target, (mode & 0o7777) | 0o700)
+        elif kind == 0o120000:
+            if os.path.lexists(target):
+                os.unlink(target)
+            os.symlink(body.decode("utf-8", "surrogateescape"), target)
+            count += 1
+            continue
+        elif kind == 0o100000:
+            if os.path.lexists(target) and not os.path.isdir(target):
+                os.unlink(target)
+            # Hard links carry their data on the last entry only
+            key = (devmajor, ino)
+            if nlink > 1 and not size:
+                links.setdefault(key, []).append(target)
+            with open(target, "wb") as f:
+                f.write(body)
+            if nlink > 1 and size:
+                for other in links.pop(key, []):
+                    os.unlink(other)
+                    os.link(target, other)
+            os.chmod(target, (mode & 0o7777) | 0o600)
+        else:
+            # Device nodes and fifos need root, cpio skipped them too
+            continue
+        os.utime(target, (mtime, mtime))
+        count += 1
+    return count
+
+def write_info(image, outdir, ramdisk_format):
+    info = image.info
+    lines = ["kernel=kernel", "ramdisk=ramdisk"]
+    if "second.img" in image.sections:
+        lines.append("second=second.img")
+    lines.append("page_size={}".format(image.page_size))
+    if "dtbo.img" in image.sections:
+        lines.append("dtbo=dtbo.img")
+    for dt in ("dt.img", "dtb.img"):
+        if dt in image.sections:
+            lines.append("dt={}".format(dt))
+    lines.append("kernel_size={}".format(info.get("kernel_size", 0)))
+    lines.append("ramdisk_size={}".format(info.get("ramdisk_size", 0)))
+    if "second.img" in image.sections:
+        lines.append("second_size={}".format(info["second_size"]))
+    if info.get("dtb_size"):
+        if image.version > 1:
+            lines.append("dtb_offset={}".format(info["dtb_offset"]))
+        lines.append("dtb_size={}".format(info["dtb_size"]))
+    for key in ("base_addr", "kernel_offset", "ramdisk_offset", "tags_offset", "dtbo_offset"):
+        lines.append("{}={}".format(key, info.get(key, "")))
+    if info.get("os_version"):
+        lines.append("os_version={}".format(info["os_version"][0]))
+        lines.append("os_patch_level={}".format(info["os_version"][1]))
+    lines.append("cmd_line={}".format(shlex.quote(info["cmd_line"])))
+    lines.append('board="{}"'.format(info["board"]))
+    if image.mtk_header:
+        (partition_size, partition_name) = image.mtk_header
+        lines.append("ramdisk has a MTK header:")
+        lines.append("\tpartition_size={}".format(partition_size))
+        lines.append("\tpartition_name={}".format(partition_name))
+    if ramdisk_format:
+        lines.append("format={}".format(ramdisk_format))
+    with open(os.path.join(outdir, "img_info"), "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+def unpack(image, outdir, ramdisk=True):
+    """Write the sections of image to outdir and unpack its ramdisks, returns the ramdisk format"""
+    os.makedirs(outdir, exist_ok=True)
+    for name in image.sections:
+        if name != "vendor_ramdisk_table":
+            image.carve(name, os.path.join(outdir, name))
+
+    image.mtk_header = None
+    ramdisks = list(image.ramdisks)
+    if len(ramdisks) == 1 and image.map[ramdisks[0][0]:ramdisks[0][0] + 4] == mtk_magic:
+        (offset, size) = ramdisks[0]
+        header = image.map[offset:offset + mtk_header_size]
+        with open(os.path.join(outdir, "ramdisk.mtk_header"), "wb") as f:
+            f.write(header)
+        with open(os.path.join(outdir, "ramdisk.packed"), "wb") as f:
+            f.write(image.map[offset + mtk_header_size:offset + size])
+        image.mtk_header = (struct.unpack_from("<I", header, 4)[0], cstr(header[8:40]))
+        ramdisks = [(offset + mtk_header_size, size - mtk_header_size)]
+
+    if not ramdisk or not ramdisks:
+        return None
+    target = os.path.join(outdir, "ramdisk")
+    os.makedirs(target, exist_ok=True)
+    formats = []
+    for offset, size in ramdisks:
+        (kind, data) = decompress(memoryview(image.map)[offset:offset + size])
+        unpack_cpio(data, target)
+        formats.append(kind)
+    return formats[0]
+
+def main():
+    parser = argparse.ArgumentParser(description="Unpack Android boot, recovery and vendor_boot images")
+    parser.add_argument("image", help="boot.img, recovery.img or vendor_boot.img")
+    parser.add_argument("outdir", help="output folder")
+    parser.add_argument("-n", "--no-ramdisk", action="store_true", help="do not unpack the ramdisk")
+    args = parser.parse_args()
+
+    try:
+        image = BootImage(args.image)
+    except (BootImageError, struct.error, OSError) as e:
+        print("[!] {}: {}".format(args.image, e), file=sys.stderr)
+        return 1
+
+    with image:
+        kind = "vendor boot" if image.vendor else "boot"
+        print("[+] {} header v{}, page size {}".format(kind, image.version, image.page_size))
+        for name, (offset, size) in image.sections.items():
+            print("[+] {}: {} bytes at {:#x}".format(name, size, offset))
+        ramdisk_format = None
+        try:
+            ramdisk_format = unpack(image, args.outdir, not args.no_ramdisk)
+            if ramdisk_format:
+                print("[+] ramdisk is {} format".format(ramdisk_format))
+        except (BootImageError, lzma.LZMAError, zlib.error, lz4block.LZ4BlockError, ValueError,
+                subprocess.CalledProcessError) as e:
+            print("[!] ramdisk: {}".format(e), file=sys.stderr)
+        except OSError as e:
+            print("[!] {}: {}".format(args.outdir, e), file=sys.stderr)
+            return 1
+        write_info(image, args.outdir, ramdisk_format)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
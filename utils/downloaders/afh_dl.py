@@ -5,42 +5,337 @@ from __future__ import absolute_import
 from __future__ import print_function
 from builtins import input
 
+import os
 import re
+import sys
 import cgi
 import json
+import base64
+import hashlib
+import binascii
 import math
 import clint
 import argparse
 import humanize
 import requests
+import threading
+import time
+import dlcache
+from concurrent.futures import ThreadPoolExecutor
 
 mirror_url = r"https://androidfilehost.com/libs/otf/mirrors.otf.php"
 url_matchers = [
     re.compile(r"fid=(?P<id>\d+)")
 ]
 
+# Parallel ranged downloads
+connections = 8
+min_segment_size = 4 << 20
+buffer_size = 1 << 20
+# A mirror that sends nothing for stall_timeout seconds is dropped
+stall_timeout = 30
+timeout = (15, stall_timeout)
+
+# Resume state lives next to the download, flushed every checkpoint_interval bytes
+checkpoint_suffix = ".afhdl"
+checkpoint_interval = 32 << 20
+
+# Mirror probing
+probe_size = 256 << 10
+probe_timeout = (10, 15)
+
+# One pooled session for the mirror lookup and all download connections
+session = requests.Session()
+
+def size_pool(count):
+    for prefix in ("http://", "https://"):
+        session.mount(prefix, requests.adapters.HTTPAdapter(pool_connections=4,
+                                                            pool_maxsize=max(count, 1)))
+
+size_pool(connections)
+
 class Mirror:
     def __init__(self, **entries):
+        self.latency = None
+        self.speed = None
         self.__dict__.update(entries)
 
-def download_file(url, fname, fsize):
-    dat = requests.get(url, stream=True)
-    with open(fname, 'wb') as f:
-        bar = clint.textui.progress.bar(dat.iter_content(chunk_size=4096),
-                                        expected_size=math.floor(fsize / 4096) + 1)
-        for chunk in bar:
-            f.write(chunk)
+    def describe(self):
+        if self.speed is None:
+            return "unreachable"
+        return "{}/s, {:.0f} ms".format(humanize.naturalsize(self.speed, binary=True),
+                                        self.latency * 1000)
+
+class TransferError(Exception):
+    pass
+
+class RangeNotSupported(TransferError):
+    pass
+
+class Progress:
+    def __init__(self, fsize, done=0):
+        self.lock = threading.Lock()
+        self.done = done
+        self.bar = clint.textui.progress.Bar(
+            expected_size=math.floor(fsize / buffer_size) + 1)
+
+    def update(self, count):
+        with self.lock:
+            self.done += count
+            self.bar.show(self.done // buffer_size)
+
+    def finish(self):
+        self.bar.done()
+
+def probe_mirror(server):
+    try:
+        start = time.monotonic()
+        head = session.head(server.url, allow_redirects=True, timeout=probe_timeout)
+        head.raise_for_status()
+        latency = time.monotonic() - start
+        headers = {"Range": "bytes=0-{}".format(probe_size - 1)}
+        start = time.monotonic()
+        got = 0
+        with session.get(server.url, headers=headers, stream=True, timeout=probe_timeout) as dat:
+            dat.raise_for_status()
+            for chunk in dat.iter_content(chunk_size=64 << 10):
+                got += len(chunk)
+                if got >= probe_size:
+                    break
+        server.latency = latency
+        server.speed = got / max(time.monotonic() - start, 1e-3)
+    except requests.exceptions.RequestException:
+        server.latency = server.speed = None
+    return server
+
+def rank_mirrors(servers):
+    if not servers:
+        return []
+    with ThreadPoolExecutor(max_workers=len(servers)) as pool:
+        probed = list(pool.map(probe_mirror, servers))
+    # Fastest first, lower latency breaks ties, unreachable ones last
+    return sorted(probed, key=lambda m: (m.speed is None, -(m.speed or 0), m.latency or 0))
+
+class Checkpoint:
+    def __init__(self, fname, url, fid, fsize):
+        self.path = fname + checkpoint_suffix
+        self.lock = threading.Lock()
+        self.state = {"url": url, "fid": fid, "size": fsize, "done": []}
+        self.fd = None
+        self.unsynced = 0
+        self.cancelled = threading.Event()
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+        except (IOError, ValueError):
+            return False
+        if state.get("fid") != self.state["fid"] or state.get("size") != self.state["size"]:
+            return False
+        self.state["done"] = merge_ranges(state.get("done", []))
+        return True
+
+    def completed(self):
+        return sum(end - start for start, end in self.state["done"])
+
+    def remaining(self):
+        missing = []
+        pos = 0
+        for start, end in self.state["done"]:
+            if start > pos:
+                missing.append((pos, start))
+            pos = max(pos, end)
+        if pos < self.state["size"]:
+            missing.append((pos, self.state["size"]))
+        return missing
+
+    def mark(self, start, end):
+        with self.lock:
+            self.state["done"] = merge_ranges(self.state["done"] + [[start, end]])
+            self.unsynced += end - start
+            if self.unsynced >= checkpoint_interval:
+                self.save()
+
+    def save(self):
+        # Data first, so the checkpoint never claims bytes that are not on disk
+        if self.fd is not None:
+            os.fdatasync(self.fd)
+        self.unsynced = 0
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.state, f)
             f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def remove(self):
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+def merge_ranges(ranges):
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+def header_md5(headers):
+    """(md5, trusted): Content-MD5 is trusted, an S3 ETag only probably an MD5"""
+    content_md5 = headers.get('Content-MD5')
+    if content_md5:
+        try:
+            return (binascii.hexlify(base64.b64decode(content_md5)).decode(), True)
+        except (ValueError, binascii.Error):
+            pass
+    # Plain (non-multipart) S3 ETags are the MD5 of the body, other servers
+    # hash whatever they like into theirs
+    s3 = 'AmazonS3' in headers.get('Server', '') or any(k.lower().startswith('x-amz-') for k in headers)
+    etag = headers.get('ETag', '')
+    if not s3 or etag.startswith('W/'):
+        return (None, False)
+    etag = etag.strip('"')
+    if re.match(r'^[0-9a-fA-F]{32}$', etag):
+        return (etag.lower(), False)
+    return (None, False)
+
+def verify_download(fname, fsize, md5=None):
+    actual = os.path.getsize(fname)
+    if actual != fsize:
+        raise TransferError("size mismatch, expected {} bytes but got {}".format(fsize, actual))
+    if md5:
+        print("Verifying MD5...")
+        digest = hashlib.md5()
+        with open(fname, 'rb') as f:
+            for block in iter(lambda: f.read(buffer_size), b''):
+                digest.update(block)
+        if digest.hexdigest() != md5.lower():
+            raise TransferError("MD5 mismatch, expected {} but got {}".format(md5.lower(), digest.hexdigest()))
+
+def download_file(mirrors, fname, fsize):
+    for server in mirrors:
+        try:
+            dat = session.get(server.url, stream=True, timeout=timeout)
+            dat.raise_for_status()
+            with open(fname, 'wb', buffering=buffer_size) as f:
+                bar = clint.textui.progress.bar(dat.iter_content(chunk_size=buffer_size),
+                                                expected_size=math.floor(fsize / buffer_size) + 1)
+                for chunk in bar:
+                    f.write(chunk)
+            return
+        except requests.exceptions.RequestException as e:
+            if server is mirrors[-1]:
+                raise
+            print("\n{} failed ({}), restarting from the next mirror...".format(server.name, e))
+
+def split_ranges(missing, segments):
+    step = max(min_segment_size, -(-sum(end - start for start, end in missing) // segments))
+    return [(pos, min(pos + step, end))
+            for start, end in missing for pos in range(start, end, step)]
+
+def preallocate(fd, fsize):
+    try:
+        os.posix_fallocate(fd, 0, fsize)
+    except (AttributeError, OSError):
+        os.ftruncate(fd, fsize)
+
+def fetch_range(mirrors, fd, start, end, progress, checkpoint):
+    pos = start
+    current = 0
+    failures = 0
+    while pos < end:
+        server = mirrors[current % len(mirrors)]
+        before = pos
+        headers = {"Range": "bytes={}-{}".format(pos, end - 1)}
+        try:
+            with session.get(server.url, headers=headers, stream=True, timeout=timeout) as dat:
+                dat.raise_for_status()
+                if dat.status_code != 206:
+                    raise RangeNotSupported(server.url)
+                for chunk in dat.iter_content(chunk_size=buffer_size):
+                    if checkpoint.cancelled.is_set():
+                        return
+                    chunk = chunk[:end - pos]
+                    os.pwrite(fd, chunk, pos)
+                    checkpoint.mark(pos, pos + len(chunk))
+                    pos += len(chunk)
+                    progress.update(len(chunk))
+                    if pos >= end:
+                        break
+            if pos != end:
+                raise TransferError("range {}-{} ended early at {}".format(start, end, pos))
+        except (requests.exceptions.RequestException, TransferError) as e:
+            # Give up once every mirror has failed twice without progress
+            failures = 0 if pos > before else failures + 1
+            if failures >= 2 * len(mirrors):
+                raise
+            current += 1
+            if len(mirrors) > 1:
+                print("\n{} failed ({}), resuming from {}...".format(
+                    server.name, e, mirrors[current % len(mirrors)].name))
+
+def download_file_segmented(mirrors, fname, fsize, segments=connections, ranged=True, fid=None):
+    checkpoint = Checkpoint(fname, mirrors[0].url, fid, fsize)
+    if not ranged:
+        checkpoint.remove()
+        return download_file(mirrors, fname, fsize)
+    resume = (checkpoint.load() and os.path.isfile(fname)
+              and os.path.getsize(fname) == fsize)
+    if resume:
+        print("Resuming, {} of {} already downloaded...".format(
+            humanize.naturalsize(checkpoint.completed(), binary=True),
+            humanize.naturalsize(fsize, binary=True)))
+    else:
+        checkpoint.state["done"] = []
+    ranges = split_ranges(checkpoint.remaining(), segments)
+    fd = os.open(fname, os.O_RDWR | os.O_CREAT | (0 if resume else os.O_TRUNC), 0o644)
+    checkpoint.fd = fd
+    progress = Progress(fsize, checkpoint.completed())
+    try:
+        if not resume:
+            preallocate(fd, fsize)
+        with ThreadPoolExecutor(max_workers=max(len(ranges), 1)) as pool:
+            jobs = [pool.submit(fetch_range, mirrors, fd, start, end, progress, checkpoint)
+                    for start, end in ranges]
+            try:
+                for job in jobs:
+                    job.result()
+            except BaseException:
+                # Stop the other segments instead of waiting for them
+                checkpoint.cancelled.set()
+                raise
+    except RangeNotSupported:
+        checkpoint.fd = None
+        os.close(fd)
+        fd = None
+        checkpoint.remove()
+        print("\nServer does not support ranged downloads, using a single connection...")
+        return download_file(mirrors, fname, fsize)
+    except BaseException:
+        # Keep whatever made it to disk for the next run
+        with checkpoint.lock:
+            checkpoint.save()
+        raise
+    finally:
+        if fd is not None:
+            os.close(fd)
+    progress.finish()
+    checkpoint.remove()
 
 def get_file_info(url):
-    data = requests.head(url)
+    data = session.head(url, allow_redirects=True, timeout=timeout)
     rsize = int(data.headers['Content-Length'])
     size = humanize.naturalsize(rsize, binary=True)
     ftype, fdata = cgi.parse_header(data.headers['Content-Disposition'])
-    return (rsize, size, fdata['filename'])
+    ranged = data.headers.get('Accept-Ranges', '').lower() == 'bytes'
+    return (rsize, size, fdata['filename'], ranged) + header_md5(data.headers)
 
 def download_servers(fid):
-    cook = requests.get("https://androidfilehost.com/?fid={}".format(fid))
+    cook = session.get("https://androidfilehost.com/?fid={}".format(fid))
     post_data = {
         "submit": "submit",
         "action": "getdownloadmirrors",
@@ -55,7 +350,7 @@ def download_servers(fid):
         "X-MOD-SBB-CTYPE": "xhr",
         "X-Requested-With": "XMLHttpRequest"
     }
-    mirror_data = requests.post(mirror_url,
+    mirror_data = session.post(mirror_url,
                                 headers=mirror_headers,
                                 data=post_data,
                                 cookies=cook.cookies)
@@ -78,7 +373,8 @@ def match_url(url):
             return res
     return None
 
-def main(link=None):
+def main(link=None, segments=connections, md5=None):
+    size_pool(segments)
     given_url = link
     if not link:
         given_url = input("Provide an AndroidFileHost URL: ")
@@ -87,22 +383,50 @@ def main(link=None):
         file_id = file_match.group('id')
         print("Obtaining available download servers...")
         servers = download_servers(file_id)
-        if servers == None:
+        if not servers:
             print("Unable to retrieve download servers, you have probably been rate limited.")
             return
         svc = len(servers) - 1
+        print("Probing {} mirrors...".format(len(servers)))
+        servers = rank_mirrors(servers)
         for idx, server in enumerate(servers):
-            print('{}: {}'.format(idx, server.name))
+            print('{}: {} ({})'.format(idx, server.name, server.describe()))
         choice = "0"
         if not link:
             choice = input("Choose a server to download from (0-{}): ".format(svc))
         while not choice.isdigit() or int(choice) > svc or int(choice) < 0:
             choice = input("Not a valid input, choose again: ")
         server = servers[int(choice)]
+        # The remaining reachable mirrors take over if this one stalls
+        mirrors = [server] + [m for m in servers if m is not server and m.speed is not None]
         print("Downloading from {}...".format(server.name))
-        rsize, size, fname = get_file_info(server.url)
+        rsize, size, fname, ranged, server_md5, trusted = get_file_info(server.url)
         print("Size: {} | Filename: {}".format(size, fname))
-        download_file(server.url, fname, rsize)
+        cache_key = "afh:{}".format(file_id)
+        try:
+            cache = dlcache.Cache()
+            if cache.install(cache_key, ".", rsize, name=fname):
+                print("Using cached download.")
+                return
+        except OSError as e:
+            print("Download cache unavailable: {}".format(e))
+            cache = None
+        download_file_segmented(mirrors, fname, rsize, segments, ranged, file_id)
+        try:
+            verify_download(fname, rsize, md5 or (server_md5 if trusted else None))
+        except TransferError as e:
+            print("Download is corrupt: {}".format(e))
+            sys.exit(1)
+        if not md5 and server_md5 and not trusted:
+            try:
+                verify_download(fname, rsize, server_md5)
+            except TransferError as e:
+                print("Warning: {}, the server's ETag may not be an MD5".format(e))
+        if cache is not None:
+            try:
+                cache.store(cache_key, fname, rsize)
+            except (OSError, ValueError) as e:
+                print("Unable to cache download: {}".format(e))
         print("Downloading complete!")
     else:
         print("This does not appear to be a supported link.")
@@ -113,11 +437,15 @@ def entry_main():
                         help="Run afh-dl in interactive mode.")
     parser.add_argument("-l", "--link", action="store", nargs="?", type=str, default=None,
                         help="Link that should be downloaded.")
+    parser.add_argument("-c", "--connections", action="store", type=int, default=connections,
+                        help="Number of parallel connections (default: %(default)s).")
+    parser.add_argument("--md5", action="store", type=str, default=None,
+                        help="Expected MD5 of the file, as shown on the AFH page.")
     parsed = parser.parse_args()
     if parsed.interactive == True:
-        main()
+        main(segments=parsed.connections, md5=parsed.md5)
     elif not parsed.link == None:
-        main(parsed.link)
+        main(parsed.link, parsed.connections, parsed.md5)
     else:
         print("A link must be specified if not in interactive mode.")
 
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Content-addressed cache for downloaded firmware
+#
+# Downloads are stored once under their sha256 in
+#   ${DUMPRX_CACHE_DIR:-${XDG_CACHE_HOME:-~/.cache}/dumprx}/blobs/
+# and looked up by key ("url:<url>", "afh:<fid>"), checked against the size
+# and ETag recorded at download time, and rehashed before a hit is used.
+# Blobs and the files installed from them never share an inode: later stages
+# edit inputs in place, so they are reflinked (FICLONE) where the filesystem
+# can, copied with copy_file_range otherwise. Least recently used blobs are
+# evicted once the cache grows past ${DUMPRX_CACHE_SIZE:-20G}.
+
+from __future__ import absolute_import
+from __future__ import print_function
+
+import os
+import sys
+import json
+import time
+import fcntl
+import shutil
+import hashlib
+import argparse
+from contextlib import contextmanager
+
+default_budget = 20 << 30
+buffer_size = 1 << 20
+# _IOW(0x94, 9, int) from linux/fs.h
+ficlone = 0x40049409
+
+def cache_dir():
+    if os.environ.get("DUMPRX_CACHE_DIR"):
+        return os.environ["DUMPRX_CACHE_DIR"]
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "dumprx")
+
+def parse_size(text):
+    units = {"K": 10, "M": 20, "G": 30, "T": 40}
+    text = text.strip().upper().rstrip("B").rstrip("I")
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * (1 << units[text[-1]]))
+    return int(text)
+
+def cache_budget():
+    try:
+        return parse_size(os.environ["DUMPRX_CACHE_SIZE"])
+    except (KeyError, ValueError):
+        return default_budget
+
+def sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(buffer_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def clone_or_copy(src, dst):
+    """Copy src to dst sharing blocks where possible, but never the inode"""
+    tmp = dst + ".tmp{}".format(os.getpid())
+    with open(src, "rb") as fin, open(tmp, "wb") as fout:
+        try:
+            fcntl.ioctl(fout.fileno(), ficlone, fin.fileno())
+        except (OSError, IOError):
+            size = os.fstat(fin.fileno()).st_size
+            done = 0
+            try:
+                while done < size:
+                    copied = os.copy_file_range(fin.fileno(), fout.fileno(), size - done, done, done)
+                    if copied == 0:
+                        break
+                    done += copied
+            except (AttributeError, OSError):
+                pass
+            if done < size:
+                fin.seek(done)
+                fout.seek(done)
+                shutil.copyfileobj(fin, fout, buffer_size)
+    os.replace(tmp, dst)
+
+class Cache:
+    def __init__(self, root=None, budget=None):
+        self.root = root or cache_dir()
+        self.budget = cache_budget() if budget is None else budget
+        self.blobs = os.path.join(self.root, "blobs")
+        self.index_path = os.path.join(self.root, "index.json")
+        os.makedirs(self.blobs, exist_ok=True)
+
+    def blob_path(self, sha):
+        return os.path.join(self.blobs, sha[:2], sha)
+
+    @contextmanager
+    def index(self):
+        """Load the index under an exclusive lock, save it on the way out"""
+        with open(os.path.join(self.root, "index.lock"), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                with open(self.index_path) as f:
+                    index = json.load(f)
+            except (IOError, ValueError):
+                index = {"keys": {}, "blobs": {}}
+            yield index
+            tmp = self.index_path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(index, f, indent=1)
+            os.replace(tmp, self.index_path)
+
+    def drop(self, key, sha):
+        """Forget a blob whose contents no longer match its hash"""
+        with self.index() as index:
+            index["blobs"].pop(sha, None)
+            for k in [k for k, e in index["keys"].items() if e["sha256"] == sha]:
+                del index["keys"][k]
+        try:
+            os.unlink(self.blob_path(sha))
+        except OSError:
+            pass
+
+    def lookup(self, key, size=None, etag=None):
+        with self.index() as index:
+            entry = index["keys"].get(key)
+            if entry is None:
+                return None
+            blob = index["blobs"].get(entry["sha256"])
+            stale = (blob is None
+                     or (size is not None and entry["size"] != size)
+                     or (etag and entry.get("etag") and entry["etag"] != etag))
+            path = self.blob_path(entry["sha256"])
+            if stale or not os.path.isfile(path) or os.path.getsize(path) != entry["size"]:
+                del index["keys"][key]
+                return None
+            blob["atime"] = time.time()
+            return dict(entry, path=path)
+
+    def install(self, key, outdir, size=None, etag=None, name=None):
+        """Place a cached download in outdir, returns its path or None on a miss"""
+        entry = self.lookup(key, size, etag)
+        if entry is None:
+            return None
+        os.makedirs(outdir, exist_ok=True)
+        dst = os.path.join(outdir, name or entry["name"])
+        clone_or_copy(entry["path"], dst)
+        # Hash the installed copy, a damaged blob must not pass for the download
+        if sha256_file(dst) != entry["sha256"]:
+            os.unlink(dst)
+            self.drop(key, entry["sha256"])
+            return None
+        return dst
+
+    def store(self, key, path, size=None, etag=None):
+        actual = os.path.getsize(path)
+        if size is not None and actual != size:
+            raise ValueError("{} is {} bytes, expected {}".format(path, actual, size))
+        sha = sha256_file(path)
+        blob = self.blob_path(sha)
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        if not os.path.isfile(blob):
+            clone_or_copy(path, blob)
+            os.chmod(blob, 0o444)
+        with self.index() as index:
+            index["blobs"][sha] = {"size": actual, "atime": time.time()}
+            index["keys"][key] = {"sha256": sha, "size": actual, "etag": etag,
+                                  "name": os.path.basename(path)}
+            self.evict(index, keep=sha)
+        return sha
+
+    def evict(self, index, keep=None):
+        total = sum(b["size"] for b in index["blobs"].values())
+        for sha, blob in sorted(index["blobs"].items(), key=lambda item: item[1]["atime"]):
+            if total <= self.budget:
+                break
+            if sha == keep:
+                continue
+            try:
+                os.unlink(self.blob_path(sha))
+            except OSError:
+                pass
+            del index["blobs"][sha]
+            total -= blob["size"]
+        for key in [k for k, e in index["keys"].items() if e["sha256"] not in index["blobs"]]:
+            del index["keys"][key]
+
+def remote_info(url):
+    """Size and ETag the server reports for url, (None, None) if it will not say"""
+    import requests
+    try:
+        dat = requests.head(url, allow_redirects=True, timeout=(10, 20))
+        dat.raise_for_status()
+    except requests.exceptions.RequestException:
+        return (None, None)
+    size = dat.headers.get("Content-Length")
+    return (int(size) if size and size.isdigit() else None, dat.headers.get("ETag"))
+
+def main():
+    parser = argparse.ArgumentParser(description="Content-addressed download cache")
+    sub = parser.add_subparsers(dest="command")
+    get = sub.add_parser("get", help="install a cached download, exit 1 on a miss")
+    get.add_argument("key")
+    get.add_argument("-o", "--outdir", default=".")
+    put = sub.add_parser("put", help="add a finished download to the cache")
+    put.add_argument("key")
+    put.add_argument("file")
+    for cmd in (get, put):
+        cmd.add_argument("--size", type=int, default=None, help="expected size in bytes")
+        cmd.add_argument("--etag", default=None, help="expected ETag")
+        cmd.add_argument("--url", default=None, help="ask this URL for the size and ETag")
+    sub.add_parser("list", help="show cached downloads")
+    sub.add_parser("prune", help="evict down to the size budget")
+    args = parser.parse_args()
+
+    cache = Cache()
+    if args.command in ("get", "put") and args.url:
+        size, etag = remote_info(args.url)
+        # Without either there is nothing to tell a changed file from the cached one
+        if args.command == "get" and size is None and etag is None and args.size is None and not args.etag:
+            return 1
+        args.size = args.size if args.size is not None else size
+        args.etag = args.etag or etag
+
+    if args.command == "get":
+        path = cache.install(args.key, args.outdir, args.size, args.etag)
+        if path is None:
+            return 1
+        print(path)
+    elif args.command == "put":
+        try:
+            print(cache.store(args.key, args.file, args.size, args.etag))
+        except (OSError, ValueError) as e:
+            print("[!] {}".format(e), file=sys.stderr)
+            return 1
+    elif args.command == "list":
+        with cache.index() as index:
+            for key, entry in sorted(index["keys"].items()):
+                print("{} {:>12} {} {}".format(entry["sha256"][:16], entry["size"], entry["name"], key))
+    elif args.command == "prune":
+        with cache.index() as index:
+            cache.evict(index)
+    else:
+        parser.print_help()
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Fetch selected members of a remote zip with HTTP range requests
+#
+# Only the end of central directory, the central directory itself and the
+# byte ranges of the wanted members are transferred, so a multi-GB firmware
+# zip whose interesting part is payload.bin or a handful of *.new.dat.br
+# files does not have to be downloaded as a whole.
+
+from __future__ import absolute_import
+from __future__ import print_function
+
+import os
+import re
+import sys
+import bz2
+import zlib
+import struct
+import argparse
+import requests
+from concurrent.futures import ThreadPoolExecutor
+
+# Members that make an archive worth fetching partially, same list that
+# dumper.sh greps a firmware folder for
+firmware_pattern = re.compile(r".*system.ext4.tar.*|.*chunk|system/build.prop|system.new.dat|"
+                              r"system_new.img|system.img|system-sign.img|system.bin|payload.bin|"
+                              r".*rawprogram*|system.sin|.*system_.*\.sin|system-p|super|UPDATE.APP|"
+                              r".*.pac|.*.nb0")
+firmware_exclude = re.compile(r".*chunk.*\.so$")
+# Companions of the above that the extraction steps look for, in every name
+# form dumper.sh takes apart: plain, -sign.img, -p* and Sony _*.sin (chunks
+# of any partition already match firmware_pattern)
+companion_suffixes = (r"((\.[^/]*)?\.(img|img\.ext4|new\.dat.*|transfer\.list|patch\.dat|bin|sin|mbn)"
+                      r"|-sign\.img|-p[^/]*|_[^/]*\.sin)$")
+companion_names = ["payload_properties.txt", "NON-HLOS.bin", "tz.mbn",
+                   "boot-verified.img", "recovery-verified.img", "dtbo-verified.img"]
+
+tail_size = 65536 + 22
+buffer_size = 1 << 20
+timeout = (15, 60)
+
+session = requests.Session()
+
+_eocd = struct.Struct("<4s4H2LH")
+_eocd64_locator = struct.Struct("<4sLQL")
+_eocd64 = struct.Struct("<4sQ2H2L4Q")
+_central = struct.Struct("<4s6H3L5H2L")
+_local = struct.Struct("<4s5H3L2H")
+
+class RemoteZipError(Exception):
+    pass
+
+class Member:
+    def __init__(self, name, flags, method, crc, csize, size, offset):
+        self.name = name
+        self.flags = flags
+        self.method = method
+        self.crc = crc
+        self.csize = csize
+        self.size = size
+        self.offset = offset
+        # First byte past this member's local record, filled in by RemoteZip
+        self.end = None
+
+class RemoteZip:
+    def __init__(self, url):
+        self.url = url
+        self.length = self.probe()
+        self.members = self.read_directory()
+
+    def fetch(self, start, end):
+        headers = {"Range": "bytes={}-{}".format(start, end - 1)}
+        dat = session.get(self.url, headers=headers, timeout=timeout)
+        dat.raise_for_status()
+        if dat.status_code != 206:
+            raise RemoteZipError("server does not support range requests")
+        return dat.content
+
+    def probe(self):
+        dat = session.head(self.url, allow_redirects=True, timeout=timeout)
+        dat.raise_for_status()
+        self.url = dat.url
+        if dat.headers.get("Accept-Ranges", "").lower() != "bytes":
+            raise RemoteZipError("server does not support range requests")
+        return int(dat.headers["Content-Length"])
+
+    def read_directory(self):
+        tail_start = max(0, self.length - tail_size)
+        tail = self.fetch(tail_start, self.length)
+        pos = tail.rfind(b"PK\x05\x06")
+        if pos < 0 or pos + _eocd.size > len(tail):
+            raise RemoteZipError("not a zip file")
+        (_, _, _, _, count, cd_size, cd_offset, _) = _eocd.unpack_from(tail, pos)
+
+        locator = pos - _eocd64_locator.size
+        if locator >= 0 and tail[locator:locator + 4] == b"PK\x06\x07":
+            (_, _, eocd64_offset, _) = _eocd64_locator.unpack_from(tail, locator)
+            if eocd64_offset >= tail_start:
+                record = tail[eocd64_offset - tail_start:]
+            else:
+                record = self.fetch(eocd64_offset, eocd64_offset + _eocd64.size)
+            (sig, _, _, _, _, _, _, count, cd_size, cd_offset) = _eocd64.unpack_from(record)
+            if sig != b"PK\x06\x06":
+                raise RemoteZipError("corrupt zip64 end of central directory")
+
+        if cd_offset >= tail_start:
+            directory = tail[cd_offset - tail_start:cd_offset - tail_start + cd_size]
+        else:
+            directory = self.fetch(cd_offset, cd_offset + cd_size)
+
+        members = []
+        pos = 0
+        for _ in range(count):
+            (sig, _, _, flags, method, _, _, crc, csize, size, nlen, elen, clen,
+             _, _, _, offset) = _central.unpack_from(directory, pos)
+            if sig != b"PK\x01\x02":
+                raise RemoteZipError("corrupt central directory")
+            pos += _central.size
+            name = directory[pos:pos + nlen].decode("utf-8" if flags & 0x800 else "cp437")
+            extra = directory[pos + nlen:pos + nlen + elen]
+            pos += nlen + elen + clen
+            # zip64 extra field, only saturated fields are present
+            epos = 0
+            while epos + 4 <= len(extra):
+                eid, esize = struct.unpack_from("<2H", extra, epos)
+                if eid == 0x0001:
+                    values = iter(struct.unpack_from("<{}Q".format(esize // 8), extra, epos + 4))
+                    if size == 0xFFFFFFFF:
+                        size = next(values)
+                    if csize == 0xFFFFFFFF:
+                        csize = next(values)
+                    if offset == 0xFFFFFFFF:
+                        offset = next(values)
+                    break
+                epos += 4 + esize
+            members.append(Member(name, flags, method, crc, csize, size, offset))
+
+        ends = sorted(m.offset for m in members) + [cd_offset]
+        for member in members:
+            member.end = ends[ends.index(member.offset) + 1]
+        return members
+
+    def select(self, partitions=()):
+        names = [m.name for m in self.members if not m.name.endswith("/")]
+        if not any(firmware_pattern.search(n) and not firmware_exclude.search(n) for n in names):
+            return []
+        companions = None
+        if partitions:
+            companions = re.compile(r"^({})".format("|".join(map(re.escape, partitions)))
+                                    + companion_suffixes)
+        wanted = []
+        for member in self.members:
+            if member.name.endswith("/"):
+                continue
+            base = os.path.basename(member.name)
+            if (firmware_pattern.search(member.name) and not firmware_exclude.search(member.name)) \
+                    or base in companion_names \
+                    or (companions and companions.search(base)):
+                wanted.append(member)
+        return flatten(wanted)
+
+    def stream(self, member, out):
+        """Write the decompressed member to the binary file out"""
+        if member.method == 0:
+            decomp = None
+        elif member.method == 8:
+            decomp = zlib.decompressobj(-15)
+        elif member.method == 12:
+            decomp = bz2.BZ2Decompressor()
+        else:
+            raise RemoteZipError("{}: unsupported compression method {}".format(member.name, member.method))
+
+        headers = {"Range": "bytes={}-{}".format(member.offset, member.end - 1)}
+        with session.get(self.url, headers=headers, stream=True, timeout=timeout) as dat:
+            dat.raise_for_status()
+            if dat.status_code != 206:
+                raise RemoteZipError("server does not support range requests")
+            header = dat.raw.read(_local.size)
+            (sig, _, _, _, _, _, _, _, _, nlen, elen) = _local.unpack(header)
+            if sig != b"PK\x03\x04":
+                raise RemoteZipError("{}: bad local header".format(member.name))
+            dat.raw.read(nlen + elen)
+
+            crc = 0
+            left = member.csize
+            while left > 0:
+                chunk = dat.raw.read(min(left, buffer_size))
+                if not chunk:
+                    raise RemoteZipError("{}: truncated".format(member.name))
+                left -= len(chunk)
+                if decomp is not None:
+                    chunk = decomp.decompress(chunk)
+                crc = zlib.crc32(chunk, crc)
+                out.write(chunk)
+            if member.method == 8:
+                chunk = decomp.flush()
+                crc = zlib.crc32(chunk, crc)
+                out.write(chunk)
+
+        if crc & 0xFFFFFFFF != member.crc:
+            raise RemoteZipError("{}: CRC mismatch".format(member.name))
+
+    def extract(self, member, outdir):
+        # Flattened, like 7zz e
+        path = os.path.join(outdir, os.path.basename(member.name))
+        print("[+] Fetching {} ({} bytes)".format(member.name, member.csize))
+        with open(path, "wb", buffering=buffer_size) as out:
+            self.stream(member, out)
+        return path
+
+def flatten(members):
+    """One member per output name, the last in the archive like 7zz e leaves it"""
+    last = {}
+    for member in members:
+        last[os.path.basename(member.name)] = member
+    return list(last.values())
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch firmware members of a remote zip via HTTP range requests")
+    parser.add_argument("url", help="URL of the zip")
+    parser.add_argument("-l", "--list", action="store_true", help="list the members and exit")
+    parser.add_argument("-o", "--outdir", default=".", help="output directory (default: %(default)s)")
+    parser.add_argument("-P", "--partitions", default="",
+                        help="space separated partition names whose images should be fetched too")
+    parser.add_argument("-m", "--member", action="append", default=[],
+                        help="fetch this member instead of the automatic selection (repeatable)")
+    parser.add_argument("-O", "--stdout", action="store_true",
+                        help="stream the single selected member to stdout")
+    parser.add_argument("-j", "--jobs", type=int, default=4, help="parallel member downloads")
+    args = parser.parse_args()
+
+    try:
+        archive = RemoteZip(args.url)
+    except (RemoteZipError, requests.exceptions.RequestException, KeyError, ValueError) as e:
+        print("[!] {}".format(e), file=sys.stderr)
+        return 2
+
+    if args.list:
+        for member in archive.members:
+            print("{:>12} {:>12} {}".format(member.size, member.csize, member.name))
+        return 0
+
+    if args.member:
+        wanted = flatten(m for m in archive.members if m.name in args.member)
+    else:
+        wanted = archive.select(args.partitions.split())
+    if not wanted:
+        print("[!] Nothing worth a partial fetch in this archive", file=sys.stderr)
+        return 3
+
+    try:
+        if args.stdout:
+            if len(wanted) != 1:
+                print("[!] --stdout needs exactly one member", file=sys.stderr)
+                return 1
+            archive.stream(wanted[0], sys.stdout.buffer)
+            return 0
+
+        os.makedirs(args.outdir, exist_ok=True)
+        with ThreadPoolExecutor(max_workers=max(args.jobs, 1)) as pool:
+            list(pool.map(lambda m: archive.extract(m, args.outdir), wanted))
+    except (RemoteZipError, requests.exceptions.RequestException) as e:
+        print("[!] {}".format(e), file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+
+# Carve device trees out of boot, vendor_boot, dtbo and dtb images
+#
+# The image is mmapped and searched for the d00dfeed FDT magic; a hit is
+# only taken when its header is sane, and the blob is cut at the header's
+# totalsize, so padding and whatever follows stay out of it. dtbo images are
+# read through their dt_table entries, compressed entries included. Blobs are
+# written as NN_dtbdump_<model>.dtb like extract-dtb named them, then dtc
+# decompiles them to .dts, several dtc processes at a time.
+
+import os
+import sys
+import mmap
+import zlib
+import struct
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+fdt_magic = b"\xd0\x0d\xfe\xed"
+dt_table_magic = b"\xd7\xb7\xab\x1e"
+
+fdt_begin_node = 1
+fdt_end_node = 2
+fdt_prop = 3
+fdt_nop = 4
+fdt_end = 9
+
+_fdt_header = struct.Struct(">10I")
+_dt_table = struct.Struct(">4s7I")
+_dt_entry = struct.Struct(">8I")
+
+class DtbError(Exception):
+    pass
+
+def fdt_size(data, pos):
+    """totalsize of the FDT at pos, None if the header there does not hold up"""
+    if pos + _fdt_header.size > len(data):
+        return None
+    (_, total, off_struct, off_strings, off_rsvmap, version, last_comp, _, size_strings, size_struct) = \
+        _fdt_header.unpack_from(data, pos)
+    if total < _fdt_header.size or pos + total > len(data) or not 1 <= last_comp <= version <= 17:
+        return None
+    if off_rsvmap > total or off_struct > total or off_strings > total:
+        return None
+    if version >= 17 and (off_struct + size_struct > total or off_strings + size_strings > total):
+        return None
+    return total
+
+def fdt_model(blob):
+    """model property of the root node, empty if there is none"""
+    (_, _, off_struct, off_strings, _, _, _, _, _, _) = _fdt_header.unpack_from(blob)
+    pos = off_struct
+    depth = 0
+    while pos + 4 <= len(blob):
+        token = struct.unpack_from(">I", blob, pos)[0]
+        pos += 4
+        if token == fdt_begin_node:
+            end = blob.index(b"\0", pos)
+            pos = (end + 4) & ~3
+            depth += 1
+        elif token == fdt_end_node:
+            depth -= 1
+            if depth == 0:
+                break
+        elif token == fdt_prop:
+            (length, nameoff) = struct.unpack_from(">2I", blob, pos)
+            pos += 8
+            name = blob[off_strings + nameoff:blob.index(b"\0", off_strings + nameoff)]
+            if depth == 1 and name == b"model":
+                return blob[pos:pos + length].split(b"\0", 1)[0].decode("utf-8", "replace")
+            pos = (pos + length + 3) & ~3
+        elif token != fdt_nop:
+            break
+    return ""
+
+def scan_fdts(data):
+    """Every sane FDT in data, as bytes"""
+    blobs = []
+    pos = data.find(fdt_magic)
+    while pos != -1:
+        size = fdt_size(data, pos)
+        if size:
+            blobs.append(bytes(data[pos:pos + size]))
+            pos = data.find(fdt_magic, pos + size)
+        else:
+            pos = data.find(fdt_magic, pos + 1)
+    return blobs
+
+def dt_table_entries(data):
+    """Blobs of a dtbo image (Android dt_table), gzip and lz4 entries decompressed"""
+    (_, total, header_size, entry_size, count, entries, _, version) = _dt_table.unpack_from(data)
+    if total > len(data) or entries + count * entry_size > len(data):
+        raise DtbError("dt_table beyond the end of the image")
+    blobs = []
+    for i in range(count):
+        (size, offset, _, _, flags, _, _, _) = _dt_entry.unpack_from(data, entries + i * entry_size)
+        blob = bytes(data[offset:offset + size])
+        compression = flags & 0xF if version >= 1 else 0
+        if compression == 1:
+            blob = zlib.decompress(blob, zlib.MAX_WBITS | 32)
+        elif compression == 2:
+            if lz4 is None:
+                raise DtbError("lz4 compressed dt_table entry, the lz4 module is not installed")
+            blob = lz4.frame.decompress(blob)
+        if fdt_size(blob, 0) is None:
+            raise DtbError("dt_table entry {} is not a device tree".format(i))
+        blobs.append(blob)
+    return blobs
+
+def blob_name(index, blob):
+    model = fdt_model(blob)
+    name = "{:02d}_dtbdump".format(index)
+    if model:
+        name += "_" + model.replace(" ", "_").replace("/", "_")
+    return name + ".dtb"
+
+def decompile(dtc, dtb, dts):
+    result = subprocess.run([dtc, "-q", "-s", "-f", "-I", "dtb", "-O", "dts", "-o", dts, dtb],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return result.returncode == 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract and decompile the device trees of an image")
+    parser.add_argument("image", help="boot, vendor_boot, dtbo or dtb image")
+    parser.add_argument("-o", "--outdir", required=True, help="folder for the .dtb files")
+    parser.add_argument("-d", "--dtsdir", default=None, help="decompile to .dts files in this folder")
+    parser.add_argument("--dtc", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "dtc"),
+                        help="dtc binary (default: the one next to this script)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="dtc processes at the same time (default: %(default)s)")
+    args = parser.parse_args()
+
+    try:
+        with open(args.image, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if data[:4] == dt_table_magic:
+                blobs = dt_table_entries(data)
+            else:
+                blobs = scan_fdts(data)
+    except (DtbError, struct.error, zlib.error, RuntimeError, OSError, ValueError) as e:
+        print("[!] {}: {}".format(args.image, e), file=sys.stderr)
+        return 1
+
+    os.makedirs(args.outdir, exist_ok=True)
+    written = []
+    for index, blob in enumerate(blobs, 1):
+        try:
+            name = blob_name(index, blob)
+        except (struct.error, ValueError):
+            name = "{:02d}_dtbdump.dtb".format(index)
+        with open(os.path.join(args.outdir, name), "wb") as f:
+            f.write(blob)
+        written.append(name)
+    print("[+] {} device trees from {}".format(len(written), args.image))
+
+    if args.dtsdir and written:
+        os.makedirs(args.dtsdir, exist_ok=True)
+        # dtc does the work, the pool only keeps enough of them running
+        with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+            results = pool.map(lambda name: decompile(args.dtc, os.path.join(args.outdir, name),
+                                                      os.path.join(args.dtsdir, name[:-4] + ".dts")), written)
+            failed = [name for name, ok in zip(written, results) if not ok]
+        for name in failed:
+            print("[!] dtc failed on {}".format(name), file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
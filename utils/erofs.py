@@ -0,0 +1,707 @@
+#!/usr/bin/env python3
+
+# Read EROFS partition images without fsck.erofs or a mount
+#
+# The image is mmapped and parsed in process: superblock, compact and
+# extended inodes, flat, tail-packed and chunk based data, full and compact
+# compression indexes (2B and 4B packs, big pclusters), inline tail
+# pclusters and fragments, and LZ4, MicroLZMA, DEFLATE and Zstandard
+# clusters. Whole trees are extracted by a pool of worker processes, each
+# decompressing its own files; single paths can be read on their own.
+# LZ4 uses the lz4 module when installed, lz4block.py otherwise.
+
+import os
+import sys
+import mmap
+import stat
+import zlib
+import lzma
+import struct
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import lz4block
+try:
+    import lz4.block
+except ImportError:
+    lz4 = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+sb_offset = 1024
+sb_magic = 0xE0F5E1E2
+null_addr = 0xFFFFFFFF
+
+# Incompatible features this reader cares about
+incompat_zero_padding = 0x1
+incompat_device_table = 0x8
+
+# Inode data layouts
+layout_flat_plain = 0
+layout_compressed_full = 1
+layout_flat_inline = 2
+layout_compressed_compact = 3
+layout_chunk_based = 4
+
+chunk_format_blkbits = 0x1F
+chunk_format_indexes = 0x20
+
+# Compression map header advise bits
+advise_compacted_2b = 0x1
+advise_big_pcluster_1 = 0x2
+advise_big_pcluster_2 = 0x4
+advise_inline_pcluster = 0x8
+advise_interlaced_pcluster = 0x10
+advise_fragment_pcluster = 0x20
+
+# Logical cluster types
+lcluster_plain = 0
+lcluster_head1 = 1
+lcluster_nonhead = 2
+lcluster_head2 = 3
+
+li_d0_cblkcnt = 1 << 11
+
+# Compression algorithms
+comp_lz4 = 0
+comp_lzma = 1
+comp_deflate = 2
+comp_zstd = 3
+
+lzma_max_dict = 8 << 20
+
+xattr_prefixes = {
+    1: "user.",
+    2: "system.posix_acl_access",
+    3: "system.posix_acl_default",
+    4: "trusted.",
+    5: "lustre.",
+    6: "security.",
+}
+
+_dirent = struct.Struct("<QHBB")
+_xattr_entry = struct.Struct("<BBH")
+_lcluster_index = struct.Struct("<2HI")
+
+class ErofsError(Exception):
+    pass
+
+# Everything a corrupt or unsupported image can raise while being read
+read_errors = (ErofsError, struct.error, lzma.LZMAError, zlib.error, lz4block.LZ4BlockError)
+
+def align(value, size):
+    return (value + size - 1) // size * size
+
+class Inode:
+    def __init__(self, nid, pos, isize, layout, mode, size, mtime, u, xattr_isize):
+        self.nid = nid
+        self.pos = pos
+        self.isize = isize
+        self.layout = layout
+        self.mode = mode
+        self.size = size
+        self.mtime = mtime
+        # raw_blkaddr, compressed block count or chunk format, by layout
+        self.u = u
+        self.xattr_isize = xattr_isize
+
+    @property
+    def end(self):
+        """First byte past the inode and its inline xattrs"""
+        return self.pos + self.isize + self.xattr_isize
+
+    def is_dir(self):
+        return stat.S_ISDIR(self.mode)
+
+    def is_reg(self):
+        return stat.S_ISREG(self.mode)
+
+    def is_link(self):
+        return stat.S_ISLNK(self.mode)
+
+class Lcluster:
+    def __init__(self, kind, clusterofs, pblk=0, delta0=0, compressedblks=0, nextpackoff=0):
+        self.kind = kind
+        self.clusterofs = clusterofs
+        self.pblk = pblk
+        self.delta0 = delta0
+        self.compressedblks = compressedblks
+        self.nextpackoff = nextpackoff
+
+class ZMap:
+    """Compression parameters from the map header of an inode"""
+    def __init__(self):
+        self.advise = 0
+        self.algorithms = (comp_lz4, comp_lz4)
+        self.clusterbits = 0
+        self.idata_size = 0
+        self.idata_pos = 0
+        self.fragment_offset = 0
+        self.tail_head = None
+        self.whole_fragment = False
+
+class ErofsImage:
+    def __init__(self, path, offset=0):
+        self.path = path
+        self.base = offset
+        self.file = open(path, "rb")
+        try:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self.file.close()
+            raise ErofsError("{} is empty".format(path))
+        self.packed = None
+        self.packed_extents = None
+        try:
+            self.read_superblock()
+        except (ErofsError, struct.error):
+            self.close()
+            raise
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def read_superblock(self):
+        sb = self.base + sb_offset
+        if len(self.map) < sb + 128:
+            raise ErofsError("image too small")
+        (magic,) = struct.unpack_from("<I", self.map, sb)
+        if magic != sb_magic:
+            raise ErofsError("no EROFS superblock at offset {}".format(self.base))
+        self.blkszbits = self.map[sb + 12]
+        (self.root_nid, _, self.build_time) = struct.unpack_from("<HQQ", self.map, sb + 14)
+        (self.meta_blkaddr, self.xattr_blkaddr) = struct.unpack_from("<2I", self.map, sb + 40)
+        (self.incompat,) = struct.unpack_from("<I", self.map, sb + 80)
+        (extra_devices,) = struct.unpack_from("<H", self.map, sb + 86)
+        (self.packed_nid,) = struct.unpack_from("<Q", self.map, sb + 96)
+        self.block_size = 1 << self.blkszbits
+        if extra_devices and self.incompat & incompat_device_table:
+            raise ErofsError("multi-device images are not supported")
+
+    def inode(self, nid):
+        pos = self.base + (self.meta_blkaddr << self.blkszbits) + nid * 32
+        (fmt, xattr_icount, mode) = struct.unpack_from("<3H", self.map, pos)
+        layout = (fmt >> 1) & 0x7
+        if fmt & 1:
+            (size, u) = struct.unpack_from("<QI", self.map, pos + 8)
+            (mtime,) = struct.unpack_from("<Q", self.map, pos + 32)
+            isize = 64
+        else:
+            (size,) = struct.unpack_from("<I", self.map, pos + 8)
+            (u,) = struct.unpack_from("<I", self.map, pos + 16)
+            mtime = self.build_time
+            isize = 32
+        xattr_isize = 12 + (xattr_icount - 1) * 4 if xattr_icount else 0
+        return Inode(nid, pos, isize, layout, mode, size, mtime, u, xattr_isize)
+
+    def xattr_entry(self, pos, xattrs):
+        (name_len, name_index, value_size) = _xattr_entry.unpack_from(self.map, pos)
+        name = self.map[pos + 4:pos + 4 + name_len].decode("utf-8", "replace")
+        value = self.map[pos + 4 + name_len:pos + 4 + name_len + value_size]
+        if name_index & 0x80:
+            # Long prefixes live in the packed inode, keep the index visible
+            name = "prefix{}.{}".format(name_index & 0x7F, name)
+        else:
+            name = xattr_prefixes.get(name_index, "") + name
+        xattrs[name] = value
+        return align(4 + name_len + value_size, 4)
+
+    def xattrs(self, inode):
+        xattrs = {}
+        if not inode.xattr_isize:
+            return xattrs
+        header = inode.pos + inode.isize
+        shared_count = self.map[header + 4]
+        for i in range(shared_count):
+            (xid,) = struct.unpack_from("<I", self.map, header + 12 + i * 4)
+            self.xattr_entry(self.base + (self.xattr_blkaddr << self.blkszbits) + xid * 4, xattrs)
+        pos = header + 12 + shared_count * 4
+        while pos + _xattr_entry.size <= inode.end:
+            pos += self.xattr_entry(pos, xattrs)
+        return xattrs
+
+    def block(self, number):
+        return self.base + (number << self.blkszbits)
+
+    def view(self, start, length):
+        """Zero-copy slice of the image"""
+        return memoryview(self.map)[start:start + length]
+
+    # Uncompressed layouts
+
+    def flat_segments(self, inode):
+        size = inode.size
+        if inode.layout == layout_flat_inline:
+            nblocks = (size + self.block_size - 1) >> self.blkszbits
+            head = max(nblocks - 1, 0) << self.blkszbits
+            if head:
+                yield 0, self.view(self.block(inode.u), head)
+            if size > head:
+                yield head, self.view(inode.end, size - head)
+        elif size:
+            yield 0, self.view(self.block(inode.u), size)
+
+    def chunk_segments(self, inode):
+        fmt = inode.u & 0xFFFF
+        chunk_size = self.block_size << (fmt & chunk_format_blkbits)
+        count = (inode.size + chunk_size - 1) // chunk_size
+        unit = 8 if fmt & chunk_format_indexes else 4
+        pos = align(inode.end, unit)
+        for i in range(count):
+            if unit == 8:
+                (_, device, blkaddr) = struct.unpack_from("<2HI", self.map, pos + i * 8)
+                if device:
+                    raise ErofsError("chunk on an extra device")
+            else:
+                (blkaddr,) = struct.unpack_from("<I", self.map, pos + i * 4)
+            if blkaddr == null_addr:
+                continue
+            length = min(chunk_size, inode.size - i * chunk_size)
+            yield i * chunk_size, self.view(self.block(blkaddr), length)
+
+    # Compressed layouts, following the kernel's zmap.c
+
+    def zmap(self, inode):
+        z = ZMap()
+        pos = align(inode.end, 8)
+        h = self.map[pos:pos + 8]
+        if h[7] & 0x80:
+            # The whole file sits in the packed inode
+            z.advise = advise_fragment_pcluster
+            z.fragment_offset = struct.unpack_from("<Q", h)[0] ^ (1 << 63)
+            z.tail_head = 0
+            z.whole_fragment = True
+            return z
+        (fragment_offset,) = struct.unpack_from("<I", h)
+        (z.idata_size, z.advise) = struct.unpack_from("<2H", h, 2)
+        z.algorithms = (h[6] & 0xF, h[6] >> 4)
+        z.clusterbits = self.blkszbits + (h[7] & 0x7)
+        if z.advise & advise_fragment_pcluster:
+            z.fragment_offset = fragment_offset
+        return z
+
+    def load_full(self, inode, z, lcn):
+        pos = align(inode.end, 8) + 16 + lcn * _lcluster_index.size
+        (advise, clusterofs, blkaddr) = _lcluster_index.unpack_from(self.map, pos)
+        kind = advise & 0x3
+        if kind == lcluster_nonhead:
+            delta0 = blkaddr & 0xFFFF
+            if delta0 & li_d0_cblkcnt:
+                return Lcluster(kind, 1 << z.clusterbits, delta0=1,
+                                compressedblks=delta0 & ~li_d0_cblkcnt, nextpackoff=pos + 8)
+            return Lcluster(kind, 1 << z.clusterbits, delta0=delta0, nextpackoff=pos + 8)
+        return Lcluster(kind, clusterofs, pblk=blkaddr, nextpackoff=pos + 8)
+
+    def load_compact(self, inode, z, lcn, total):
+        ebase = align(inode.end, 8) + 8
+        initial = (32 - ebase % 32) // 4 & 7
+        compacted_2b = 0
+        if z.advise & advise_compacted_2b and initial < total:
+            compacted_2b = (total - initial) // 16 * 16
+        pos = ebase
+        if lcn < initial:
+            shift = 2
+        else:
+            pos += initial * 4
+            lcn -= initial
+            if lcn < compacted_2b:
+                shift = 1
+            else:
+                pos += compacted_2b * 2
+                lcn -= compacted_2b
+                shift = 2
+        pos += lcn << shift
+        return self.unpack_compact(z, shift, pos)
+
+    def unpack_compact(self, z, shift, pos):
+        if shift == 2 and z.clusterbits <= 14:
+            vcnt = 2
+        elif shift == 1 and z.clusterbits <= 12:
+            vcnt = 16
+        else:
+            raise ErofsError("unsupported compact index")
+        pack = vcnt << shift
+        start = pos - pos % (pack)
+        big_pcluster = z.advise & advise_big_pcluster_1
+        lobits = max(z.clusterbits, 12)
+        encodebits = (pack - 4) * 8 // vcnt
+        data = self.map[start:start + pack]
+
+        def decode(i):
+            bit = encodebits * i
+            (v,) = struct.unpack_from("<I", data[bit // 8:bit // 8 + 4].ljust(4, b"\0"))
+            v >>= bit & 7
+            return v & ((1 << lobits) - 1), (v >> lobits) & 3
+
+        i = (pos - start) >> shift
+        lo, kind = decode(i)
+        nextpackoff = start + pack
+        if kind == lcluster_nonhead:
+            full = 1 << z.clusterbits
+            if lo & li_d0_cblkcnt:
+                if not big_pcluster:
+                    raise ErofsError("corrupt compact index")
+                return Lcluster(kind, full, delta0=1, compressedblks=lo & ~li_d0_cblkcnt,
+                                nextpackoff=nextpackoff)
+            if i + 1 != vcnt:
+                return Lcluster(kind, full, delta0=lo, nextpackoff=nextpackoff)
+            # The last lcluster of a pack keeps delta[1], derive delta[0]
+            # from the one before it
+            lo, kind = decode(i - 1)
+            if kind != lcluster_nonhead:
+                lo = 0
+            elif lo & li_d0_cblkcnt:
+                lo = 1
+            return Lcluster(lcluster_nonhead, full, delta0=lo + 1, nextpackoff=nextpackoff)
+
+        head, clusterofs = kind, lo
+        if not big_pcluster:
+            nblk = 1
+            while i > 0:
+                i -= 1
+                lo, kind = decode(i)
+                if kind == lcluster_nonhead:
+                    i -= lo
+                if i >= 0:
+                    nblk += 1
+        else:
+            nblk = 0
+            while i > 0:
+                i -= 1
+                lo, kind = decode(i)
+                if kind == lcluster_nonhead:
+                    if lo & li_d0_cblkcnt:
+                        i -= 1
+                        nblk += lo & ~li_d0_cblkcnt
+                        continue
+                    if lo <= 1:
+                        raise ErofsError("corrupt compact index")
+                    i -= lo - 2
+                    continue
+                nblk += 1
+        (blkaddr,) = struct.unpack_from("<I", data, pack - 4)
+        return Lcluster(head, clusterofs, pblk=blkaddr + nblk, nextpackoff=nextpackoff)
+
+    def z_extents(self, inode):
+        """(la, llen, where, pa, plen, algorithm) of every extent of a compressed inode"""
+        z = self.zmap(inode)
+        if z.whole_fragment:
+            return z, [(0, inode.size, "fragment", 0, 0, None)]
+        total = (inode.size + (1 << z.clusterbits) - 1) >> z.clusterbits
+        if inode.layout == layout_compressed_full:
+            load = lambda lcn: self.load_full(inode, z, lcn)
+        else:
+            load = lambda lcn: self.load_compact(inode, z, lcn, total)
+
+        lclusters = [load(lcn) for lcn in range(total)]
+        if lclusters:
+            z.idata_pos = lclusters[-1].nextpackoff
+        heads = [lcn for lcn, m in enumerate(lclusters) if m.kind != lcluster_nonhead]
+        if heads:
+            z.tail_head = heads[-1]
+
+        extents = []
+        for n, lcn in enumerate(heads):
+            m = lclusters[lcn]
+            la = lcn << z.clusterbits | m.clusterofs
+            if n + 1 < len(heads):
+                end = heads[n + 1] << z.clusterbits | lclusters[heads[n + 1]].clusterofs
+            else:
+                end = inode.size
+            end = min(end, inode.size)
+            if la >= end:
+                continue
+
+            if m.kind == lcluster_plain:
+                if z.advise & advise_interlaced_pcluster:
+                    algorithm = "interlaced"
+                else:
+                    algorithm = "shifted"
+            else:
+                algorithm = z.algorithms[1 if m.kind == lcluster_head2 else 0]
+
+            if z.advise & advise_inline_pcluster and lcn == z.tail_head:
+                extents.append((la, end - la, "inline", z.idata_pos, z.idata_size, algorithm))
+                continue
+            if z.advise & advise_fragment_pcluster and lcn == z.tail_head:
+                extents.append((la, end - la, "fragment", 0, 0, algorithm))
+                continue
+
+            big = z.advise & (advise_big_pcluster_2 if m.kind == lcluster_head2 else advise_big_pcluster_1)
+            plen = 1 << z.clusterbits
+            if m.kind != lcluster_plain and big and lcn + 1 < total:
+                following = lclusters[lcn + 1]
+                if following.kind == lcluster_nonhead and following.compressedblks:
+                    plen = following.compressedblks << self.blkszbits
+                elif following.kind == lcluster_nonhead:
+                    raise ErofsError("big pcluster without a block count")
+            extents.append((la, end - la, "block", self.block(m.pblk), plen, algorithm))
+        return z, extents
+
+    def skip_padding(self, src):
+        if not self.incompat & incompat_zero_padding:
+            return src
+        limit = min(len(src), self.block_size)
+        for i in range(limit):
+            if src[i]:
+                return src[i:]
+        raise ErofsError("pcluster of zeros")
+
+    def decompress(self, algorithm, src, llen, la):
+        if algorithm == "shifted":
+            return src[:llen]
+        if algorithm == "interlaced":
+            # The part up to the block boundary sits at la % block_size of the
+            # last block, even when the extent ends before that block does
+            start = len(src) - (self.block_size - la % self.block_size)
+            head = min(self.block_size - la % self.block_size, llen)
+            return bytes(src[start:start + head]) + bytes(src[:llen - head])
+        src = bytes(self.skip_padding(src))
+        if algorithm == comp_lz4:
+            if lz4 is not None:
+                try:
+                    return lz4.block.decompress(src, uncompressed_size=llen)
+                except lz4.block.LZ4BlockError:
+                    # Partial references decode to more than llen
+                    pass
+            return lz4block.decompress(src, llen)
+        if algorithm == comp_lzma:
+            # MicroLZMA: the first range coder byte is replaced by ~properties
+            props = ~src[0] & 0xFF
+            filters = [{"id": lzma.FILTER_LZMA1, "dict_size": lzma_max_dict,
+                        "lc": props % 9, "lp": props // 9 % 5, "pb": props // 45}]
+            decomp = lzma.LZMADecompressor(lzma.FORMAT_RAW, filters=filters)
+            return decomp.decompress(b"\0" + src[1:], llen)
+        if algorithm == comp_deflate:
+            return zlib.decompressobj(-15).decompress(src, llen)
+        if algorithm == comp_zstd:
+            if zstandard is None:
+                raise ErofsError("zstd cluster, the zstandard module is not installed")
+            return zstandard.ZstdDecompressor().decompressobj().decompress(src)[:llen]
+        raise ErofsError("unknown compression algorithm {}".format(algorithm))
+
+    def packed_inode(self):
+        if self.packed is None:
+            if not self.packed_nid:
+                raise ErofsError("fragment without a packed inode")
+            self.packed = self.inode(self.packed_nid)
+        return self.packed
+
+    def compressed_segments(self, inode, start, end):
+        if inode is self.packed:
+            # Read once per file tail, keep its index around
+            if self.packed_extents is None:
+                self.packed_extents = self.z_extents(inode)
+            z, extents = self.packed_extents
+        else:
+            z, extents = self.z_extents(inode)
+        for la, llen, where, pa, plen, algorithm in extents:
+            if la + llen <= start or (end is not None and la >= end):
+                continue
+            if where == "fragment":
+                yield la, self.read_range(self.packed_inode(), z.fragment_offset, llen)
+                continue
+            data = self.decompress(algorithm, self.map[pa:pa + plen], llen, la)
+            if len(data) < llen:
+                raise ErofsError("short pcluster at {} of nid {}".format(la, inode.nid))
+            yield la, data
+
+    def segments(self, inode, start=0, end=None):
+        """(offset, data) pieces of an inode's contents, holes left out
+
+        Compressed extents outside start..end are not decompressed, the other
+        layouts are cheap to slice and are returned whole.
+        """
+        if inode.layout in (layout_flat_plain, layout_flat_inline):
+            return self.flat_segments(inode)
+        if inode.layout == layout_chunk_based:
+            return self.chunk_segments(inode)
+        if inode.layout in (layout_compressed_full, layout_compressed_compact):
+            return self.compressed_segments(inode, start, end)
+        raise ErofsError("unknown data layout {}".format(inode.layout))
+
+    def read_range(self, inode, start, length):
+        out = bytearray(length)
+        for offset, data in self.segments(inode, start, start + length):
+            lo = max(offset, start)
+            hi = min(offset + len(data), start + length)
+            if lo < hi:
+                out[lo - start:hi - start] = data[lo - offset:hi - offset]
+            if offset >= start + length:
+                break
+        return bytes(out)
+
+    def read_data(self, inode):
+        return self.read_range(inode, 0, inode.size)
+
+    def readlink(self, inode):
+        return self.read_data(inode).decode("utf-8", "surrogateescape")
+
+    def listdir(self, inode):
+        """(name, nid) of a directory, without . and .."""
+        entries = []
+        data = self.read_data(inode)
+        for block in range(0, len(data), self.block_size):
+            chunk = data[block:block + self.block_size]
+            if len(chunk) < _dirent.size:
+                break
+            (_, first, _, _) = _dirent.unpack_from(chunk, 0)
+            count = first // _dirent.size
+            for i in range(count):
+                (nid, nameoff, _, _) = _dirent.unpack_from(chunk, i * _dirent.size)
+                if i + 1 < count:
+                    nameend = _dirent.unpack_from(chunk, (i + 1) * _dirent.size)[1]
+                    name = chunk[nameoff:nameend]
+                else:
+                    name = chunk[nameoff:].split(b"\0", 1)[0]
+                name = name.decode("utf-8", "surrogateescape")
+                if name not in (".", ".."):
+                    entries.append((name, nid))
+        return entries
+
+    def lookup(self, path, follow=True, depth=0):
+        """Inode of a path inside the image, symlinks resolved when follow is set"""
+        if depth > 8:
+            raise ErofsError("too many levels of symbolic links: {}".format(path))
+        inode = self.inode(self.root_nid)
+        parts = [p for p in path.split("/") if p and p != "."]
+        walked = []
+        for i, part in enumerate(parts):
+            if part == "..":
+                walked = walked[:-1]
+                inode = self.lookup("/".join(walked), follow, depth)
+                continue
+            if not inode.is_dir():
+                raise ErofsError("not a directory: {}".format("/".join(walked)))
+            nid = dict(self.listdir(inode)).get(part)
+            if nid is None:
+                raise ErofsError("no such file: {}".format(path))
+            inode = self.inode(nid)
+            if inode.is_link() and (follow or i < len(parts) - 1):
+                target = self.readlink(inode)
+                base = "" if target.startswith("/") else "/".join(walked)
+                inode = self.lookup(base + "/" + target, True, depth + 1)
+            walked.append(part)
+        return inode
+
+    def read(self, path):
+        inode = self.lookup(path)
+        if inode.is_dir():
+            raise ErofsError("is a directory: {}".format(path))
+        return self.read_data(inode)
+
+    def walk(self, path=""):
+        """(relative path, inode) for path and everything below it"""
+        top = self.lookup(path, follow=False)
+        stack = [(path.strip("/"), top)]
+        while stack:
+            rel, inode = stack.pop()
+            yield rel, inode
+            if inode.is_dir():
+                for name, nid in self.listdir(inode):
+                    stack.append((rel + "/" + name if rel else name, self.inode(nid)))
+
+    def copy_file(self, inode, target):
+        with open(target, "wb") as out:
+            for offset, data in self.segments(inode):
+                out.seek(offset)
+                out.write(data)
+            out.truncate(inode.size)
+        os.chmod(target, (inode.mode & 0o777) | 0o600)
+        os.utime(target, (inode.mtime, inode.mtime))
+
+    def extract(self, outdir, paths=("",), jobs=None, contexts=None):
+        """Extract paths (the whole image by default) below outdir, returns the number of files"""
+        files = []
+        for path in paths:
+            for rel, inode in self.walk(path):
+                target = os.path.join(outdir, rel) if rel else outdir
+                if contexts is not None:
+                    label = self.xattrs(inode).get("security.selinux")
+                    if label:
+                        contexts.append(("/" + rel, label.rstrip(b"\0").decode("utf-8", "replace")))
+                if inode.is_dir():
+                    os.makedirs(target, exist_ok=True)
+                elif inode.is_link():
+                    os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+                    if os.path.lexists(target):
+                        os.unlink(target)
+                    os.symlink(self.readlink(inode), target)
+                elif inode.is_reg():
+                    os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+                    files.append((inode.nid, target))
+
+        jobs = jobs or os.cpu_count() or 1
+        if jobs == 1 or len(files) < 2:
+            for nid, target in files:
+                self.copy_file(self.inode(nid), target)
+        else:
+            # Biggest first, so a large file does not end up alone at the end
+            files.sort(key=lambda item: self.inode(item[0]).size, reverse=True)
+            # Callers such as partextract run this from worker threads, forking
+            # them could copy a lock another thread holds
+            with ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context("forkserver"),
+                                     initializer=init_worker,
+                                     initargs=(self.path, self.base)) as pool:
+                list(pool.map(extract_file, files, chunksize=max(1, min(64, len(files) // (jobs * 4)))))
+        return len(files)
+
+# Per worker process state, set up once by init_worker
+_image = None
+
+def init_worker(path, offset):
+    global _image
+    _image = ErofsImage(path, offset)
+
+def extract_file(item):
+    nid, target = item
+    _image.copy_file(_image.inode(nid), target)
+
+def main():
+    parser = argparse.ArgumentParser(description="Read and extract EROFS images without mounting")
+    parser.add_argument("image", help="EROFS image")
+    parser.add_argument("paths", nargs="*", default=[""], help="paths to extract (default: everything)")
+    parser.add_argument("-o", "--outdir", default=".", help="output directory (default: %(default)s)")
+    parser.add_argument("-O", "--offset", type=int, default=0, help="byte offset of the filesystem in the image")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="worker processes (default: %(default)s)")
+    parser.add_argument("-l", "--list", action="store_true", help="list the given paths instead of extracting")
+    parser.add_argument("-c", "--cat", metavar="PATH", default=None, help="write one file to stdout")
+    parser.add_argument("--contexts", metavar="FILE", default=None,
+                        help="write the SELinux label of every extracted path to FILE")
+    args = parser.parse_intermixed_args()
+
+    try:
+        with ErofsImage(args.image, args.offset) as image:
+            if args.cat:
+                sys.stdout.buffer.write(image.read(args.cat))
+                return 0
+            if args.list:
+                for path in args.paths:
+                    for rel, inode in image.walk(path):
+                        print("{:o}\t{}\t/{}".format(inode.mode, inode.size, rel))
+                return 0
+            contexts = [] if args.contexts else None
+            count = image.extract(args.outdir, args.paths, args.jobs, contexts)
+            if contexts is not None:
+                with open(args.contexts, "w") as f:
+                    for path, label in contexts:
+                        f.write("{} {}\n".format(path, label))
+            print("[+] Extracted {} files from {}".format(count, args.image))
+    except read_errors + (OSError,) as e:
+        print("[!] {}: {}".format(args.image, e), file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
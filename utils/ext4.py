@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+
+# Read ext4 partition images without mounting them
+#
+# The image is mmapped and walked in process: superblock, group descriptors,
+# extent trees and legacy block maps, inline data, symlinks and extended
+# attributes. Whole trees are extracted with a thread pool writing files
+# straight from the mapping, single paths (build.prop and friends) can be
+# read without touching the rest. A byte offset skips vendor headers such as
+# MOTO or ASUS in front of the filesystem, no dd copy needed.
+
+import os
+import sys
+import mmap
+import stat
+import struct
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+sb_magic = 0xEF53
+extent_magic = 0xF30A
+xattr_magic = 0xEA020000
+root_inode = 2
+
+# Feature flags this reader cares about
+incompat_meta_bg = 0x10
+incompat_64bit = 0x80
+incompat_encrypt = 0x10000
+
+# Inode flags
+flag_extents = 0x80000
+flag_inline_data = 0x10000000
+
+xattr_prefixes = {
+    1: "user.",
+    2: "system.posix_acl_access",
+    3: "system.posix_acl_default",
+    4: "trusted.",
+    6: "security.",
+    7: "system.",
+    8: "system.richacl",
+}
+
+_extent_header = struct.Struct("<4HI")
+_extent = struct.Struct("<I2HI")
+_extent_index = struct.Struct("<IIH2x")
+_dirent = struct.Struct("<IHBB")
+_xattr_entry = struct.Struct("<BBHIII")
+
+class Ext4Error(Exception):
+    pass
+
+class Inode:
+    def __init__(self, number, mode, size, mtime, flags, block, file_acl, xattrs):
+        self.number = number
+        self.mode = mode
+        self.size = size
+        self.mtime = mtime
+        self.flags = flags
+        self.block = block
+        self.file_acl = file_acl
+        self.xattrs = xattrs
+
+    def is_dir(self):
+        return stat.S_ISDIR(self.mode)
+
+    def is_reg(self):
+        return stat.S_ISREG(self.mode)
+
+    def is_link(self):
+        return stat.S_ISLNK(self.mode)
+
+class Ext4Image:
+    def __init__(self, path, offset=0):
+        self.path = path
+        self.base = offset
+        self.file = open(path, "rb")
+        try:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self.file.close()
+            raise Ext4Error("{} is empty".format(path))
+        try:
+            self.read_superblock()
+        except (Ext4Error, struct.error):
+            self.close()
+            raise
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def read_superblock(self):
+        sb = self.base + 1024
+        if len(self.map) < sb + 1024:
+            raise Ext4Error("image too small")
+        (magic,) = struct.unpack_from("<H", self.map, sb + 0x38)
+        if magic != sb_magic:
+            raise Ext4Error("no ext4 superblock at offset {}".format(self.base))
+        (first_data_block, log_block_size) = struct.unpack_from("<2I", self.map, sb + 0x14)
+        (self.inodes_per_group,) = struct.unpack_from("<I", self.map, sb + 0x28)
+        (rev_level,) = struct.unpack_from("<I", self.map, sb + 0x4C)
+        (inode_size,) = struct.unpack_from("<H", self.map, sb + 0x58)
+        (self.incompat,) = struct.unpack_from("<I", self.map, sb + 0x60)
+        (desc_size,) = struct.unpack_from("<H", self.map, sb + 0xFE)
+        self.block_size = 1024 << log_block_size
+        self.inode_size = inode_size if rev_level >= 1 else 128
+        self.desc_size = desc_size if self.incompat & incompat_64bit and desc_size >= 64 else 32
+        if self.incompat & incompat_meta_bg:
+            raise Ext4Error("meta_bg layout is not supported")
+        if self.incompat & incompat_encrypt:
+            raise Ext4Error("encrypted filesystem")
+        self.gdt = (first_data_block + 1) * self.block_size
+
+    def block(self, number):
+        """Byte offset of a filesystem block in the mapping"""
+        return self.base + number * self.block_size
+
+    def inode_table(self, group):
+        pos = self.base + self.gdt + group * self.desc_size
+        (lo,) = struct.unpack_from("<I", self.map, pos + 0x8)
+        hi = 0
+        if self.desc_size >= 64:
+            (hi,) = struct.unpack_from("<I", self.map, pos + 0x28)
+        return lo | hi << 32
+
+    def inode(self, number):
+        group, index = divmod(number - 1, self.inodes_per_group)
+        pos = self.block(self.inode_table(group)) + index * self.inode_size
+        raw = self.map[pos:pos + self.inode_size]
+        (mode,) = struct.unpack_from("<H", raw, 0x0)
+        (size_lo, _, _, mtime) = struct.unpack_from("<4I", raw, 0x4)
+        (flags,) = struct.unpack_from("<I", raw, 0x20)
+        (acl_lo, size_hi) = struct.unpack_from("<2I", raw, 0x68)
+        (acl_hi,) = struct.unpack_from("<H", raw, 0x76)
+        xattrs = {}
+        if self.inode_size > 128:
+            (extra,) = struct.unpack_from("<H", raw, 0x80)
+            start = 128 + extra
+            if start + 4 <= len(raw) and struct.unpack_from("<I", raw, start)[0] == xattr_magic:
+                xattrs = self.parse_xattrs(raw, start + 4, start + 4, len(raw))
+        return Inode(number, mode, size_lo | size_hi << 32, mtime, flags,
+                     raw[0x28:0x28 + 60], acl_lo | acl_hi << 32, xattrs)
+
+    def parse_xattrs(self, buf, pos, value_base, end):
+        xattrs = {}
+        while pos + _xattr_entry.size <= end:
+            (name_len, name_index, value_offs, value_inum, value_size, _) = \
+                _xattr_entry.unpack_from(buf, pos)
+            if name_len == 0 and name_index == 0 and value_offs == 0:
+                break
+            name = bytes(buf[pos + 16:pos + 16 + name_len]).decode("utf-8", "replace")
+            name = xattr_prefixes.get(name_index, "") + name
+            if value_inum:
+                value = self.read_data(self.inode(value_inum))[:value_size]
+            else:
+                value = bytes(buf[value_base + value_offs:value_base + value_offs + value_size])
+            xattrs[name] = value
+            pos += (16 + name_len + 3) & ~3
+        return xattrs
+
+    def xattrs(self, inode):
+        """All extended attributes, in-inode and in the xattr block"""
+        xattrs = dict(inode.xattrs)
+        if inode.file_acl:
+            pos = self.block(inode.file_acl)
+            if struct.unpack_from("<I", self.map, pos)[0] == xattr_magic:
+                found = self.parse_xattrs(self.map, pos + 32, pos, pos + self.block_size)
+                found.update(xattrs)
+                xattrs = found
+        return xattrs
+
+    def extent_runs(self, node):
+        """(logical block, physical block, count, initialized) from an extent node"""
+        (magic, entries, _, depth, _) = _extent_header.unpack_from(node, 0)
+        if magic != extent_magic:
+            raise Ext4Error("bad extent header")
+        runs = []
+        for i in range(entries):
+            pos = _extent_header.size + i * _extent.size
+            if depth == 0:
+                (lblock, length, start_hi, start_lo) = _extent.unpack_from(node, pos)
+                initialized = length <= 32768
+                if not initialized:
+                    length -= 32768
+                runs.append((lblock, start_lo | start_hi << 32, length, initialized))
+            else:
+                (_, leaf_lo, leaf_hi) = _extent_index.unpack_from(node, pos)
+                child = self.block(leaf_lo | leaf_hi << 32)
+                runs.extend(self.extent_runs(self.map[child:child + self.block_size]))
+        return runs
+
+    def blockmap_runs(self, inode):
+        """Runs of the legacy direct/indirect block map"""
+        per_block = self.block_size // 4
+        pointers = struct.unpack_from("<15I", inode.block)
+        blocks = []
+        total = (inode.size + self.block_size - 1) // self.block_size
+
+        def walk(number, level):
+            for child in struct.unpack_from("<{}I".format(per_block), self.map, self.block(number)):
+                if len(blocks) >= total:
+                    return
+                if level == 1:
+                    blocks.append(child)
+                elif child:
+                    walk(child, level - 1)
+                else:
+                    blocks.extend([0] * min(per_block ** (level - 1), total - len(blocks)))
+
+        blocks.extend(pointers[:12])
+        for level, pointer in enumerate(pointers[12:], 1):
+            if len(blocks) >= total:
+                break
+            if pointer:
+                walk(pointer, level)
+            else:
+                blocks.extend([0] * min(per_block ** level, total - len(blocks)))
+
+        runs = []
+        for lblock, pblock in enumerate(blocks[:total]):
+            if not pblock:
+                continue
+            if runs and runs[-1][0] + runs[-1][2] == lblock and runs[-1][1] + runs[-1][2] == pblock:
+                runs[-1] = (runs[-1][0], runs[-1][1], runs[-1][2] + 1, True)
+            else:
+                runs.append((lblock, pblock, 1, True))
+        return runs
+
+    def runs(self, inode):
+        if inode.flags & flag_extents:
+            return self.extent_runs(inode.block)
+        return self.blockmap_runs(inode)
+
+    def inline_data(self, inode):
+        return inode.block + self.xattrs(inode).get("system.data", b"")
+
+    def read_data(self, inode):
+        """Whole contents of an inode, meant for directories, links and small files"""
+        if inode.flags & flag_inline_data:
+            return self.inline_data(inode)[:inode.size]
+        out = bytearray(inode.size)
+        for lblock, pblock, count, initialized in self.runs(inode):
+            start = lblock * self.block_size
+            if not initialized or start >= inode.size:
+                continue
+            length = min(count * self.block_size, inode.size - start)
+            pos = self.block(pblock)
+            out[start:start + length] = self.map[pos:pos + length]
+        return bytes(out)
+
+    def readlink(self, inode):
+        # Fast symlinks keep the target in i_block
+        if inode.size < 60 and not inode.flags & (flag_extents | flag_inline_data):
+            return inode.block[:inode.size].decode("utf-8", "surrogateescape")
+        return self.read_data(inode).decode("utf-8", "surrogateescape")
+
+    def parse_dirents(self, buf, pos, end, entries):
+        while pos + _dirent.size <= end:
+            (number, rec_len, name_len, _) = _dirent.unpack_from(buf, pos)
+            if rec_len < _dirent.size or pos + rec_len > end:
+                break
+            if number and name_len:
+                name = bytes(buf[pos + 8:pos + 8 + name_len]).decode("utf-8", "surrogateescape")
+                if name not in (".", ".."):
+                    entries.append((name, number))
+            pos += rec_len
+
+    def listdir(self, inode):
+        """(name, inode number) of a directory, without . and .."""
+        entries = []
+        if inode.flags & flag_inline_data:
+            # The parent inode comes first, entries follow in i_block and system.data
+            self.parse_dirents(inode.block, 4, 60, entries)
+            extra = self.xattrs(inode).get("system.data", b"")
+            self.parse_dirents(extra, 0, len(extra), entries)
+            return entries
+        data = self.read_data(inode)
+        for block in range(0, len(data), self.block_size):
+            self.parse_dirents(data, block, min(block + self.block_size, len(data)), entries)
+        return entries
+
+    def lookup(self, path, follow=True, depth=0):
+        """Inode of a path inside the image, symlinks resolved when follow is set"""
+        if depth > 8:
+            raise Ext4Error("too many levels of symbolic links: {}".format(path))
+        inode = self.inode(root_inode)
+        parts = [p for p in path.split("/") if p and p != "."]
+        walked = []
+        for i, part in enumerate(parts):
+            if part == "..":
+                walked = walked[:-1]
+                inode = self.lookup("/".join(walked), follow, depth)
+                continue
+            if not inode.is_dir():
+                raise Ext4Error("not a directory: {}".format("/".join(walked)))
+            number = dict(self.listdir(inode)).get(part)
+            if number is None:
+                raise Ext4Error("no such file: {}".format(path))
+            inode = self.inode(number)
+            if inode.is_link() and (follow or i < len(parts) - 1):
+                target = self.readlink(inode)
+                base = "" if target.startswith("/") else "/".join(walked)
+                inode = self.lookup(base + "/" + target, True, depth + 1)
+            walked.append(part)
+        return inode
+
+    def read(self, path):
+        inode = self.lookup(path)
+        if inode.is_dir():
+            raise Ext4Error("is a directory: {}".format(path))
+        return self.read_data(inode)
+
+    def walk(self, path=""):
+        """(relative path, inode) for path and everything below it"""
+        top = self.lookup(path, follow=False)
+        stack = [(path.strip("/"), top)]
+        while stack:
+            rel, inode = stack.pop()
+            yield rel, inode
+            if inode.is_dir():
+                for name, number in self.listdir(inode):
+                    stack.append((rel + "/" + name if rel else name, self.inode(number)))
+
+    def copy_file(self, inode, target):
+        with open(target, "wb") as out:
+            if inode.flags & flag_inline_data:
+                out.write(self.inline_data(inode)[:inode.size])
+            else:
+                for lblock, pblock, count, initialized in self.runs(inode):
+                    start = lblock * self.block_size
+                    if not initialized or start >= inode.size:
+                        continue
+                    length = min(count * self.block_size, inode.size - start)
+                    pos = self.block(pblock)
+                    out.seek(start)
+                    out.write(memoryview(self.map)[pos:pos + length])
+                # Holes at the end
+                out.truncate(inode.size)
+        os.chmod(target, (inode.mode & 0o777) | 0o600)
+        os.utime(target, (inode.mtime, inode.mtime))
+
+    def extract(self, outdir, paths=("",), jobs=None, contexts=None):
+        """Extract paths (the whole image by default) below outdir, returns the number of files"""
+        count = 0
+        with ThreadPoolExecutor(max_workers=jobs or os.cpu_count() or 1) as pool:
+            futures = []
+            for path in paths:
+                for rel, inode in self.walk(path):
+                    target = os.path.join(outdir, rel) if rel else outdir
+                    if contexts is not None:
+                        label = self.xattrs(inode).get("security.selinux")
+                        if label:
+                            contexts.append(("/" + rel, label.rstrip(b"\0").decode("utf-8", "replace")))
+                    if inode.is_dir():
+                        os.makedirs(target, exist_ok=True)
+                    elif inode.is_link():
+                        os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+                        if os.path.lexists(target):
+                            os.unlink(target)
+                        os.symlink(self.readlink(inode), target)
+                    elif inode.is_reg():
+                        os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+                        futures.append(pool.submit(self.copy_file, inode, target))
+                        count += 1
+            for future in futures:
+                future.result()
+        return count
+
+def main():
+    parser = argparse.ArgumentParser(description="Read and extract ext4 images without mounting")
+    parser.add_argument("image", help="ext4 image")
+    parser.add_argument("paths", nargs="*", default=[""], help="paths to extract (default: everything)")
+    parser.add_argument("-o", "--outdir", default=".", help="output directory (default: %(default)s)")
+    parser.add_argument("-O", "--offset", type=int, default=0, help="byte offset of the filesystem in the image")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="files written at once (default: %(default)s)")
+    parser.add_argument("-l", "--list", action="store_true", help="list the given paths instead of extracting")
+    parser.add_argument("-c", "--cat", metavar="PATH", default=None, help="write one file to stdout")
+    parser.add_argument("--contexts", metavar="FILE", default=None,
+                        help="write the SELinux label of every extracted path to FILE")
+    args = parser.parse_intermixed_args()
+
+    try:
+        with Ext4Image(args.image, args.offset) as image:
+            if args.cat:
+                sys.stdout.buffer.write(image.read(args.cat))
+                return 0
+            if args.list:
+                for path in args.paths:
+                    for rel, inode in image.walk(path):
+                        print("{:o}\t{}\t/{}".format(inode.mode, inode.size, rel))
+                return 0
+            contexts = [] if args.contexts else None
+            count = image.extract(args.outdir, args.paths, args.jobs, contexts)
+            if contexts is not None:
+                with open(args.contexts, "w") as f:
+                    for path, label in contexts:
+                        f.write("{} {}\n".format(path, label))
+            print("[+] Extracted {} files from {}".format(count, args.image))
+    except (Ext4Error, OSError, struct.error) as e:
+        print("[!] {}: {}".format(args.image, e), file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
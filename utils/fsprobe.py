@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+
+# Identify the filesystem of a partition image from its superblock
+#
+# Only the first few KiB are read: ext4 (0xEF53 at 1080), EROFS (0xE0F5E1E2
+# at 1024), F2FS (0xF2F52010 at 1024), squashfs ("hsqs"), FAT and Android
+# sparse images (0xED26FF3A). For a sparse image the filesystem inside is
+# looked up in its first raw chunk, so callers know what they get once it
+# is unsparsed.
+
+import sys
+import struct
+import argparse
+
+probe_size = 4096
+
+_sparse_header = struct.Struct("<I4H4I")
+_chunk_header = struct.Struct("<2H2I")
+
+sparse_magic = 0xED26FF3A
+chunk_raw = 0xCAC1
+
+def probe_buffer(buf):
+    """Filesystem name for the first bytes of an image, None if unknown"""
+    if buf[:4] == struct.pack("<I", sparse_magic):
+        return "sparse"
+    if buf[:4] == b"hsqs":
+        return "squashfs"
+    if buf[1080:1082] == struct.pack("<H", 0xEF53):
+        return "ext4"
+    if buf[1024:1028] == struct.pack("<I", 0xE0F5E1E2):
+        return "erofs"
+    if buf[1024:1028] == struct.pack("<I", 0xF2F52010):
+        return "f2fs"
+    if buf[510:512] == b"\x55\xaa" and (buf[54:59] in (b"FAT12", b"FAT16") or buf[82:87] == b"FAT32"):
+        return "vfat"
+    return None
+
+def sparse_inner(f, offset=0):
+    """Filesystem inside an open sparse image, from its first raw chunk"""
+    f.seek(offset)
+    (magic, _, _, file_hdr_sz, chunk_hdr_sz, blk_sz, _, total_chunks, _) = \
+        _sparse_header.unpack(f.read(_sparse_header.size))
+    if magic != sparse_magic:
+        return None
+    pos = offset + file_hdr_sz
+    out = bytearray()
+    for _ in range(total_chunks):
+        f.seek(pos)
+        header = f.read(_chunk_header.size)
+        if len(header) < _chunk_header.size:
+            break
+        (kind, _, chunk_sz, total_sz) = _chunk_header.unpack(header)
+        if kind == chunk_raw:
+            f.seek(pos + chunk_hdr_sz)
+            out += f.read(min(chunk_sz * blk_sz, probe_size - len(out)))
+        else:
+            # Fill and don't care chunks: the superblock is not in them
+            out += bytes(min(chunk_sz * blk_sz, probe_size - len(out)))
+        if len(out) >= probe_size:
+            break
+        pos += total_sz
+    return probe_buffer(bytes(out))
+
+def probe(path, offset=0):
+    """(filesystem, filesystem inside a sparse image or None)"""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        fs = probe_buffer(f.read(probe_size))
+        if fs == "sparse":
+            try:
+                return (fs, sparse_inner(f, offset))
+            except struct.error:
+                return (fs, None)
+    return (fs, None)
+
+def main():
+    parser = argparse.ArgumentParser(description="Identify partition images by superblock magic")
+    parser.add_argument("images", nargs="+", help="images to probe")
+    args = parser.parse_args()
+
+    status = 0
+    for path in args.images:
+        try:
+            fs, inner = probe(path)
+        except OSError as e:
+            print("[!] {}: {}".format(path, e), file=sys.stderr)
+            status = 1
+            continue
+        if inner:
+            fs = "{}/{}".format(fs, inner)
+        print("{}\t{}".format(path, fs or "unknown"))
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+
+# Firmware format detection for dumper.sh
+#
+# Looks at the magic bytes of the input file, the member names of the input
+# archive (read from --names, normally dumper's cached manifest) and the files
+# already unpacked into TMPDIR, and reports in one pass
+#   FW_CONTAINER  what the input itself is (zip, kdz, ozip, gpt, sparse, ...)
+#   FW_NESTED     an encrypted/vendor container inside the archive (ops, ofp, aml)
+#   FW_LAYOUT     which branch of dumper's extraction chain applies
+# The layout rules mirror that chain and are evaluated in the same order.
+
+import os
+import re
+import sys
+import mmap
+import shlex
+import struct
+import fnmatch
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "kdztools", "libexec"))
+
+import dz
+import gpt
+import kdz
+import fsprobe
+
+# Headers unkdz.py accepts, plus a bare DZ
+kdz_headers = (
+    b"\x28\x05\x00\x00" b"\x34\x31\x25\x80",
+    b"\x18\x05\x00\x00" b"\x32\x79\x44\x50",
+    kdz.KDZFile._dz_header,
+)
+dz_header = dz.DZFile._dz_header
+
+header_size = 8192
+
+# (layout, regex on archive member names, globs on TMPDIR basenames), in
+# the order of dumper's if/elif chain
+layouts = [
+    ("dat", r"system.new.dat", ["system.new.dat*"]),
+    ("rawprogram", r"rawprogram", ["*rawprogram*"]),
+    ("nb0", r".*.nb0", ["*.nb0*"]),
+    ("chunk", r"^(?=.*system)(?=.*chunk)(?!.*\.so$)", ["*system*chunk*"]),
+    ("img", r"system_new.img|^system.img|/system.img|/system_image.emmc.img|^system_image.emmc.img", ["system*.img"]),
+    ("sin", r"system.sin|.*system_.*\.sin", ["system*.sin"]),
+    ("pac", r".pac$", ["*.pac"]),
+    ("bin", r"system.bin", ["system.bin"]),
+    ("systemp", r"system-p", ["system-p*"]),
+    ("sign", r"system-sign.img", ["system-sign.img"]),
+    ("super", r"super.img", []),
+    ("superimg", None, ["super*.*img"]),
+    ("samsung", r"^(?=.*tar.md5)(?=.*AP_)", ["*AP_*tar.md5"]),
+    ("payload", r"payload.bin", ["payload.bin"]),
+    ("nested", r".*.rar|.*.zip|.*.7z|.*.tar$", ["*.rar", "*.zip", "*.7z", "*.tar"]),
+    ("updateapp", r"UPDATE.APP", ["UPDATE.APP"]),
+    ("rockchip", r"rockchip", ["rockchip"]),
+]
+
+# Containers found inside an archive, first match wins like in dumper
+nested = [
+    ("ops", r".*.ops"),
+    ("ofp", r".*.ofp"),
+    ("aml", r"(?i)aml"),
+]
+
+def magic_container(head):
+    """Classify a file by its first bytes"""
+    if head[:12] == b"OPPOENCRYPT!":
+        return "ozip"
+    if head[:8] in kdz_headers:
+        return "kdz"
+    if head[:4] == dz_header:
+        return "dz"
+    if head[:4] in (b"PK\x03\x04", b"PK\x05\x06"):
+        return "zip"
+    if head[:6] == b"7z\xbc\xaf\x27\x1c":
+        return "7z"
+    if head[:6] == b"Rar!\x1a\x07":
+        return "rar"
+    if head[:2] == b"\x1f\x8b":
+        return "gzip"
+    if head[257:262] == b"ustar":
+        return "tar"
+    if head[:4] == b"CrAU":
+        return "payload"
+    if head[:4] in (b"RKFW", b"RKAF"):
+        return "rkfw"
+    if head[:8] == "BP_R".encode("utf-16-le"):
+        return "pac"
+    if head[4096:4100] == b"gDla":
+        return "lp"
+    fs = fsprobe.probe_buffer(head)
+    if fs in ("sparse", "ext4", "erofs", "f2fs", "squashfs"):
+        return fs
+    if b"\x55\xaa\x5a\xa5" in head[:1024]:
+        return "updateapp"
+    return None
+
+def has_gpt(path):
+    with open(path, "rb") as f:
+        try:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            return False
+        try:
+            gpt.GPT(buf)
+            return True
+        except (gpt.NoGPT, struct.error, ValueError):
+            return False
+        finally:
+            buf.close()
+
+def detect_container(path):
+    if not path:
+        return "none"
+    if os.path.isdir(path):
+        return "dir"
+    if not os.path.isfile(path):
+        return "none"
+
+    name = os.path.basename(path)
+    lname = name.lower()
+    # Encrypted formats have no magic, random bytes must not match one; an
+    # ozip can also be a plain zip and still needs ozipdecrypt
+    for ext in ("ops", "ofp", "ozip"):
+        if lname.endswith("." + ext):
+            return ext
+    with open(path, "rb") as f:
+        head = f.read(header_size)
+    container = magic_container(head)
+
+    # Vendor formats without a usable magic go by name
+    if container in (None, "gzip"):
+        if lname.endswith(".tgz") or lname.endswith(".tar.gz"):
+            return "tgz"
+        if re.match(r"(?i)^ruu_.*exe$", name) or lname.endswith(".exe"):
+            return "ruu"
+    if container is None and has_gpt(path):
+        return "gpt"
+    if container is None and lname.endswith(".kdz"):
+        return "kdz"
+    return container or "unknown"
+
+def detect_nested(names):
+    for kind, pattern in nested:
+        regex = re.compile(pattern)
+        if any(regex.search(n) for n in names):
+            return kind
+    return ""
+
+def tmpdir_names(tmpdir):
+    found = []
+    if tmpdir and os.path.isdir(tmpdir):
+        for _, _, files in os.walk(tmpdir):
+            found.extend(files)
+    return found
+
+def detect_layout(names, files):
+    for layout, pattern, globs in layouts:
+        if pattern and any(re.search(pattern, n) for n in names):
+            return layout
+        if any(fnmatch.fnmatchcase(f, g) for g in globs for f in files):
+            return layout
+    return ""
+
+def main():
+    parser = argparse.ArgumentParser(description="Detect firmware container and layout")
+    parser.add_argument("path", nargs="?", default="", help="input file or folder (FILEPATH)")
+    parser.add_argument("-n", "--names", metavar="FILE", default=None,
+                        help="archive member names, one per line (- for stdin)")
+    parser.add_argument("-t", "--tmpdir", default=None, help="extraction directory to scan")
+    parser.add_argument("-s", "--shell", action="store_true", help="print shell assignments for eval")
+    args = parser.parse_args()
+
+    names = []
+    if args.names == "-":
+        names = sys.stdin.read().splitlines()
+    elif args.names:
+        with open(args.names) as f:
+            names = f.read().splitlines()
+    names = [n for n in names if n]
+
+    try:
+        container = detect_container(args.path)
+    except OSError:
+        container = "unknown"
+    result = [
+        ("FW_CONTAINER", container),
+        ("FW_NESTED", detect_nested(names)),
+        ("FW_LAYOUT", detect_layout(names, tmpdir_names(args.tmpdir))),
+    ]
+
+    for key, value in result:
+        if args.shell:
+            print("{}={}".format(key, shlex.quote(value)))
+        else:
+            print("{}: {}".format(key, value or "-"))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
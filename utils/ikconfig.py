@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+
+# Extract the embedded .config (CONFIG_IKCONFIG) and version of a kernel
+#
+# The boot image or kernel is mmapped once. An uncompressed kernel is
+# searched directly; otherwise every offset that starts like a compressed
+# stream (gzip, xz, lzma, bzip2, zstd, lz4 legacy) is decompressed on a
+# thread pool, the decompressors release the GIL. The first stream, by
+# offset, with an IKCFG_ST block is the kernel, otherwise the first one with
+# the kernel banner. Only as many streams as there are jobs are decompressed
+# at a time, and a rejected one is dropped at once. The config block is
+# gunzipped and the kernel version is taken from its header, or from the
+# banner when the kernel was built without IKCONFIG. A kernel decompressed
+# by kernelcache.py is read as is with --raw.
+
+import os
+import re
+import bz2
+import sys
+import mmap
+import lzma
+import zlib
+import argparse
+from itertools import islice
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import lz4block
+try:
+    import lz4.block
+except ImportError:
+    lz4 = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+config_start = b"IKCFG_ST"
+config_end = b"IKCFG_ED"
+banner = re.compile(rb"Linux version (\d+\.\d+[^\s\0]*)")
+config_version = re.compile(r"^# Linux/\S+ (\S+) Kernel Configuration", re.M)
+
+# What a compressed kernel can start with, as extract-ikconfig tried them
+signatures = [
+    ("gzip", b"\x1f\x8b\x08"),
+    ("xz", b"\xfd7zXZ\x00"),
+    ("bzip2", b"BZh"),
+    ("lzma", b"\x5d\x00\x00\x00"),
+    ("zstd", b"\x28\xb5\x2f\xfd"),
+    ("lz4", b"\x02\x21\x4c\x18"),
+]
+
+piece_size = 1 << 20
+# Cut off runaway streams, no kernel gets near this
+max_output = 512 << 20
+max_candidates = 64
+
+def find_all(data, marker, limit=max_candidates):
+    found = []
+    pos = data.find(marker)
+    while pos != -1 and len(found) < limit:
+        found.append(pos)
+        pos = data.find(marker, pos + 1)
+    return found
+
+def candidates(data):
+    """(offset, format) of every place a compressed kernel could start"""
+    found = []
+    for kind, magic in signatures:
+        for pos in find_all(data, magic):
+            if kind == "bzip2" and not (data[pos + 3:pos + 4].isdigit() and data[pos + 4:pos + 10] == b"1AY&SY"):
+                continue
+            if kind == "zstd" and zstandard is None:
+                continue
+            found.append((pos, kind))
+    return sorted(found)
+
+def lz4_legacy(data, offset):
+    out = bytearray()
+    pos = offset + 4
+    while pos + 4 <= len(data) and len(out) < max_output:
+        if data[pos:pos + 4] == b"\x02\x21\x4c\x18":
+            pos += 4
+            continue
+        size = int.from_bytes(data[pos:pos + 4], "little")
+        pos += 4
+        # The kernel appends its size after the last block
+        if size == 0 or size > 8 << 20 or pos + size > len(data):
+            break
+        block = bytes(data[pos:pos + size])
+        try:
+            if lz4 is not None:
+                out += lz4.block.decompress(block, uncompressed_size=8 << 20)
+            else:
+                out += lz4block.decompress(block)
+        except (lz4block.LZ4BlockError, ValueError, RuntimeError):
+            break
+        pos += size
+    return bytes(out)
+
+def decompressor(kind):
+    if kind == "gzip":
+        return zlib.decompressobj(zlib.MAX_WBITS | 16)
+    if kind == "xz":
+        return lzma.LZMADecompressor(lzma.FORMAT_XZ)
+    if kind == "lzma":
+        return lzma.LZMADecompressor(lzma.FORMAT_ALONE)
+    if kind == "bzip2":
+        return bz2.BZ2Decompressor()
+    return zstandard.ZstdDecompressor().decompressobj()
+
+def decompress(data, offset, kind):
+    """Whatever decompresses from offset on, trailing garbage and errors end the stream"""
+    if kind == "lz4":
+        return lz4_legacy(data, offset)
+    stream = decompressor(kind)
+    out = bytearray()
+    pos = offset
+    try:
+        while pos < len(data) and len(out) < max_output:
+            out += stream.decompress(data[pos:pos + piece_size])
+            pos += piece_size
+            if getattr(stream, "eof", False):
+                break
+    except (zlib.error, lzma.LZMAError, OSError, EOFError, ValueError) + \
+            ((zstandard.ZstdError,) if zstandard is not None else ()):
+        pass
+    return bytes(out)
+
+def read_config(kernel):
+    """Text of the IKCONFIG block of a kernel, None if it has none"""
+    start = kernel.find(config_start)
+    while start != -1:
+        stream = zlib.decompressobj(zlib.MAX_WBITS | 16)
+        try:
+            end = kernel.find(config_end, start)
+            text = stream.decompress(kernel[start + 8:end if end != -1 else len(kernel)])
+            if stream.eof:
+                return text.decode("utf-8", "replace")
+        except zlib.error:
+            pass
+        start = kernel.find(config_start, start + 1)
+    return None
+
+def kernel_version(kernel, config):
+    if config:
+        match = config_version.search(config)
+        if match:
+            return match.group(1)
+    match = banner.search(kernel)
+    return match.group(1).decode("ascii", "replace") if match else None
+
+def find_kernel(data, jobs=None):
+    """Decompressed kernel in data (data itself when it is not compressed), None if there is none"""
+    # The banner can survive as a literal inside a compressed kernel, the
+    # config block cannot
+    if data.find(config_start) != -1:
+        return data
+    fallback = None
+    found = candidates(data)
+    if found:
+        jobs = jobs or os.cpu_count() or 1
+        # Only jobs streams are in flight, each can grow to max_output
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            queue = iter(found)
+            pending = deque(pool.submit(decompress, data, offset, kind) for offset, kind in islice(queue, jobs))
+            while pending:
+                out = pending.popleft().result()
+                if out.find(config_start) != -1:
+                    for rest in pending:
+                        rest.cancel()
+                    return out
+                if fallback is None and banner.search(out):
+                    fallback = out
+                del out
+                for offset, kind in islice(queue, 1):
+                    pending.append(pool.submit(decompress, data, offset, kind))
+    if fallback is None and banner.search(data):
+        fallback = data
+    return fallback
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract the embedded config and version of a kernel")
+    parser.add_argument("image", help="kernel, or boot image holding one")
+    parser.add_argument("-o", "--output", default=None, help="write the config to this file (default: stdout)")
+    parser.add_argument("--raw", action="store_true",
+                        help="image is an already decompressed kernel, as kernelcache.py writes it")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="streams decompressed at the same time (default: %(default)s)")
+    args = parser.parse_args()
+
+    try:
+        with open(args.image, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            kernel = data if args.raw else find_kernel(data, args.jobs)
+            config = read_config(kernel) if kernel is not None else None
+            version = kernel_version(kernel, config) if kernel is not None else None
+    except (OSError, ValueError) as e:
+        print("[!] {}: {}".format(args.image, e), file=sys.stderr)
+        return 1
+
+    if kernel is None:
+        print("[!] {}: no kernel found".format(args.image), file=sys.stderr)
+        return 1
+    if config is None:
+        print("[!] {}: kernel has no embedded config".format(args.image), file=sys.stderr)
+    elif args.output:
+        with open(args.output, "w") as f:
+            f.write(config)
+    else:
+        sys.stdout.write(config)
+    # With the config in a file, stdout is only the version for the README
+    if args.output and version:
+        print(version)
+    return 0 if config is not None else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -204,9 +204,10 @@ class GPT(object):
 
 
 
-	def __init__(self, buf, type=None, lbaMinShift=9, lbaMaxShift=16):
+	def __init__(self, buf, type=None, lbaMinShift=9, lbaMaxShift=16, primary=True, backup=True):
 		"""
-		Initialize the GPT class
+		Initialize the GPT class, primary and backup select which
+		copies of the GPT are searched for
 		"""
 
 		# sanity checking
@@ -225,22 +226,24 @@ class GPT(object):
 			lbaSize = 1<<shiftLBA
 
 			# try for a primary GPT
-			hbuf = buf[lbaSize:lbaSize<<1]
+			if primary:
+				hbuf = buf[lbaSize:lbaSize<<1]
 
-			data = self.tryParseHeader(hbuf)
+				data = self.tryParseHeader(hbuf)
 
-			if data:
-				verbose("Found Primary GPT")
-				break
+				if data:
+					verbose("Found Primary GPT")
+					break
 
 			# try for a backup GPT
-			hbuf = buf[-lbaSize:]
+			if backup:
+				hbuf = buf[-lbaSize:]
 
-			data = self.tryParseHeader(hbuf)
+				data = self.tryParseHeader(hbuf)
 
-			if data:
-				verbose("Found Backup GPT")
-				break
+				if data:
+					verbose("Found Backup GPT")
+					break
 
 		else:
 			raise NoGPT("Failed to locate GPT")
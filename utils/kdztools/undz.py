@@ -27,7 +27,9 @@ import zlib
 import zstandard as zstd
 import argparse
 import hashlib
+import threading
 from binascii import crc32, b2a_hex
+from concurrent.futures import ThreadPoolExecutor
 from uuid import UUID
 
 # our tools are in "libexec"
@@ -37,6 +39,14 @@ import dz
 import gpt
 
 
+class UNDZError(Exception):
+        """
+        Damaged DZ data, raised instead of exiting so that worker threads
+        hand it to the main thread
+        """
+        pass
+
+
 class UNDZUtils(object):
         """
         Common class for unpacking DZ file structures
@@ -197,17 +207,13 @@ class UNDZChunk(dz.DZChunk, UNDZUtils):
                 use zlib .. if not, we use zstandard.
                 """
 
-                # Seek to the beginning of the compressed data in the specified partition
-                self.dz.dzfile.seek(self.dataOffset, io.SEEK_SET)
-
                 zlib_magic = {'zlib': bytes([0x78, 0x01])}
-                cmp_header = self.dz.dzfile.read(2)
-
-                # Reset to the beginning of the compressed data
-                self.dz.dzfile.seek(self.dataOffset, io.SEEK_SET)
 
                 # Read the whole compressed segment into RAM
-                zdata = self.dz.dzfile.read(self.dataSize)
+                # (pread() leaves the shared file position alone, so several
+                # devices can be extracted at once)
+                zdata = os.pread(self.dz.dzfile.fileno(), self.dataSize, self.dataOffset)
+                cmp_header = zdata[0:2]
 
                 if cmp_header.startswith(zlib_magic['zlib']):
 
@@ -229,8 +235,7 @@ class UNDZChunk(dz.DZChunk, UNDZUtils):
                 md5.update(buf)
 
                 if md5.digest() != self.md5:
-                        print("[!] Error: MD5 of data doesn't match header ({:32s} vs {:32s})".format(md5.hexdigest(), b2a_hex(self.md5)), file=sys.stderr)
-                        sys.exit(1)
+                        raise UNDZError("MD5 of data doesn't match header ({:32s} vs {:32s})".format(md5.hexdigest(), b2a_hex(self.md5).decode("utf8")))
 
                 return buf
 
@@ -272,6 +277,25 @@ class UNDZChunk(dz.DZChunk, UNDZUtils):
                 # Print our messages
                 self.Messages()
 
+        def extractChunkAt(self, file, name):
+                """
+                Extract the payload of our chunk into the FileIO file at our
+                target offset, without touching the file position
+
+                Returns the offset where our chunk (including wipe area) ends
+                """
+
+                print("[+] Extracting {:s} to {:s}".format(self.getChunkName(), name))
+
+                buf = self.extract()
+                start = self.getTargetStart()
+                os.pwrite(file.fileno(), buf, start)
+
+                # Print our messages
+                self.Messages()
+
+                return max(start + len(buf), start + (self.trimCount<<self.dz.shiftLBA))
+
         def extractChunkfile(self, file, name):
                 """
                 Extract the raw data of our chunk into the file with the name
@@ -837,6 +861,31 @@ class UNDZFile(dz.DZFile, UNDZUtils):
                         chunk.extractChunk(file, name)
 
 
+        def getDevs(self):
+                """
+                Return the sorted list of flash devices we've got chunks for
+                """
+                return sorted(set(chunk.getDev() for chunk in self.chunks))
+
+        def extractDevImage(self, file, name, dev, stop=None):
+                """
+                Extract all chunks of one flash device (LUN) to an image
+                file named name, unwritten areas are left as holes; gives
+                up between chunks once the event stop is set
+                """
+
+                end = 0
+                for chunk in self.chunks:
+                        if stop is not None and stop.is_set():
+                                return
+                        if chunk.getDev() == dev:
+                                end = max(end, chunk.extractChunkAt(file, name))
+
+                # trailing wipe areas only extend the file
+                if end > file.seek(0, io.SEEK_END):
+                        file.truncate(end)
+
+
         def saveHeader(self, name):
                 """
                 Dump the header from the original file into the output dir
@@ -934,6 +983,7 @@ class DZFileTools:
                 group.add_argument('-c', '--chunk', help='extract data chunk(s) (all by default)', action='store_true', dest='extractChunk')
                 group.add_argument('-s', '--single', help='extract diskslice(s) (partition(s)) (all by default)', action='store_true', dest='extractSlice')
                 group.add_argument('-i', '--image', help='extract all slices/partitions as a disk image', action='store_true', dest='extractImage')
+                group.add_argument('-I', '--dev-images', help='extract one disk image per flash device/LUN, devices in parallel (all by default)', action='store_true', dest='extractDevImages')
                 parser.add_argument('-d', '--dir', '-o', '--out', help='output location', action='store', dest='outdir')
 
                 return parser.parse_known_args()
@@ -1034,6 +1084,45 @@ class DZFileTools:
                 self.dz_file.extractImage(file, name)
                 file.close()
 
+        def cmdExtractDevImages(self, files):
+                devs = self.dz_file.getDevs()
+                if len(files) > 0:
+                        try:
+                                files = [int(dev) for dev in files]
+                        except ValueError:
+                                print('[!] Bad device value in "{:s}" (must be numbers)'.format(" ".join(files)), file=sys.stderr)
+                                sys.exit(1)
+                        for dev in files:
+                                if dev not in devs:
+                                        print("[!] Cannot extract unknown device {:d} (have {:s})".format(dev, ", ".join(str(d) for d in devs)), file=sys.stderr)
+                                        sys.exit(1)
+                        devs = files
+
+                print("[+] Extracting {:d} device image(s)!\n".format(len(devs)))
+                if not devs:
+                        return
+
+                # set by the main thread when one device fails
+                stop = threading.Event()
+
+                def extractDev(dev):
+                        name = "dev{:d}.img".format(dev)
+                        file = io.FileIO(name, "wb")
+                        try:
+                                self.dz_file.extractDevImage(file, name, dev, stop)
+                        finally:
+                                file.close()
+
+                # Chunks of different devices overlap in address space, so
+                # each gets its own image; zlib/zstd/md5 release the GIL
+                with ThreadPoolExecutor(max_workers=len(devs)) as pool:
+                        try:
+                                for future in [pool.submit(extractDev, dev) for dev in devs]:
+                                        future.result()
+                        except UNDZError:
+                                stop.set()
+                                raise
+
         def main(self):
                 global cmd
                 args = self.parseArgs()
@@ -1043,7 +1132,11 @@ class DZFileTools:
                 if cmd.outdir:
                         self.outdir = cmd.outdir
 
-                self.dz_file = UNDZFile(cmd.dzfile)
+                try:
+                        self.dz_file = UNDZFile(cmd.dzfile)
+                except UNDZError as e:
+                        print("[!] Error: {}".format(e), file=sys.stderr)
+                        sys.exit(1)
 
                 if cmd.listOnly:
                         self.cmdListPartitions()
@@ -1056,21 +1149,29 @@ class DZFileTools:
                 # Change to the output directory
                 os.chdir(self.outdir)
 
-                # Extracting slice(s)
-                if cmd.extractSlice:
-                        self.cmdExtractSlice(files)
-
-                # Extracting chunk-files(s)
-                elif cmd.extractChunkfile:
-                        self.cmdExtractChunkfile(files)
-
-                # Extract the whole image
-                elif cmd.extractImage:
-                        self.cmdExtractImage(files)
-
-                # Extracting chunk(s)
-                elif cmd.extractChunk:
-                        self.cmdExtractChunk(files)
+                try:
+                        # Extracting slice(s)
+                        if cmd.extractSlice:
+                                self.cmdExtractSlice(files)
+
+                        # Extracting chunk-files(s)
+                        elif cmd.extractChunkfile:
+                                self.cmdExtractChunkfile(files)
+
+                        # Extract the whole image
+                        elif cmd.extractImage:
+                                self.cmdExtractImage(files)
+
+                        # Extract one image per flash device
+                        elif cmd.extractDevImages:
+                                self.cmdExtractDevImages(files)
+
+                        # Extracting chunk(s)
+                        elif cmd.extractChunk:
+                                self.cmdExtractChunk(files)
+                except UNDZError as e:
+                        print("[!] Error: {}".format(e), file=sys.stderr)
+                        sys.exit(1)
 
                 # Save the header for later reconstruction
                 self.dz_file.saveHeader(cmd.dzfile)
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+
+"""
+Carve partitions straight out of raw full-disk (eMMC) or LUN (UFS) images,
+for example undz.py -i/-I output or rawprogram-assembled dumps, using the
+GUID partition table found on them.
+
+	This program is free software: you can redistribute it and/or modify
+	it under the terms of the GNU General Public License as published by
+	the Free Software Foundation, either version 3 of the License, or
+	(at your option) any later version.
+
+	This program is distributed in the hope that it will be useful,
+	but WITHOUT ANY WARRANTY; without even the implied warranty of
+	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+	GNU General Public License for more details.
+
+	You should have received a copy of the GNU General Public License
+	along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from __future__ import absolute_import
+from __future__ import print_function
+import os
+import sys
+import io
+import json
+import mmap
+import errno
+import argparse
+from uuid import UUID
+
+# our tools are in "libexec"
+sys.path.append(os.path.join(sys.path[0], "libexec"))
+
+import gpt
+
+
+class GPTImage(object):
+	"""
+	Representation of a raw disk image carrying a GPT
+	"""
+
+	# Largest piece moved per copy_file_range()/pwrite() call
+	_copy_size = 1<<26
+
+	def open(self, name, primary=True, backup=True):
+		"""
+		Map the image and locate its GPT
+		"""
+
+		try:
+			self.file = io.open(name, "rb")
+		except IOError as err:
+			print(err, file=sys.stderr)
+			sys.exit(1)
+
+		self.length = os.fstat(self.file.fileno()).st_size
+		if self.length == 0:
+			print("[!] Error: {:s} is empty".format(name), file=sys.stderr)
+			sys.exit(1)
+
+		self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+		try:
+			self.gpt = gpt.GPT(self.map, primary=primary, backup=backup)
+		except gpt.NoGPT as err:
+			print("[!] Unable to find GPT in {:s}: {:s}".format(name, str(err)), file=sys.stderr)
+			sys.exit(1)
+
+		self.shiftLBA = self.gpt.shiftLBA
+
+		# keep the GPT index of every used entry, it is what sgdisk shows
+		self.slices = [(idx+1, s) for idx, s in enumerate(self.gpt.slices) if s.type != UUID(int=0)]
+
+	def getSlices(self, names):
+		"""
+		Return the (index, slice) pairs matching the given names, all of
+		them if no names are given
+		"""
+
+		if not names:
+			return self.slices
+
+		found = [(idx, s) for idx, s in self.slices if s.name in names]
+		missing = set(names) - set(s.name for idx, s in found)
+		for name in sorted(missing):
+			print("[!] Warning: no partition named \"{:s}\" in GPT".format(name), file=sys.stderr)
+
+		return found
+
+	def toDict(self):
+		"""
+		Return the table as a JSON-friendly dict
+		"""
+
+		return {
+			'blockSize':	1<<self.shiftLBA,
+			'blockShift':	self.shiftLBA,
+			'primary':	self.gpt.myLBA == 1,
+			'disk':		str(self.gpt.uuid),
+			'myLBA':	self.gpt.myLBA,
+			'altLBA':	self.gpt.altLBA,
+			'dataStartLBA':	self.gpt.dataStartLBA,
+			'dataEndLBA':	self.gpt.dataEndLBA,
+			'entryStart':	self.gpt.entryStart,
+			'entryCount':	self.gpt.entryCount,
+			'entrySize':	self.gpt.entrySize,
+			'partitions':	[{
+				'index':	idx,
+				'name':		s.name,
+				'type':		str(s.type),
+				'uuid':		str(s.uuid),
+				'startLBA':	s.startLBA,
+				'endLBA':	s.endLBA,
+				'flags':	s.flags,
+				'offset':	s.startLBA<<self.shiftLBA,
+				'size':		(s.endLBA-s.startLBA+1)<<self.shiftLBA,
+			} for idx, s in self.slices],
+		}
+
+	def copyData(self, fdout, src, dst, length):
+		"""
+		Copy length bytes from src in the image to dst in fdout, in
+		kernel where possible
+		"""
+
+		while length > 0:
+			count = min(length, self._copy_size)
+			try:
+				done = os.copy_file_range(self.file.fileno(), fdout, count, src, dst)
+			except (AttributeError, OSError):
+				# different filesystems on old kernels, or no support at all
+				done = os.pwrite(fdout, self.map[src:src+count], dst)
+			if done == 0:
+				break
+			src += done
+			dst += done
+			length -= done
+
+	def copyRange(self, out, start, length):
+		"""
+		Copy a range of the image into the FileIO out, holes in the image
+		stay holes in the output
+		"""
+
+		fdin = self.file.fileno()
+		end = start + length
+		pos = start
+
+		while pos < end:
+			try:
+				data = os.lseek(fdin, pos, os.SEEK_DATA)
+				hole = os.lseek(fdin, data, os.SEEK_HOLE)
+			except OSError as err:
+				# nothing but holes left
+				if err.errno == errno.ENXIO:
+					break
+				# no hole support, treat everything as data
+				data = pos
+				hole = end
+
+			if data >= end:
+				break
+
+			hole = min(hole, end)
+			self.copyData(out.fileno(), data, data-start, hole-data)
+			pos = hole
+
+		out.truncate(length)
+
+	def extractSlice(self, idx, slice, name):
+		"""
+		Extract a single slice^Wpartition into the file named name
+		"""
+
+		start = slice.startLBA<<self.shiftLBA
+		length = (slice.endLBA-slice.startLBA+1)<<self.shiftLBA
+
+		if start >= self.length:
+			print("[!] Warning: {:s} lies beyond the end of the image, skipped".format(slice.name), file=sys.stderr)
+			return
+
+		if start + length > self.length:
+			print("[!] Warning: {:s} is truncated in the image ({:d} of {:d} bytes)".format(slice.name, self.length-start, length), file=sys.stderr)
+			length = self.length - start
+
+		print("[+] Extracting {:2d} : {:s} to {:s}".format(idx, slice.name, name))
+
+		out = io.FileIO(name, "wb")
+		self.copyRange(out, start, length)
+		out.close()
+
+	def __init__(self, name, primary=True, backup=True):
+		"""
+		Constructing this class opens the image and parses the GPT
+		"""
+
+		super(GPTImage, self).__init__()
+
+		self.open(name, primary, backup)
+
+
+
+class GPTFileTools:
+	"""
+	Raw GPT disk image tools
+	"""
+
+	# Setup variables
+	outdir = "gptextracted"
+
+	def parseArgs(self):
+		# Parse arguments
+		parser = argparse.ArgumentParser(description='Raw eMMC/UFS disk image partition carver')
+		parser.add_argument('-f', '--file', help='disk or LUN image to read', action='store', required=True, dest='imgfile')
+		group = parser.add_mutually_exclusive_group(required=True)
+		group.add_argument('-l', '--list', help='list partitions', action='store_true', dest='listOnly')
+		group.add_argument('-x', '--extract', help='extract partition(s) by name (all by default)', action='store_true', dest='extract')
+		group.add_argument('-j', '--json', help='write the partition table as JSON ("-" for stdout)', action='store', dest='jsonfile')
+		which = parser.add_mutually_exclusive_group()
+		which.add_argument('-p', '--primary', help='only use the primary GPT', action='store_true', dest='primaryOnly')
+		which.add_argument('-b', '--backup', help='only use the backup GPT', action='store_true', dest='backupOnly')
+		parser.add_argument('-d', '--dir', '-o', '--out', help='output directory', action='store', dest='outdir')
+		parser.add_argument('names', help='partition names', nargs='*')
+
+		return parser.parse_args()
+
+	def cmdListPartitions(self):
+		print("[+] GPT Partition List (block size {:d})\n=========================================".format(1<<self.image.shiftLBA))
+		for idx, s in self.image.slices:
+			print("{:2d} : {:s} ({:d} bytes)".format(idx, s.name, (s.endLBA-s.startLBA+1)<<self.image.shiftLBA))
+
+	def cmdWriteJSON(self, name):
+		table = json.dumps(self.image.toDict(), indent=2)
+		if name == "-":
+			print(table)
+		else:
+			with io.open(name, "wt") as out:
+				out.write(table + "\n")
+
+	def cmdExtract(self, names):
+		slices = self.image.getSlices(names)
+		if len(slices) == 0:
+			print("[!] Nothing to extract", file=sys.stderr)
+			sys.exit(1)
+
+		# Ensure that the output directory exists
+		if not os.path.exists(self.outdir):
+			os.makedirs(self.outdir)
+
+		seen = set()
+		for idx, s in slices:
+			name = s.name
+			# a few tables carry the same name twice
+			if name in seen:
+				name = "{:s}_{:d}".format(name, idx)
+			seen.add(name)
+			self.image.extractSlice(idx, s, os.path.join(self.outdir, name + ".img"))
+
+	def main(self):
+		args = self.parseArgs()
+
+		if args.outdir:
+			self.outdir = args.outdir
+
+		self.image = GPTImage(args.imgfile, primary=not args.backupOnly, backup=not args.primaryOnly)
+
+		if args.listOnly:
+			self.cmdListPartitions()
+
+		elif args.jsonfile:
+			self.cmdWriteJSON(args.jsonfile)
+
+		elif args.extract:
+			self.cmdExtract(args.names)
+
+if __name__ == "__main__":
+	gpttools = GPTFileTools()
+	gpttools.main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+
+# Decompress the kernel of a boot image once for every tool that needs it
+#
+# The kernel section is taken from the boot image header (the whole file
+# when it is a bare kernel) and hashed; the decompressed kernel is stored as
+# kernel-<sha1>.raw in the cache folder and its path printed. A later call for
+# the same kernel, be it boot.img or boot/kernel, finds the file and does
+# nothing. ikconfig.py, kallsyms-finder and vmlinux-to-elf then all read the
+# plain kernel instead of locating and decompressing it again.
+
+import os
+import sys
+import mmap
+import hashlib
+import argparse
+
+import bootimg
+import ikconfig
+
+def kernel_section(path):
+    """Bytes of the kernel in a boot image, or of the whole file"""
+    try:
+        with bootimg.BootImage(path) as image:
+            if "kernel" in image.sections:
+                (offset, size) = image.sections["kernel"]
+                return image.map[offset:offset + size]
+    except bootimg.BootImageError:
+        pass
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        return data[:]
+
+def cached_kernel(path, cachedir, jobs=None):
+    """Path of the decompressed kernel of path, made on the first call; None if no kernel is found"""
+    data = kernel_section(path)
+    target = os.path.join(cachedir, "kernel-{}.raw".format(hashlib.sha1(data).hexdigest()))
+    if os.path.isfile(target):
+        return target
+    kernel = ikconfig.find_kernel(data, jobs)
+    if kernel is None:
+        return None
+    os.makedirs(cachedir, exist_ok=True)
+    partial = target + ".tmp"
+    with open(partial, "wb") as f:
+        f.write(kernel)
+    os.replace(partial, target)
+    return target
+
+def main():
+    parser = argparse.ArgumentParser(description="Decompress the kernel of a boot image once and cache it")
+    parser.add_argument("image", help="boot image or kernel")
+    parser.add_argument("-C", "--cachedir", required=True, help="folder holding the decompressed kernels")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="streams decompressed at the same time (default: %(default)s)")
+    args = parser.parse_args()
+
+    try:
+        target = cached_kernel(args.image, args.cachedir, args.jobs)
+    except (bootimg.BootImageError, OSError, ValueError) as e:
+        print("[!] {}: {}".format(args.image, e), file=sys.stderr)
+        return 1
+    if target is None:
+        print("[!] {}: no kernel found".format(args.image), file=sys.stderr)
+        return 1
+    print(target)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
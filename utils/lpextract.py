@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+
+# Extract logical partitions from a super image
+#
+# The LP geometry and the metadata of one slot are parsed once (the backup
+# copies are used when a checksum does not match), then every wanted
+# partition is written out concurrently from its extents. Sparse super
+# images, including a set of sparsechunk files, are read in place through
+# sparse.py; no raw copy of super is made. Extents on other block devices
+# (retrofit devices) are read from <device name>.img next to super.
+# Names are looked up with the slot suffix first, "system" gives system_a
+# if it exists, and are always written as <name>.img like lpunpack does.
+
+import os
+import sys
+import struct
+import hashlib
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import sparse
+
+sector_size = 512
+reserved_bytes = 4096
+geometry_size = 4096
+
+geometry_magic = 0x616C4467
+header_magic = 0x414C5030
+
+target_linear = 0
+target_zero = 1
+
+_geometry = struct.Struct("<2I32s3I")
+_header = struct.Struct("<I2HI32sI32s")
+_table = struct.Struct("<3I")
+_partition = struct.Struct("<36s4I")
+_extent = struct.Struct("<QIQI")
+_group = struct.Struct("<36sIQ")
+_block_device = struct.Struct("<Q2IQ36sI")
+
+class LpError(Exception):
+    pass
+
+class RawImage:
+    """Same reading interface as sparse.SparseImage, for a plain file"""
+
+    def __init__(self, path):
+        self.fd = os.open(path, os.O_RDONLY)
+        self.size = os.fstat(self.fd).st_size
+
+    def close(self):
+        os.close(self.fd)
+
+    def segments(self, offset, length):
+        end = min(offset + length, self.size)
+        while offset < end:
+            size = min(end - offset, sparse.piece_size)
+            yield offset, size, os.pread(self.fd, size, offset)
+            offset += size
+
+    def read(self, offset, length):
+        return os.pread(self.fd, length, offset)
+
+def open_image(paths):
+    if sparse.is_sparse(paths[0]):
+        return sparse.SparseImage(paths)
+    if len(paths) > 1:
+        raise LpError("only sparse images can be given in several parts")
+    return RawImage(paths[0])
+
+def cstr(raw):
+    return raw.split(b"\0", 1)[0].decode("ascii", "replace")
+
+def checked(data, offset, size, digest):
+    zeroed = data[:offset] + bytes(32) + data[offset + 32:size]
+    return hashlib.sha256(zeroed).digest() == digest
+
+class Partition:
+    def __init__(self, name, attributes, extents, group):
+        self.name = name
+        self.attributes = attributes
+        self.extents = extents
+        self.group = group
+
+    @property
+    def size(self):
+        return sum(sectors for sectors, _, _, _ in self.extents) * sector_size
+
+class Metadata:
+    def __init__(self, image, slot=0):
+        self.geometry(image)
+        if slot >= self.slot_count:
+            raise LpError("slot {} out of {}".format(slot, self.slot_count))
+        primary = reserved_bytes + 2 * geometry_size + slot * self.max_size
+        backup = primary + self.slot_count * self.max_size
+        for offset in (primary, backup):
+            try:
+                self.parse(image.read(offset, self.max_size))
+                return
+            except (LpError, struct.error) as e:
+                error = e
+        raise error
+
+    def geometry(self, image):
+        for offset in (reserved_bytes, reserved_bytes + geometry_size):
+            data = image.read(offset, geometry_size)
+            (magic, struct_size, checksum, max_size, slot_count, block_size) = _geometry.unpack_from(data)
+            if magic == geometry_magic and checked(data, 8, struct_size, checksum):
+                self.max_size = max_size
+                self.slot_count = slot_count
+                self.logical_block_size = block_size
+                return
+        raise LpError("no valid LP geometry")
+
+    def parse(self, data):
+        (magic, major, minor, header_size, header_checksum, tables_size, tables_checksum) = \
+            _header.unpack_from(data)
+        if magic != header_magic:
+            raise LpError("bad LP metadata magic")
+        if major != 10:
+            raise LpError("unsupported LP metadata version {}.{}".format(major, minor))
+        if not checked(data, 12, header_size, header_checksum):
+            raise LpError("LP metadata header checksum mismatch")
+        tables = data[header_size:header_size + tables_size]
+        if hashlib.sha256(tables).digest() != tables_checksum:
+            raise LpError("LP metadata tables checksum mismatch")
+
+        descriptors = [_table.unpack_from(data, _header.size + i * _table.size) for i in range(4)]
+
+        def entries(index, layout):
+            (offset, count, entry_size) = descriptors[index]
+            return [layout.unpack_from(tables, offset + i * entry_size) for i in range(count)]
+
+        extents = entries(1, _extent)
+        self.groups = [cstr(name) for name, _, _ in entries(2, _group)]
+        self.block_devices = [(first, size, cstr(name)) for first, _, _, size, name, _ in entries(3, _block_device)]
+        self.partitions = {}
+        for name, attributes, first_extent, num_extents, group in entries(0, _partition):
+            name = cstr(name)
+            self.partitions[name] = Partition(name, attributes, extents[first_extent:first_extent + num_extents],
+                                              self.groups[group] if group < len(self.groups) else "")
+
+def device_image(super_path, name):
+    """Image holding a block device other than super"""
+    folder = os.path.dirname(super_path)
+    candidates = [name]
+    if name[-2:] in ("_a", "_b"):
+        candidates.append(name[:-2])
+    for candidate in candidates:
+        path = os.path.join(folder, candidate + ".img")
+        if os.path.isfile(path):
+            return open_image([path])
+    raise LpError("block device {} is not available".format(name))
+
+def extract_partition(part, images, target):
+    with open(target, "wb") as out:
+        pos = 0
+        for sectors, kind, data, source in part.extents:
+            length = sectors * sector_size
+            if kind == target_linear:
+                image = images[source]
+                for offset, size, chunk in image.segments(data * sector_size, length):
+                    if chunk is not None:
+                        out.seek(pos + offset - data * sector_size)
+                        out.write(chunk)
+            elif kind != target_zero:
+                raise LpError("{}: unknown extent type {}".format(part.name, kind))
+            pos += length
+        out.truncate(pos)
+    return part.size
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract logical partitions from an Android super image")
+    parser.add_argument("images", nargs="+", help="super image, or all its sparse chunks in order")
+    parser.add_argument("-p", "--partitions", nargs="*", default=None,
+                        help="partitions to extract, without slot suffix (default: all)")
+    parser.add_argument("-o", "--outdir", default=".", help="output directory (default: %(default)s)")
+    parser.add_argument("-S", "--slot", type=int, default=0, help="metadata slot (default: %(default)s)")
+    parser.add_argument("--suffix", default="_a", help="slot suffix tried first (default: %(default)s)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="partitions written at the same time (default: %(default)s)")
+    parser.add_argument("-l", "--list", action="store_true", help="list the partitions and exit")
+    args = parser.parse_args()
+
+    try:
+        image = open_image(args.images)
+        metadata = Metadata(image, args.slot)
+    except (LpError, sparse.SparseError, struct.error, OSError) as e:
+        print("[!] {}: {}".format(args.images[0], e), file=sys.stderr)
+        return 1
+
+    if args.list:
+        for name, part in metadata.partitions.items():
+            print("{}\t{}\t{}".format(name, part.group, part.size))
+        return 0
+
+    wanted = {}
+    names = args.partitions if args.partitions is not None else [
+        n for n in metadata.partitions if not (n.endswith("_b") and n[:-2] + "_a" in metadata.partitions)]
+    for name in names:
+        for candidate in (name + args.suffix, name):
+            part = metadata.partitions.get(candidate)
+            if part and part.extents:
+                if name.endswith(args.suffix):
+                    name = name[:-len(args.suffix)]
+                wanted[name] = part
+                break
+
+    # Other block devices are opened up front, partitions on a missing one fail
+    images = {0: image}
+    status = 0
+    for name, part in list(wanted.items()):
+        try:
+            for _, kind, _, source in part.extents:
+                if kind == target_linear and source not in images:
+                    if source >= len(metadata.block_devices):
+                        raise LpError("extent on unknown block device {}".format(source))
+                    images[source] = device_image(args.images[0], metadata.block_devices[source][2])
+        except (LpError, sparse.SparseError, OSError) as e:
+            print("[!] {}: {}".format(name, e), file=sys.stderr)
+            del wanted[name]
+            status = 1
+
+    os.makedirs(args.outdir, exist_ok=True)
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        futures = {name: pool.submit(extract_partition, part, images, os.path.join(args.outdir, name + ".img"))
+                   for name, part in wanted.items()}
+        for name, future in futures.items():
+            try:
+                size = future.result()
+                print("[+] {} ({}): {} bytes".format(name, wanted[name].name, size))
+            except (LpError, sparse.SparseError, OSError) as e:
+                print("[!] {}: {}".format(name, e), file=sys.stderr)
+                status = 1
+    for opened in images.values():
+        opened.close()
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main())
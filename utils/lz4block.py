@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+
+# LZ4 block decoder in pure Python
+#
+# Fallback for when the lz4 module is not installed, and for EROFS clusters
+# that have to be decoded partially: decoding stops as soon as max_size bytes
+# of output exist, so trailing padding or a stream that covers more than the
+# wanted range does not matter.
+
+import sys
+import argparse
+
+class LZ4BlockError(Exception):
+    pass
+
+def decompress(src, max_size=None):
+    src = memoryview(src)
+    end = len(src)
+    out = bytearray()
+    pos = 0
+    while pos < end:
+        token = src[pos]
+        pos += 1
+
+        length = token >> 4
+        if length == 15:
+            while True:
+                if pos >= end:
+                    raise LZ4BlockError("truncated literal length")
+                extra = src[pos]
+                pos += 1
+                length += extra
+                if extra != 255:
+                    break
+        if pos + length > end:
+            raise LZ4BlockError("truncated literals")
+        out += src[pos:pos + length]
+        pos += length
+        if max_size is not None and len(out) >= max_size:
+            return bytes(out[:max_size])
+        # The last sequence is literals only
+        if pos >= end:
+            break
+
+        if pos + 2 > end:
+            raise LZ4BlockError("truncated match offset")
+        offset = src[pos] | src[pos + 1] << 8
+        pos += 2
+        if offset == 0 or offset > len(out):
+            raise LZ4BlockError("bad match offset {}".format(offset))
+
+        length = token & 15
+        if length == 15:
+            while True:
+                if pos >= end:
+                    raise LZ4BlockError("truncated match length")
+                extra = src[pos]
+                pos += 1
+                length += extra
+                if extra != 255:
+                    break
+        length += 4
+
+        start = len(out) - offset
+        if offset >= length:
+            out += out[start:start + length]
+        else:
+            # Overlapping match, the last offset bytes repeat
+            pattern = bytes(out[start:])
+            out += (pattern * (length // offset + 1))[:length]
+        if max_size is not None and len(out) >= max_size:
+            return bytes(out[:max_size])
+    return bytes(out)
+
+def main():
+    parser = argparse.ArgumentParser(description="Decode a raw LZ4 block")
+    parser.add_argument("input", help="LZ4 block, without frame header")
+    parser.add_argument("output", help="decoded output")
+    parser.add_argument("-s", "--max-size", type=int, default=None, help="stop after this many bytes")
+    args = parser.parse_args()
+
+    with open(args.input, "rb") as f:
+        data = f.read()
+    try:
+        data = decompress(data, args.max_size)
+    except LZ4BlockError as e:
+        print("[!] {}".format(e), file=sys.stderr)
+        return 1
+    with open(args.output, "wb") as f:
+        f.write(data)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+
+# Extract partition images into folders, several at a time
+#
+# Every <partition>.img in the working directory is unpacked into <partition>/
+# by the first extractor that works: the in-process ext4 and EROFS readers,
+# 7zz, fsck.erofs, then a loop mount.
+# The superblock is probed first and only the extractors that can handle
+# that filesystem are tried; sparse images are unsparsed beforehand.
+# Partitions run on a pool of --jobs workers; images larger than --big-size
+# also take one of --io-jobs slots, so only a few multi-GB images are read
+# from disk at the same time. Each partition logs to <logdir>/<partition>.log
+# and the outcome of all of them is written to <logdir>/status.
+# Oppo/Realme keep more images in a euclid folder of vendor and system, those
+# are queued as soon as their parent partition is done.
+
+import os
+import re
+import pwd
+import sys
+import time
+import shutil
+import struct
+import argparse
+import threading
+import traceback
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import ext4
+import erofs
+import fsprobe
+import sparse
+import vendorhdr
+
+# Handled by the boot image, dtb and trustzone steps instead
+skip_pattern = re.compile(r"boot|recovery|dtbo|vendor_boot|tz")
+
+# Nested images that only need to be unpacked for their props
+euclid_dirs = {
+    "vendor": ["vendor/euclid"],
+    "system": ["system/system/euclid"],
+}
+
+print_lock = threading.Lock()
+
+def say(*args, **kwargs):
+    with print_lock:
+        print(*args, **kwargs)
+        sys.stdout.flush()
+
+class Job:
+    def __init__(self, name, image, target, chain, log, nested=False, offset=0):
+        self.name = name
+        self.image = image
+        # Bytes of vendor header (MOTO, ASUS) in front of the filesystem
+        self.offset = offset
+        self.target = target
+        self.chain = chain
+        self.log = log
+        # Nested images are removed even when they fail, like before
+        self.nested = nested
+        self.fs = None
+        self.method = None
+        self.status = None
+        self.seconds = 0.0
+
+def run(cmd, log):
+    log.write("$ {}\n".format(" ".join(cmd)))
+    log.flush()
+    return subprocess.run(cmd, stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT).returncode
+
+def clear(path):
+    if os.path.isdir(path):
+        for entry in os.listdir(path):
+            entry = os.path.join(path, entry)
+            if os.path.isdir(entry) and not os.path.islink(entry):
+                shutil.rmtree(entry, ignore_errors=True)
+            else:
+                os.unlink(entry)
+    else:
+        os.makedirs(path, exist_ok=True)
+
+def write_contexts(job, contexts):
+    # SELinux labels, which none of the other extractors keep
+    with open(os.path.splitext(job.log)[0] + ".contexts", "w") as f:
+        for path, label in contexts:
+            f.write("{} {}\n".format(path, label))
+
+def extract_ext4(job, log, tools):
+    clear(job.target)
+    contexts = []
+    try:
+        with ext4.Ext4Image(job.image, job.offset) as image:
+            count = image.extract(job.target, jobs=tools.file_jobs, contexts=contexts)
+    except (ext4.Ext4Error, struct.error) as e:
+        log.write("{}\n".format(e))
+        return False
+    log.write("{} files\n".format(count))
+    write_contexts(job, contexts)
+    return True
+
+def extract_erofs(job, log, tools):
+    clear(job.target)
+    contexts = []
+    try:
+        with erofs.ErofsImage(job.image, job.offset) as image:
+            count = image.extract(job.target, jobs=tools.file_jobs, contexts=contexts)
+    except erofs.read_errors as e:
+        log.write("{}\n".format(e))
+        return False
+    log.write("{} files\n".format(count))
+    write_contexts(job, contexts)
+    return True
+
+def strip_header(job, log):
+    """Cut the vendor header off for extractors that cannot start at an offset"""
+    log.write("# stripping {} header bytes\n".format(job.offset))
+    vendorhdr.strip(job.image, job.offset)
+    job.offset = 0
+
+def extract_7zz(job, log, tools):
+    clear(job.target)
+    return run([tools.bin_7zz, "x", "-snld", job.image, "-y", "-o" + job.target + "/"], log) == 0
+
+def extract_fsck_erofs(job, log, tools):
+    clear(job.target)
+    return run([tools.fsck_erofs, "--extract=" + job.target, job.image], log) == 0
+
+def extract_mount(job, log, tools):
+    clear(job.target)
+    if run(["sudo", "mount", "-o", "loop", "-t", "auto", job.image, job.target], log) != 0:
+        return False
+    # Copy out of the mount, then back into the now empty mountpoint
+    staging = job.target + "_"
+    os.makedirs(staging, exist_ok=True)
+    copied = run(["sudo", "cp", "-rf", job.target + "/.", staging], log) == 0
+    run(["sudo", "umount", job.target], log)
+    copied = copied and run(["sudo", "cp", "-rf", staging + "/.", job.target], log) == 0
+    run(["sudo", "rm", "-rf", staging], log)
+    run(["sudo", "chown", "-R", pwd.getpwuid(os.geteuid()).pw_name, job.target], log)
+    return copied and run(["chmod", "-R", "u+rwX", job.target], log) == 0
+
+extractors = {
+    "ext4": extract_ext4,
+    "erofs": extract_erofs,
+    "7zz": extract_7zz,
+    "fsck.erofs": extract_fsck_erofs,
+    "mount": extract_mount,
+}
+
+# Extractors known to work per filesystem, in order of preference. 7zz can
+# take a long time to give up on EROFS and does not read F2FS at all.
+fs_chains = {
+    "ext4": ["ext4", "7zz", "mount"],
+    "erofs": ["erofs", "fsck.erofs", "mount"],
+    "f2fs": ["mount"],
+    "squashfs": ["7zz", "mount"],
+    "vfat": ["7zz", "mount"],
+}
+
+def partition_chain(name):
+    # The modem image is FAT, 7zz is the only one worth trying
+    return ["7zz"] if name == "modem" else ["ext4", "erofs", "7zz", "fsck.erofs", "mount"]
+
+def pick_chain(job, log, tools):
+    """Probe the image and narrow the job's chain down to what can read it"""
+    fs, inner = fsprobe.probe(job.image, job.offset)
+    if fs == "sparse" and not job.offset:
+        raw = job.image + ".raw"
+        try:
+            sparse.to_raw([job.image], raw)
+            os.replace(raw, job.image)
+            fs, inner = fsprobe.probe(job.image)
+        except sparse.SparseError as e:
+            log.write("{}\n".format(e))
+            if os.path.exists(raw):
+                os.unlink(raw)
+    job.fs = fs or "unknown"
+    log.write("# filesystem: {}\n".format(job.fs if not inner else "{}/{}".format(fs, inner)))
+    chain = [m for m in fs_chains.get(fs, job.chain) if m in job.chain]
+    return chain or job.chain
+
+def extract(job, tools, io_slots, big_size):
+    start = time.monotonic()
+    os.makedirs(job.target, exist_ok=True)
+    big = os.path.getsize(job.image) >= big_size
+    if big:
+        io_slots.acquire()
+    try:
+        with open(job.log, "w") as log:
+            try:
+                chain = pick_chain(job, log, tools)
+            except Exception:
+                log.write(traceback.format_exc())
+                chain = job.chain
+            for method in chain:
+                log.write("# {}\n".format(method))
+                log.flush()
+                # A malformed image can break the in-process readers in any
+                # way, the next method in the chain still gets its turn
+                try:
+                    if job.offset and method not in ("ext4", "erofs"):
+                        strip_header(job, log)
+                    ok = extractors[method](job, log, tools)
+                except Exception:
+                    log.write(traceback.format_exc())
+                    ok = False
+                if ok:
+                    job.method = method
+                    break
+    finally:
+        if big:
+            io_slots.release()
+    job.status = "ok" if job.method else "failed"
+    job.seconds = time.monotonic() - start
+    return job
+
+def euclid_jobs(parent, logdir):
+    jobs = []
+    for folder in euclid_dirs.get(parent, []):
+        if not os.path.isdir(folder):
+            continue
+        for f in sorted(os.listdir(folder)):
+            image = os.path.join(folder, f)
+            if f.endswith(".img") and os.path.isfile(image):
+                target = os.path.join(folder, f.replace(".img", "", 1))
+                log = os.path.join(logdir, "{}_{}.log".format(folder.replace("/", "_"), f))
+                jobs.append(Job(image, image, target, ["ext4", "erofs", "7zz"], log, nested=True))
+    return jobs
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract partition images in parallel")
+    parser.add_argument("partitions", nargs="+", help="partition names, <name>.img is extracted to <name>/")
+    parser.add_argument("-C", "--directory", default=".", help="folder holding the images (default: %(default)s)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="partitions extracted at once (default: %(default)s)")
+    parser.add_argument("--io-jobs", type=int, default=2,
+                        help="big images read at once (default: %(default)s)")
+    parser.add_argument("--big-size", type=int, default=512 << 20,
+                        help="size in bytes from which an image counts as big (default: %(default)s)")
+    parser.add_argument("-O", "--offset", action="append", default=[], metavar="NAME=BYTES",
+                        help="filesystem of partition NAME starts BYTES into its image (repeatable)")
+    parser.add_argument("--file-jobs", type=int, default=4,
+                        help="files written at once by the in-process readers (default: %(default)s)")
+    parser.add_argument("-L", "--logdir", default="partlogs", help="per partition logs (default: %(default)s)")
+    parser.add_argument("--7zz", dest="bin_7zz", default=os.environ.get("BIN_7ZZ", "7zz"),
+                        help="7-Zip binary (default: %(default)s)")
+    parser.add_argument("--fsck-erofs", dest="fsck_erofs", default="fsck.erofs",
+                        help="fsck.erofs binary (default: %(default)s)")
+    args = parser.parse_args()
+
+    os.chdir(args.directory)
+    os.makedirs(args.logdir, exist_ok=True)
+    io_slots = threading.BoundedSemaphore(max(args.io_jobs, 1))
+
+    offsets = {}
+    for item in args.offset:
+        name, _, value = item.partition("=")
+        offsets[name] = int(value)
+
+    jobs = []
+    for name in dict.fromkeys(args.partitions):
+        if skip_pattern.search(name) or not os.path.exists(name + ".img"):
+            continue
+        jobs.append(Job(name, name + ".img", name, partition_chain(name),
+                        os.path.join(args.logdir, name + ".log"), offset=offsets.get(name, 0)))
+    # Largest first so one big image does not end up last in the queue
+    jobs.sort(key=lambda j: os.path.getsize(j.image), reverse=True)
+    scheduled = {j.name for j in jobs}
+
+    done = []
+    owners = {}
+    with ThreadPoolExecutor(max_workers=max(args.jobs, 1)) as pool:
+        def submit(job):
+            say("Extracting {} partition...".format(job.name))
+            future = pool.submit(extract, job, args, io_slots, args.big_size)
+            owners[future] = job
+            return future
+
+        pending = {submit(j) for j in jobs}
+        # Parents that are not extracted in this run may already be folders
+        for parent in euclid_dirs:
+            if parent not in scheduled:
+                pending.update(submit(j) for j in euclid_jobs(parent, args.logdir))
+
+        while pending:
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                job = owners.pop(future)
+                try:
+                    future.result()
+                except Exception:
+                    # Only reachable when the job's own bookkeeping fails, the
+                    # run and the other partitions go on
+                    with open(job.log, "a") as log:
+                        log.write(traceback.format_exc())
+                    job.method = None
+                    job.status = "failed"
+                done.append(job)
+                if job.method:
+                    say("[+] {} ({}) extracted by {} in {:.0f}s".format(job.name, job.fs, job.method, job.seconds))
+                    if os.path.exists(job.image):
+                        os.unlink(job.image)
+                    pending.update(submit(j) for j in euclid_jobs(job.name, args.logdir))
+                else:
+                    say("[!] Couldn't extract {}, see {}".format(job.name, job.log))
+                    if job.nested and os.path.exists(job.image):
+                        os.unlink(job.image)
+
+    with open(os.path.join(args.logdir, "status"), "w") as f:
+        for job in done:
+            f.write("{}\t{}\t{}\t{}\t{:.1f}\n".format(job.name, job.status, job.fs, job.method or "-", job.seconds))
+
+    failed = [j.name for j in done if not j.method and not j.nested]
+    if failed:
+        say("[!] Unsupported filesystem in: {}".format(" ".join(failed)))
+        say("For EROFS: make sure you're using Linux 5.4+ kernel.")
+        say("For F2FS: make sure you're using Linux 5.15+ kernel.")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
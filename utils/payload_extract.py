@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+
+# Extract partitions from an A/B OTA payload.bin
+#
+# The payload header and its DeltaArchiveManifest are decoded with a small
+# protobuf reader, no generated code needed. Only the wanted partitions are
+# written: every install operation is read at its offset, checked against
+# its sha256 and decompressed (REPLACE, REPLACE_BZ, REPLACE_XZ,
+# REPLACE_ZSTD), then pwritten to its destination extents, many operations
+# at a time on a thread pool. ZERO and DISCARD extents are left as holes.
+# payload.bin is read straight from the OTA zip when it is stored there,
+# which it is in every OTA built by the Android tools.
+# Incremental payloads need the source images and are not supported.
+
+import os
+import bz2
+import sys
+import lzma
+import struct
+import hashlib
+import zipfile
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+payload_magic = b"CrAU"
+
+op_replace = 0
+op_replace_bz = 1
+op_zero = 6
+op_discard = 7
+op_replace_xz = 8
+op_replace_zstd = 14
+
+op_names = {
+    0: "REPLACE", 1: "REPLACE_BZ", 2: "MOVE", 3: "BSDIFF", 4: "SOURCE_COPY", 5: "SOURCE_BSDIFF",
+    6: "ZERO", 7: "DISCARD", 8: "REPLACE_XZ", 9: "PUFFDIFF", 10: "BROTLI_BSDIFF", 11: "ZUCCHINI",
+    12: "LZ4DIFF_BSDIFF", 13: "LZ4DIFF_PUFFDIFF", 14: "REPLACE_ZSTD",
+}
+
+_local = struct.Struct("<4s5H3L2H")
+
+class PayloadError(Exception):
+    pass
+
+# What a broken operation can raise while it is decompressed and written
+operation_errors = (PayloadError, lzma.LZMAError, OSError, ValueError)
+if zstandard is not None:
+    operation_errors += (zstandard.ZstdError,)
+
+def varint(buf, pos):
+    result = 0
+    shift = 0
+    while True:
+        if pos >= len(buf):
+            raise PayloadError("truncated varint")
+        b = buf[pos]
+        pos += 1
+        result |= (b & 0x7F) << shift
+        if not b & 0x80:
+            return result, pos
+        shift += 7
+
+def fields(buf):
+    """(field number, value) of a protobuf message; bytes for length delimited fields"""
+    pos = 0
+    while pos < len(buf):
+        key, pos = varint(buf, pos)
+        number, wire = key >> 3, key & 7
+        if wire == 0:
+            value, pos = varint(buf, pos)
+        elif wire == 1:
+            value = struct.unpack_from("<Q", buf, pos)[0]
+            pos += 8
+        elif wire == 2:
+            size, pos = varint(buf, pos)
+            value = bytes(buf[pos:pos + size])
+            pos += size
+        elif wire == 5:
+            value = struct.unpack_from("<I", buf, pos)[0]
+            pos += 4
+        else:
+            raise PayloadError("unsupported protobuf wire type {}".format(wire))
+        yield number, value
+
+def extents(raw):
+    start = blocks = 0
+    for number, value in fields(raw):
+        if number == 1:
+            start = value
+        elif number == 2:
+            blocks = value
+    return start, blocks
+
+class Operation:
+    def __init__(self, raw):
+        self.type = op_replace
+        self.data_offset = 0
+        self.data_length = 0
+        self.src_extents = []
+        self.dst_extents = []
+        self.sha256 = None
+        for number, value in fields(raw):
+            if number == 1:
+                self.type = value
+            elif number == 2:
+                self.data_offset = value
+            elif number == 3:
+                self.data_length = value
+            elif number == 4:
+                self.src_extents.append(extents(value))
+            elif number == 6:
+                self.dst_extents.append(extents(value))
+            elif number == 8:
+                self.sha256 = value
+
+class PartitionUpdate:
+    def __init__(self, raw):
+        self.name = ""
+        self.size = None
+        self.sha256 = None
+        self.operations = []
+        for number, value in fields(raw):
+            if number == 1:
+                self.name = value.decode("utf-8", "replace")
+            elif number == 7:
+                for info_number, info_value in fields(value):
+                    if info_number == 1:
+                        self.size = info_value
+                    elif info_number == 2:
+                        self.sha256 = info_value
+            elif number == 8:
+                self.operations.append(Operation(value))
+
+def stored_member_offset(path, name):
+    """Offset of an uncompressed zip member in the zip file, None if it is not stored"""
+    with zipfile.ZipFile(path) as archive:
+        try:
+            info = archive.getinfo(name)
+        except KeyError:
+            candidates = [i for i in archive.infolist() if os.path.basename(i.filename) == name]
+            if not candidates:
+                raise PayloadError("no {} in {}".format(name, path))
+            info = candidates[0]
+    if info.compress_type != zipfile.ZIP_STORED or info.flag_bits & 0x1:
+        return None
+    with open(path, "rb") as f:
+        f.seek(info.header_offset)
+        (sig, _, _, _, _, _, _, _, _, nlen, elen) = _local.unpack(f.read(_local.size))
+    if sig != b"PK\x03\x04":
+        raise PayloadError("bad local header for {}".format(info.filename))
+    return info.header_offset + _local.size + nlen + elen
+
+class Payload:
+    def __init__(self, path):
+        base = 0
+        if zipfile.is_zipfile(path):
+            base = stored_member_offset(path, "payload.bin")
+            if base is None:
+                raise PayloadError("payload.bin is compressed in {}, unpack it first".format(path))
+        self.path = path
+        self.fd = os.open(path, os.O_RDONLY)
+        try:
+            self.read_header(base)
+        except BaseException:
+            os.close(self.fd)
+            raise
+
+    def close(self):
+        os.close(self.fd)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def read_header(self, base):
+        header = os.pread(self.fd, 24, base)
+        if len(header) < 24 or header[:4] != payload_magic:
+            raise PayloadError("not an update payload")
+        (version, manifest_size, signature_size) = struct.unpack(">QQI", header[4:])
+        if version == 1:
+            header_size = 20
+            signature_size = 0
+        elif version == 2:
+            header_size = 24
+        else:
+            raise PayloadError("unsupported payload version {}".format(version))
+        manifest = os.pread(self.fd, manifest_size, base + header_size)
+        if len(manifest) < manifest_size:
+            raise PayloadError("truncated manifest")
+        self.data_offset = base + header_size + manifest_size + signature_size
+
+        self.block_size = 4096
+        self.partitions = []
+        for number, value in fields(manifest):
+            if number == 3:
+                self.block_size = value
+            elif number == 13:
+                self.partitions.append(PartitionUpdate(value))
+
+    def operation_data(self, op):
+        data = os.pread(self.fd, op.data_length, self.data_offset + op.data_offset)
+        if len(data) < op.data_length:
+            raise PayloadError("operation data beyond the end of the payload")
+        if op.sha256 and hashlib.sha256(data).digest() != op.sha256:
+            raise PayloadError("operation data sha256 mismatch")
+        if op.type == op_replace:
+            return data
+        if op.type == op_replace_bz:
+            return bz2.decompress(data)
+        if op.type == op_replace_xz:
+            return lzma.decompress(data)
+        if op.type == op_replace_zstd:
+            if zstandard is None:
+                raise PayloadError("REPLACE_ZSTD operation, the zstandard module is not installed")
+            return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+        raise PayloadError("unsupported operation {}".format(op_names.get(op.type, op.type)))
+
+    def apply(self, op, fd):
+        if op.type in (op_zero, op_discard):
+            return
+        data = memoryview(self.operation_data(op))
+        pos = 0
+        for start, blocks in op.dst_extents:
+            length = min(blocks * self.block_size, len(data) - pos)
+            os.pwrite(fd, data[pos:pos + length], start * self.block_size)
+            pos += length
+
+def check_full(part):
+    for op in part.operations:
+        if op.src_extents or op.type not in (op_replace, op_replace_bz, op_replace_xz,
+                                             op_replace_zstd, op_zero, op_discard):
+            raise PayloadError("{} is an incremental update ({})".format(
+                part.name, op_names.get(op.type, op.type)))
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract partitions from an A/B OTA payload")
+    parser.add_argument("payload", help="payload.bin, or the OTA zip holding it")
+    parser.add_argument("-o", "--outdir", default=".", help="output directory (default: %(default)s)")
+    parser.add_argument("-p", "--partitions", nargs="*", default=None,
+                        help="partitions to extract (default: all)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="operations run at the same time (default: %(default)s)")
+    parser.add_argument("-l", "--list", action="store_true", help="list the partitions and exit")
+    args = parser.parse_args()
+
+    try:
+        payload = Payload(args.payload)
+    except (PayloadError, zipfile.BadZipFile, struct.error, OSError) as e:
+        print("[!] {}: {}".format(args.payload, e), file=sys.stderr)
+        return 1
+
+    with payload:
+        if args.list:
+            for part in payload.partitions:
+                print("{}\t{}\t{}".format(part.name, part.size, len(part.operations)))
+            return 0
+
+        wanted = [p for p in payload.partitions if args.partitions is None or p.name in args.partitions]
+        try:
+            for part in wanted:
+                check_full(part)
+        except PayloadError as e:
+            print("[!] {}".format(e), file=sys.stderr)
+            return 1
+
+        os.makedirs(args.outdir, exist_ok=True)
+        failed = {}
+        lock = threading.Lock()
+        outputs = {}
+        for part in wanted:
+            fd = os.open(os.path.join(args.outdir, part.name + ".img"), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+            size = part.size
+            if size is None:
+                size = max((s + n) * payload.block_size for op in part.operations for s, n in op.dst_extents)
+            os.ftruncate(fd, size)
+            outputs[part.name] = fd
+
+        def run(part, op):
+            try:
+                payload.apply(op, outputs[part.name])
+            except operation_errors as e:
+                with lock:
+                    failed.setdefault(part.name, e)
+
+        # Operations of all partitions share the pool, so a big partition does
+        # not leave the other workers idle
+        with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+            for part in wanted:
+                for op in part.operations:
+                    pool.submit(run, part, op)
+
+        for part in wanted:
+            os.close(outputs[part.name])
+            if part.name in failed:
+                print("[!] {}: {}".format(part.name, failed[part.name]), file=sys.stderr)
+                os.unlink(os.path.join(args.outdir, part.name + ".img"))
+            else:
+                print("[+] {}: {} operations".format(part.name, len(part.operations)))
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+
+# Resolve the device details of a dump from its build*.prop files
+#
+# Every build*.prop that one of the rules below can look at (system, vendor,
+# product, odm, my_product, euclid, ...) is read once into an index keyed by
+# file and property. Each field is then resolved by walking its fallbacks in
+# order: a step either looks a property up in a list of prop files, taking
+# the first file that has it, or derives the value from fields resolved
+# before it. The order is the one dumper.sh used with its grep chains.
+# The result is printed as JSON, or as shell assignments with --shell.
+
+import os
+import sys
+import glob
+import json
+import shlex
+import argparse
+
+systems = ["system/build*.prop", "system/system/build*.prop"]
+vendor = ["vendor/build*.prop"]
+system_vendor = systems + vendor
+vendor_system = vendor + systems
+product = ["product/build*.prop"]
+oppo_my_product = ["oppo_product/build*.prop", "my_product/build*.prop"]
+my_product = ["my_product/build*.prop"]
+odm = ["vendor/odm/etc/build*.prop"]
+euclid = ["vendor/euclid/*/build.prop"]
+euclid_product = ["vendor/euclid/product/build*.prop"]
+euclid_my_product = ["system/system/euclid/my_product/build*.prop"]
+
+def cut(value, sep, field):
+    """cut -d<sep> -f<field>: lines without the separator pass unchanged"""
+    parts = value.split(sep)
+    if len(parts) == 1:
+        return value
+    return parts[field - 1] if len(parts) >= field else ""
+
+def empty_or_oppo(value):
+    return value in ("", "OPPO")
+
+def realme_incremental(values, get):
+    if "realme" not in values["brand"]:
+        return ""
+    ota = get("ro.build.version.ota", ["vendor/euclid/product/build.prop", "oppo_product/build.prop"])
+    return "_".join(ota.split("_")[-2:])
+
+def generated_description(values, get):
+    if not values["incremental"]:
+        return ""
+    return " ".join(values[k] for k in ("flavor", "release", "id", "incremental", "tags"))
+
+# (field, steps); a step is (property, prop files), (property, prop files,
+# condition on the current value) or (function of the fields so far,).
+# Steps only run while the field is still empty unless they have a
+# condition. A field may come back later to add fallbacks that depend on
+# other fields.
+fields = [
+    ("flavor", [
+        ("ro.build.flavor", system_vendor),
+        ("ro.vendor.build.flavor", vendor),
+        ("ro.system.build.flavor", systems),
+        ("ro.build.type", systems),
+    ]),
+    ("release", [
+        ("ro.build.version.release", system_vendor),
+        ("ro.vendor.build.version.release", vendor),
+        ("ro.system.build.version.release", systems),
+    ]),
+    ("id", [
+        ("ro.build.id", system_vendor),
+        ("ro.vendor.build.id", vendor),
+        ("ro.system.build.id", systems),
+    ]),
+    ("tags", [
+        ("ro.build.tags", system_vendor),
+        ("ro.vendor.build.tags", vendor),
+        ("ro.system.build.tags", systems),
+    ]),
+    ("platform", [
+        ("ro.board.platform", system_vendor),
+        ("ro.vendor.board.platform", vendor),
+        ("ro.system.board.platform", systems),
+    ]),
+    ("manufacturer", [
+        ("ro.product.manufacturer", system_vendor),
+        ("ro.product.brand.sub", euclid_my_product),
+        ("ro.vendor.product.manufacturer", vendor),
+        ("ro.product.vendor.manufacturer", vendor),
+        ("ro.system.product.manufacturer", systems),
+        ("ro.product.system.manufacturer", systems),
+        ("ro.product.odm.manufacturer", odm),
+        ("ro.product.manufacturer", ["oppo_product/build*.prop", "my_product/build*.prop", "product/build*.prop"]),
+        ("ro.product.manufacturer", euclid),
+        ("ro.system.product.manufacturer", euclid),
+        ("ro.product.product.manufacturer", euclid_product),
+    ]),
+    ("fingerprint", [
+        ("ro.build.fingerprint", systems),
+        ("ro.vendor.build.fingerprint", vendor),
+        ("ro.system.build.fingerprint", systems),
+        ("ro.product.build.fingerprint", product),
+        ("ro.build.fingerprint", oppo_my_product),
+        ("ro.system.build.fingerprint", ["my_product/build.prop"]),
+        ("ro.vendor.build.fingerprint", ["my_product/build.prop"]),
+        ("ro.bootimage.build.fingerprint", ["vendor/build.prop"]),
+    ]),
+    ("brand", [
+        ("ro.product.brand", system_vendor),
+        ("ro.product.brand.sub", euclid_my_product),
+        ("ro.product.vendor.brand", vendor),
+        ("ro.vendor.product.brand", vendor),
+        ("ro.product.system.brand", systems),
+        # OPPO firmwares name the real brand in their euclid images
+        ("ro.product.system.brand", euclid, empty_or_oppo),
+        ("ro.product.product.brand", euclid_product),
+        ("ro.product.odm.brand", odm),
+        ("ro.product.brand", oppo_my_product),
+        ("ro.product.brand", euclid),
+        (lambda values, get: cut(values["fingerprint"], "/", 1),),
+    ]),
+    ("codename", [
+        ("ro.product.device", vendor_system),
+        ("ro.vendor.product.device.oem", ["vendor/euclid/odm/build.prop"]),
+        ("ro.product.vendor.device", vendor),
+        ("ro.vendor.product.device", vendor),
+        ("ro.product.system.device", systems),
+        ("ro.product.system.device", euclid),
+        ("ro.product.product.device", euclid),
+        ("ro.product.product.model", euclid),
+        ("ro.product.device", oppo_my_product),
+        ("ro.product.product.device", ["oppo_product/build*.prop"]),
+        ("ro.product.system.device", my_product),
+        ("ro.product.vendor.device", my_product),
+        (lambda values, get: cut(cut(values["fingerprint"], "/", 3), ":", 1),),
+        (lambda values, get: cut(get("ro.build.fota.version", systems), "-", 1),),
+        ("ro.build.product", vendor_system),
+    ]),
+    ("description", [
+        ("ro.build.description", system_vendor),
+        ("ro.vendor.build.description", vendor),
+        ("ro.system.build.description", systems),
+        ("ro.product.build.description", product),
+    ]),
+    ("incremental", [
+        ("ro.build.version.incremental", system_vendor),
+        ("ro.vendor.build.version.incremental", vendor),
+        ("ro.system.build.version.incremental", systems),
+        ("ro.build.version.incremental", my_product),
+        ("ro.system.build.version.incremental", my_product),
+        ("ro.vendor.build.version.incremental", my_product),
+        # Realme firmwares may have neither incremental nor fingerprint
+        (realme_incremental,),
+        (lambda values, get: cut(values["description"], " ", 4),),
+    ]),
+    ("description", [
+        (generated_description,),
+        (lambda values, get: values["codename"],),
+    ]),
+    ("abilist", [
+        ("ro.product.cpu.abilist", systems),
+        ("ro.vendor.product.cpu.abilist", vendor),
+    ]),
+    ("locale", [
+        ("ro.product.locale", systems),
+        (lambda values, get: "undefined",),
+    ]),
+    ("density", [
+        ("ro.sf.lcd_density", systems),
+        (lambda values, get: "undefined",),
+    ]),
+    ("is_ab", [
+        ("ro.build.ab_update", system_vendor),
+        (lambda values, get: "false",),
+    ]),
+    ("treble_support", [
+        ("ro.treble.enabled", systems),
+        (lambda values, get: "false",),
+    ]),
+    ("otaver", [
+        ("ro.build.version.ota", ["vendor/euclid/product/build*.prop", "oppo_product/build*.prop"] + systems),
+    ]),
+    ("branch", [
+        (lambda values, get: values["otaver"].replace(" ", "-") if not values["fingerprint"] else "",),
+    ]),
+    ("otaver", [
+        ("ro.build.fota.version", systems),
+    ]),
+    ("branch", [
+        (lambda values, get: values["description"].replace(" ", "-"),),
+    ]),
+]
+
+def read_props(path):
+    """First value of every property in a prop file"""
+    props = {}
+    try:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            for line in f:
+                key, sep, value = line.rstrip("\n").partition("=")
+                if sep and key not in props:
+                    props[key] = value
+    except OSError:
+        pass
+    return props
+
+class PropIndex:
+    def __init__(self, patterns):
+        self.files = {}
+        self.props = {}
+        for pattern in patterns:
+            self.files[pattern] = sorted(glob.glob(pattern))
+            for path in self.files[pattern]:
+                if path not in self.props:
+                    self.props[path] = read_props(path)
+
+    def get(self, prop, patterns):
+        """Value of prop in the first of the prop files that sets it"""
+        for pattern in patterns:
+            if pattern not in self.files:
+                self.files[pattern] = sorted(glob.glob(pattern))
+            for path in self.files[pattern]:
+                if path not in self.props:
+                    self.props[path] = read_props(path)
+                if prop in self.props[path]:
+                    return self.props[path][prop]
+        return ""
+
+def resolve(index):
+    values = {}
+    for name, steps in fields:
+        value = values.get(name, "")
+        for step in steps:
+            if len(step) == 1:
+                if not value:
+                    value = step[0](values, index.get)
+            elif len(step) == 2:
+                if not value:
+                    value = index.get(*step)
+            elif step[2](value):
+                value = index.get(step[0], step[1])
+        values[name] = value
+    return values
+
+def rule_patterns():
+    patterns = set()
+    for _, steps in fields:
+        for step in steps:
+            if len(step) > 1:
+                patterns.update(step[1])
+    return sorted(patterns)
+
+def main():
+    parser = argparse.ArgumentParser(description="Resolve device details from the build*.prop files of a dump")
+    parser.add_argument("-C", "--directory", default=".", help="dump directory (default: %(default)s)")
+    parser.add_argument("--shell", action="store_true", help="print shell variable assignments instead of JSON")
+    args = parser.parse_args()
+
+    os.chdir(args.directory)
+    index = PropIndex(rule_patterns())
+    if not index.props:
+        print("[!] No build*.prop found in {}".format(args.directory), file=sys.stderr)
+        return 1
+    values = resolve(index)
+    if args.shell:
+        for name, value in values.items():
+            print("{}={}".format(name, shlex.quote(value)))
+    else:
+        print(json.dumps(values, indent=4))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
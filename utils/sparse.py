@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+
+# Read Android sparse images without unsparsing them first
+#
+# The chunk list of one or more sparse files is loaded into a map of the
+# image they describe; several files (Motorola sparsechunks, split super
+# images) are laid over each other in order, as simg2img writes them.
+# Data is then read at any offset straight from the RAW chunks, FILL chunks
+# are expanded and DONT_CARE areas come back as holes.
+# As a tool it replaces simg2img: the raw image is streamed out in one pass
+# with holes for DONT_CARE and zero FILL chunks, CRC32 chunks can be checked,
+# and -m moves images that are not sparse, or fail to convert, to the output
+# unchanged.
+
+import os
+import sys
+import zlib
+import bisect
+import shutil
+import struct
+import argparse
+
+sparse_magic = 0xED26FF3A
+
+chunk_raw = 0xCAC1
+chunk_fill = 0xCAC2
+chunk_dont_care = 0xCAC3
+chunk_crc32 = 0xCAC4
+
+piece_size = 4 << 20
+
+_sparse_header = struct.Struct("<I4H4I")
+_chunk_header = struct.Struct("<2H2I")
+
+class SparseError(Exception):
+    pass
+
+def is_sparse(path):
+    with open(path, "rb") as f:
+        return f.read(4) == struct.pack("<I", sparse_magic)
+
+def read_header(fd, path):
+    header = os.pread(fd, _sparse_header.size, 0)
+    if len(header) < _sparse_header.size:
+        raise SparseError("{}: too short for a sparse image".format(path))
+    (magic, major, _, file_hdr_sz, chunk_hdr_sz, blk_sz, total_blks, total_chunks, checksum) = \
+        _sparse_header.unpack(header)
+    if magic != sparse_magic:
+        raise SparseError("{}: not a sparse image".format(path))
+    if major != 1 or blk_sz == 0 or blk_sz % 4:
+        raise SparseError("{}: unsupported sparse image".format(path))
+    return file_hdr_sz, chunk_hdr_sz, blk_sz, total_blks, total_chunks, checksum
+
+def iter_chunks(fd, path):
+    """(kind, first block, blocks, data offset, fill or crc) of every chunk of an open sparse file"""
+    (file_hdr_sz, chunk_hdr_sz, blk_sz, _, total_chunks, _) = read_header(fd, path)
+    pos = file_hdr_sz
+    block = 0
+    for _ in range(total_chunks):
+        header = os.pread(fd, _chunk_header.size, pos)
+        if len(header) < _chunk_header.size:
+            raise SparseError("{}: truncated chunk header".format(path))
+        (kind, _, chunk_sz, total_sz) = _chunk_header.unpack(header)
+        data = pos + chunk_hdr_sz
+        if kind == chunk_raw:
+            if total_sz != chunk_hdr_sz + chunk_sz * blk_sz:
+                raise SparseError("{}: bad raw chunk size".format(path))
+            yield kind, block, chunk_sz, data, None
+        elif kind in (chunk_fill, chunk_crc32):
+            value = os.pread(fd, 4, data)
+            if len(value) < 4:
+                raise SparseError("{}: truncated chunk".format(path))
+            yield kind, block, chunk_sz, data, value
+        elif kind == chunk_dont_care:
+            yield kind, block, chunk_sz, data, None
+        else:
+            raise SparseError("{}: unknown chunk type {:#x}".format(path, kind))
+        block += chunk_sz
+        pos += total_sz
+
+def verify(path):
+    """Check the CRC32 chunks and image checksum of a sparse file"""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        (_, _, blk_sz, _, _, checksum) = read_header(fd, path)
+        crc = 0
+        zeros = bytes(blk_sz)
+        for kind, _, blocks, data, value in iter_chunks(fd, path):
+            if kind == chunk_raw:
+                left = blocks * blk_sz
+                while left:
+                    piece = os.pread(fd, min(left, piece_size), data)
+                    crc = zlib.crc32(piece, crc)
+                    data += len(piece)
+                    left -= len(piece)
+            elif kind in (chunk_fill, chunk_dont_care):
+                block = value * (blk_sz // 4) if kind == chunk_fill else zeros
+                for _ in range(blocks):
+                    crc = zlib.crc32(block, crc)
+            elif struct.unpack("<I", value)[0] != crc:
+                raise SparseError("{}: CRC32 chunk mismatch".format(path))
+        if checksum and checksum != crc:
+            raise SparseError("{}: image checksum mismatch".format(path))
+    finally:
+        os.close(fd)
+
+class SparseImage:
+    def __init__(self, paths):
+        if isinstance(paths, str):
+            paths = [paths]
+        self.paths = list(paths)
+        self.fds = []
+        self.block_size = None
+        self.blocks = 0
+        # Sorted, non-overlapping (start block, end block, kind, fd, file offset, fill)
+        self.starts = []
+        self.chunks = []
+        try:
+            for path in self.paths:
+                self.load(path)
+        except BaseException:
+            self.close()
+            raise
+        self.size = self.blocks * self.block_size
+
+    def close(self):
+        for fd in self.fds:
+            os.close(fd)
+        self.fds = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def load(self, path):
+        fd = os.open(path, os.O_RDONLY)
+        self.fds.append(fd)
+        (_, _, blk_sz, total_blks, _, _) = read_header(fd, path)
+        if self.block_size is None:
+            self.block_size = blk_sz
+        elif blk_sz != self.block_size:
+            raise SparseError("{}: block size {} does not match {}".format(path, blk_sz, self.block_size))
+        self.blocks = max(self.blocks, total_blks)
+        for kind, block, blocks, data, value in iter_chunks(fd, path):
+            if kind in (chunk_raw, chunk_fill):
+                self.insert(block, block + blocks, kind, fd, data, value)
+            self.blocks = max(self.blocks, block + blocks)
+
+    def insert(self, start, end, kind, fd, offset, fill):
+        """Add a chunk, cutting away what it covers of earlier ones"""
+        if start == end:
+            return
+        i = bisect.bisect_right(self.starts, start) - 1
+        if i < 0:
+            i = 0
+        kept = []
+        j = i
+        while j < len(self.chunks) and self.chunks[j][0] < end:
+            (cstart, cend, ckind, cfd, coffset, cfill) = self.chunks[j]
+            if cend <= start:
+                kept.append(self.chunks[j])
+            else:
+                if cstart < start:
+                    kept.append((cstart, start, ckind, cfd, coffset, cfill))
+                if cend > end:
+                    skip = (end - cstart) * self.block_size if ckind == chunk_raw else 0
+                    kept.append((end, cend, ckind, cfd, coffset + skip, cfill))
+            j += 1
+        kept.append((start, end, kind, fd, offset, fill))
+        kept.sort()
+        self.chunks[i:j] = kept
+        self.starts[i:j] = [c[0] for c in kept]
+
+    def segments(self, offset, length):
+        """(offset, length, bytes) pieces of a range, bytes is None for holes"""
+        end = min(offset + length, self.size)
+        bs = self.block_size
+        i = max(bisect.bisect_right(self.starts, offset // bs) - 1, 0)
+        pos = offset
+        while pos < end:
+            while i < len(self.chunks) and self.chunks[i][1] * bs <= pos:
+                i += 1
+            if i == len(self.chunks) or self.chunks[i][0] * bs >= end:
+                yield pos, end - pos, None
+                return
+            (cstart, cend, kind, fd, coffset, fill) = self.chunks[i]
+            if cstart * bs > pos:
+                yield pos, cstart * bs - pos, None
+                pos = cstart * bs
+                continue
+            if kind == chunk_fill and fill == b"\0\0\0\0":
+                stop = min(cend * bs, end)
+                yield pos, stop - pos, None
+            elif kind == chunk_raw:
+                stop = min(cend * bs, end, pos + piece_size)
+                data = os.pread(fd, stop - pos, coffset + pos - cstart * bs)
+                if len(data) < stop - pos:
+                    raise SparseError("raw chunk beyond the end of the file")
+                yield pos, stop - pos, data
+            else:
+                stop = min(cend * bs, end, pos + piece_size)
+                shift = (pos - cstart * bs) % 4
+                yield pos, stop - pos, (fill * ((stop - pos) // 4 + 2))[shift:shift + stop - pos]
+            pos = stop
+
+    def read(self, offset, length):
+        out = bytearray()
+        for _, size, data in self.segments(offset, length):
+            out += data if data is not None else bytes(size)
+        return bytes(out)
+
+def to_raw(paths, output):
+    """Write the raw image of one or more sparse files, returns its size"""
+    with SparseImage(paths) as image, open(output, "wb") as out:
+        for offset, _, data in image.segments(0, image.size):
+            if data is not None:
+                out.seek(offset)
+                out.write(data)
+        out.truncate(image.size)
+        return image.size
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert Android sparse images to raw images")
+    parser.add_argument("files", nargs="+", metavar="file",
+                        help="sparse images (several are merged in order), then the raw output")
+    parser.add_argument("-m", "--move-raw", action="store_true",
+                        help="move an input that is not sparse, or that fails to convert, to the output")
+    parser.add_argument("-c", "--check", action="store_true", help="verify CRC32 chunks first")
+    parser.add_argument("-i", "--info", action="store_true", help="describe the inputs instead of converting")
+    args = parser.parse_args()
+
+    if args.info:
+        for path in args.files:
+            try:
+                with SparseImage(path) as image:
+                    print("{}\t{} blocks of {}\t{} data chunks".format(path, image.blocks, image.block_size,
+                                                                       len(image.chunks)))
+            except (SparseError, OSError) as e:
+                print("[!] {}".format(e), file=sys.stderr)
+        return 0
+
+    if len(args.files) < 2:
+        parser.error("an input and an output are needed")
+    inputs, output = args.files[:-1], args.files[-1]
+    try:
+        if args.move_raw and len(inputs) == 1 and not is_sparse(inputs[0]):
+            shutil.move(inputs[0], output)
+            return 0
+        if args.check:
+            for path in inputs:
+                verify(path)
+        to_raw(inputs, output)
+    except (SparseError, OSError) as e:
+        print("[!] {}".format(e), file=sys.stderr)
+        if os.path.exists(output) and output not in inputs:
+            os.unlink(output)
+        # Left in place of the raw image, other extractors may still read it
+        if args.move_raw and len(inputs) == 1 and os.path.exists(inputs[0]):
+            try:
+                shutil.move(inputs[0], output)
+            except OSError as e:
+                print("[!] {}".format(e), file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+
+# Detect and strip vendor headers in front of partition images
+#
+# MOTO and ASUS images carry a header before the filesystem; instead of
+# grepping the whole image for the ext4 magic, only sector aligned offsets
+# in the first MiBs are checked, and a hit must look like a real ext4 or
+# EROFS superblock. Images from signed packages start with an SSSS header
+# (payload at 64, its length at 60) or a 0x4040 byte BFBF header.
+# Readers that take an offset (ext4.py, erofs.py, partextract.py -O) need
+# nothing more. Otherwise the header is cut off in place with
+# FALLOC_FL_COLLAPSE_RANGE, and where the filesystem cannot do that (or the
+# header is not block aligned) the data is copied with copy_file_range,
+# which reflinks on filesystems that support it.
+
+import os
+import sys
+import ctypes
+import struct
+import argparse
+
+import sparse
+
+collapse_range = 0x08
+search_size = 4 << 20
+step = 512
+
+ssss_header = 64
+bfbf_header = 0x4040
+
+ext4_magic = struct.pack("<H", 0xEF53)
+erofs_magic = struct.pack("<I", 0xE0F5E1E2)
+
+try:
+    _libc = ctypes.CDLL(None, use_errno=True)
+    _fallocate = _libc.fallocate
+    _fallocate.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_longlong, ctypes.c_longlong]
+except (OSError, AttributeError):
+    _fallocate = None
+
+def filesystem_at(buf, offset):
+    """Whether buf holds a believable ext4 or EROFS superblock at offset"""
+    sb = buf[offset + 1024:offset + 1024 + 128]
+    if len(sb) < 128:
+        return False
+    if sb[56:58] == ext4_magic:
+        (inodes, blocks) = struct.unpack_from("<2I", sb, 0)
+        (log_block_size, _, blocks_per_group) = struct.unpack_from("<3I", sb, 24)
+        return inodes > 0 and blocks > 0 and log_block_size <= 6 and blocks_per_group > 0
+    if sb[:4] == erofs_magic:
+        return 9 <= sb[12] <= 16
+    return False
+
+def detect(path, signed=False):
+    """(kind, offset, length) of the header of an image; length is None when the data runs to the end"""
+    with open(path, "rb") as f:
+        buf = f.read(search_size + 2048)
+    magic = buf[:12].replace(b"\0", b"")
+    if buf[:4] == b"SSSS":
+        return "SSSS", ssss_header, struct.unpack_from("<I", buf, 60)[0]
+    if buf[:4] == b"BFBF":
+        return "BFBF", bfbf_header, None
+    for kind in ("MOTO", "ASUS"):
+        if kind.encode() in magic:
+            for offset in range(step, min(len(buf), search_size), step):
+                if filesystem_at(buf, offset):
+                    return kind, offset, None
+            return kind, 0, None
+    # Signed packages put an unnamed header of the same size in front, but
+    # only of images that follow it
+    if signed and (buf[bfbf_header:bfbf_header + 4] == struct.pack("<I", sparse.sparse_magic)
+                   or filesystem_at(buf, bfbf_header)):
+        return "BFBF", bfbf_header, None
+    return None, 0, None
+
+def collapse(fd, length):
+    if _fallocate is None:
+        raise OSError("fallocate is not available")
+    if _fallocate(fd, collapse_range, 0, length) != 0:
+        errno = ctypes.get_errno()
+        raise OSError(errno, os.strerror(errno))
+
+def copy_range(src, dst, offset, length):
+    done = 0
+    while done < length:
+        copied = os.copy_file_range(src, dst, length - done, offset + done, done)
+        if copied == 0:
+            break
+        done += copied
+    return done
+
+def strip(path, offset, length=None):
+    """Cut offset header bytes (and anything after length data bytes) off an image in place"""
+    size = os.path.getsize(path)
+    if length is None or offset + length > size:
+        length = size - offset
+    if offset <= 0 or length <= 0:
+        return
+    fd = os.open(path, os.O_RDWR)
+    try:
+        try:
+            collapse(fd, offset)
+        except OSError:
+            # Unaligned header or a filesystem without collapse support
+            pass
+        else:
+            os.ftruncate(fd, length)
+            return
+        stripped = path + ".strip"
+        out = os.open(stripped, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, os.fstat(fd).st_mode & 0o777)
+        try:
+            try:
+                copied = copy_range(fd, out, offset, length)
+            except (AttributeError, OSError):
+                copied = 0
+            while copied < length:
+                data = os.pread(fd, min(length - copied, 1 << 20), offset + copied)
+                if not data:
+                    break
+                os.pwrite(out, data, copied)
+                copied += len(data)
+        finally:
+            os.close(out)
+        os.replace(stripped, path)
+    finally:
+        os.close(fd)
+
+def main():
+    parser = argparse.ArgumentParser(description="Detect and strip vendor headers of partition images")
+    parser.add_argument("images", nargs="+", help="partition images")
+    parser.add_argument("-s", "--strip", action="store_true", help="cut the header off in place")
+    parser.add_argument("--signed", action="store_true",
+                        help="images come from a signed package: without SSSS header a BFBF sized one is assumed")
+    args = parser.parse_args()
+
+    status = 0
+    for path in args.images:
+        try:
+            (kind, offset, length) = detect(path, args.signed)
+            if args.strip and kind:
+                strip(path, offset, length)
+        except (OSError, struct.error) as e:
+            print("[!] {}: {}".format(path, e), file=sys.stderr)
+            status = 1
+            continue
+        # One line per image, "kind offset", for the shell to read
+        print("{} {}".format(kind or "none", offset))
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+# Collect firmware version strings for board-info.txt
+#
+# Modem and trustzone images carry their version as a QC_IMAGE_VERSION_STRING
+# somewhere in the binary. Instead of running strings over every file, each
+# file is mmapped and searched for the marker; only the printable run around
+# a hit is decoded, the same line strings would have printed. Files are
+# scanned by a pool of worker processes and the board-info entries are
+# written sorted and without duplicates.
+
+import os
+import re
+import sys
+import mmap
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+# A printable run as GNU strings sees it
+printable = re.compile(rb"[\t\x20-\x7e]")
+
+# What to look for per kind of image, and how a hit becomes a board-info line
+rules = {
+    "baseband": (b"QC_IMAGE_VERSION_STRING=MPSS.",
+                 lambda line: "require version-baseband=" + line.replace("QC_IMAGE_VERSION_STRING=MPSS.", "")[3:]),
+    "trustzone": (b"QC_IMAGE_VERSION_STRING",
+                  lambda line: line.replace("QC_IMAGE_VERSION_STRING", "require version-trustzone")),
+    "vendor": (b"ro.vendor.build.date.utc",
+               lambda line: line.replace("ro.vendor.build.date.utc", "require version-vendor")),
+}
+
+def find_runs(data, marker):
+    """Printable runs of data that contain marker"""
+    runs = []
+    pos = data.find(marker)
+    while pos != -1:
+        start = pos
+        while start > 0 and printable.match(data[start - 1:start]):
+            start -= 1
+        end = pos + len(marker)
+        while end < len(data) and printable.match(data[end:end + 1]):
+            end += 1
+        runs.append(data[start:end].decode("ascii"))
+        # The rest of this run is already part of the line
+        pos = data.find(marker, end)
+    return runs
+
+def scan_file(task):
+    kind, path = task
+    marker, entry = rules[kind]
+    try:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size < len(marker):
+                return []
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return [entry(line) for line in find_runs(data, marker)]
+    except OSError:
+        return []
+
+def files_below(paths):
+    for path in paths:
+        if os.path.isfile(path):
+            yield path
+        for root, _, files in os.walk(path):
+            for f in files:
+                full = os.path.join(root, f)
+                if os.path.isfile(full) and not os.path.islink(full):
+                    yield full
+
+def main():
+    parser = argparse.ArgumentParser(description="Write board-info.txt entries from firmware version strings")
+    parser.add_argument("-o", "--output", required=True, help="board-info.txt to write")
+    parser.add_argument("--modem", nargs="*", default=[], help="modem files or folders (baseband version)")
+    parser.add_argument("--tz", nargs="*", default=[], help="trustzone files or folders")
+    parser.add_argument("--vendor-prop", nargs="*", default=[], help="vendor build.prop (build date)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="files scanned at the same time (default: %(default)s)")
+    args = parser.parse_args()
+
+    tasks = [("baseband", f) for f in files_below(args.modem)]
+    tasks += [("trustzone", f) for f in files_below(args.tz)]
+    tasks += [("vendor", f) for f in files_below(args.vendor_prop)]
+
+    entries = set()
+    if tasks:
+        with ProcessPoolExecutor(max_workers=max(1, min(args.jobs, len(tasks)))) as pool:
+            for lines in pool.map(scan_file, tasks, chunksize=max(1, len(tasks) // (args.jobs * 4))):
+                entries.update(lines)
+
+    with open(args.output, "w") as f:
+        for line in sorted(entries):
+            f.write(line + "\n")
+    print("[+] {} board-info entries from {} files".format(len(entries), len(tasks)))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())